@@ -0,0 +1,84 @@
+"""
+Compares the TextBlob and lexicon emotion scorers on synthetic user turns:
+throughput (per-turn and batched) and how often their positive/negative/neutral
+labels agree.
+
+    python benchmarks/emotion_scorers.py --turns 20000
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.synthetic import generate_conversation
+from src.emotion_analysis import get_emotion, get_emotions
+from src.emotion_lexicon import score_emotions_batch, dominant_emotion
+
+LABELS = ("positive", "neutral", "negative")
+
+def user_turns(n: int, rng: random.Random) -> list:
+    turns = []
+    while len(turns) < n:
+        conversation = generate_conversation(rng, start_time=0)
+        turns.extend(t["message"] for t in conversation["transcript"] if t["role"] == "user")
+    return turns[:n]
+
+def timed(fn) -> tuple:
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="TextBlob vs lexicon emotion scorer: throughput and agreement.")
+    parser.add_argument("--turns", type=int, default=5000, help="Synthetic user turns to score.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write results as JSON to this path.")
+    args = parser.parse_args()
+
+    texts = user_turns(args.turns, random.Random(args.seed))
+    score_emotions_batch(texts[:10]) # Warm up (lexicon load, NumPy import)
+
+    textblob_labels, textblob_s = timed(lambda: [get_emotion(t, scorer="textblob") for t in texts])
+    lexicon_single, lexicon_single_s = timed(lambda: [get_emotion(t, scorer="lexicon") for t in texts])
+    lexicon_batch, lexicon_batch_s = timed(lambda: get_emotions(texts, scorer="lexicon"))
+    assert lexicon_single == lexicon_batch
+
+    agree = sum(a == b for a, b in zip(textblob_labels, lexicon_batch))
+    confusion = {a: {b: 0 for b in LABELS} for a in LABELS}
+    for a, b in zip(textblob_labels, lexicon_batch):
+        confusion[a][b] += 1
+    dominant = {}
+    for emotion in dominant_emotion(score_emotions_batch(texts)):
+        dominant[emotion or "none"] = dominant.get(emotion or "none", 0) + 1
+
+    results = {
+        "turns": len(texts),
+        "textblob_turns_per_s": round(len(texts) / textblob_s, 1),
+        "lexicon_turns_per_s": round(len(texts) / lexicon_single_s, 1),
+        "lexicon_batch_turns_per_s": round(len(texts) / lexicon_batch_s, 1),
+        "label_agreement": round(agree / len(texts), 4),
+        "confusion_textblob_vs_lexicon": confusion,
+        "lexicon_dominant_emotions": dominant,
+    }
+    print(f"--- {len(texts)} user turns ---")
+    print(f"TextBlob:          {results['textblob_turns_per_s']:>12.1f} turns/s")
+    print(f"Lexicon (per turn): {results['lexicon_turns_per_s']:>11.1f} turns/s")
+    print(f"Lexicon (batch):   {results['lexicon_batch_turns_per_s']:>12.1f} turns/s")
+    print(f"Label agreement:   {100 * results['label_agreement']:.1f}%")
+    print("Confusion (rows TextBlob, columns lexicon):")
+    print(f"  {'':<9}" + "".join(f"{label:>10}" for label in LABELS))
+    for a in LABELS:
+        print(f"  {a:<9}" + "".join(f"{confusion[a][b]:>10}" for b in LABELS))
+    print(f"Lexicon dominant emotions: {dominant}")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"--- Results written to {args.output} ---")
+
+if __name__ == "__main__":
+    main()
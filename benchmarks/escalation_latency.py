@@ -0,0 +1,120 @@
+"""
+Measures the escalation fast path: turn received -> alert durably written and,
+with the local webhook receiver, -> webhook delivered. Synthetic user turns with
+a configurable share of escalation phrases go through escalation.check_turn and
+then sentiment scoring, in the same order as agent.py. Before the fast path, the
+sentiment time was spent before the keyword check.
+
+    python benchmarks/escalation_latency.py --turns 5000 --escalation-rate 0.05
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.synthetic import generate_conversation
+from src.emotion_analysis import get_emotion, escalation_keywords
+from src.escalation import ESCALATION_BUDGET_MS
+from src.tracing import percentile
+
+def user_turns(n: int, escalation_rate: float, rng: random.Random) -> list:
+    turns = []
+    while len(turns) < n:
+        conversation = generate_conversation(rng, start_time=0)
+        turns.extend(t["message"] for t in conversation["transcript"] if t["role"] == "user")
+    turns = turns[:n]
+    for i in range(n):
+        if rng.random() < escalation_rate:
+            turns[i] = f"{turns[i]} Honestly I feel like I {rng.choice(escalation_keywords)}."
+    return turns
+
+def start_webhook_receiver(received: dict) -> tuple:
+    """Local stand-in for the alerting webhook; records when each alert id arrives."""
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            alert = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            received[alert["id"]] = time.time()
+            self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/alerts"
+
+def summarize(label: str, values_ms: list):
+    if not values_ms:
+        print(f"{label:<34} no samples")
+        return {}
+    row = {"count": len(values_ms), "p50_ms": round(percentile(values_ms, 50), 3),
+           "p99_ms": round(percentile(values_ms, 99), 3), "max_ms": round(max(values_ms), 3)}
+    print(f"{label:<34} p50 {row['p50_ms']:>8.3f} ms  p99 {row['p99_ms']:>8.3f} ms  max {row['max_ms']:>8.3f} ms"
+          f"  (n={row['count']})")
+    return row
+
+def main():
+    parser = argparse.ArgumentParser(description="Escalation fast path latency.")
+    parser.add_argument("--turns", type=int, default=2000)
+    parser.add_argument("--escalation-rate", type=float, default=0.05, help="Share of turns containing a keyword.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--no-webhook", action="store_true", help="Skip the local webhook receiver.")
+    parser.add_argument("--output", help="Write results as JSON to this path.")
+    args = parser.parse_args()
+
+    import src.escalation as escalation
+    escalation.ALERTS_FILE = os.path.join(tempfile.mkdtemp(prefix="cyra_alerts_"), "escalations.jsonl")
+    received = {}
+    server = None
+    if not args.no_webhook:
+        server, escalation.WEBHOOK_URL = start_webhook_receiver(received)
+
+    texts = user_turns(args.turns, args.escalation_rate, random.Random(args.seed))
+    escalation.check_turn("warm up", "bench")
+    get_emotion("warm up")
+
+    fast, sentiment, sent = [], [], {}
+    for text in texts:
+        received_at = time.time()
+        alert = escalation.check_turn(text, "bench", received_at=received_at)
+        if alert:
+            fast.append(alert["latency_ms"])
+            sent[alert["id"]] = received_at
+        started = time.perf_counter()
+        get_emotion(text)
+        sentiment.append(1000 * (time.perf_counter() - started))
+
+    deadline = time.time() + 10
+    while server and len(received) < len(sent) and time.time() < deadline:
+        time.sleep(0.05)
+    webhook = [1000 * (received[alert_id] - sent[alert_id]) for alert_id in sent if alert_id in received]
+
+    print(f"--- {len(texts)} turns, {len(sent)} escalations, budget {ESCALATION_BUDGET_MS:.0f} ms ---")
+    results = {
+        "turns": len(texts),
+        "escalations": len(sent),
+        "budget_ms": ESCALATION_BUDGET_MS,
+        "fast_path_alert_written": summarize("Fast path: turn -> alert written", fast),
+        "sentiment_scoring": summarize("Sentiment scoring (after alert)", sentiment),
+        "webhook_delivered": summarize("Turn -> webhook delivered", webhook),
+        "over_budget": sum(v > ESCALATION_BUDGET_MS for v in fast),
+    }
+    print(f"Alerts over budget: {results['over_budget']}")
+    if server:
+        server.shutdown()
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"--- Results written to {args.output} ---")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Measures cold import time of the pipeline modules and CLI startup. Every module is
+imported in a fresh interpreter under `python -X importtime`, so nothing is cached
+between measurements; the slowest transitive imports are listed per module.
+
+    python benchmarks/import_time.py --repeat 5 --top 5
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+import statistics
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = (
+    "src.transcript_store", "src.emotion_analysis", "src.analyzer_agent", "src.knowledge_uploader",
+    "src.profile_store", "src.archive_store", "src.rolling_analysis", "src.mood_tracker",
+)
+COMMANDS = (
+    ("python -m src --help", ["-m", "src", "--help"]),
+)
+
+def run_python(args: list) -> tuple[float, subprocess.CompletedProcess]:
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, *args], cwd=REPO_ROOT, capture_output=True, text=True)
+    return time.perf_counter() - start, result
+
+def parse_importtime(stderr: str) -> dict:
+    """Cumulative microseconds per top-level package from `-X importtime` output (our own src excluded)."""
+    cumulative = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cum, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        package = name.strip().split(".")[0]
+        if cum.isdigit() and package != "src":
+            cumulative[package] = max(cumulative.get(package, 0), int(cum))
+    return cumulative
+
+def measure_module(module: str, repeat: int, top: int) -> dict:
+    samples, heaviest, error = [], {}, None
+    for _ in range(repeat):
+        elapsed, result = run_python(["-X", "importtime", "-c", f"import {module}"])
+        if result.returncode != 0:
+            error = result.stderr.strip().splitlines()[-1]
+            break
+        samples.append(elapsed)
+        heaviest = parse_importtime(result.stderr)
+    row = {"module": module}
+    if error:
+        row["error"] = error
+        return row
+    row["median_ms"] = round(1000 * statistics.median(samples), 1)
+    row["slowest_imports_ms"] = {name: round(us / 1000, 1) for name, us in
+                                 sorted(heaviest.items(), key=lambda item: -item[1])[:top]}
+    return row
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold import time of pipeline modules and CLI startup.")
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh interpreters per measurement (median reported).")
+    parser.add_argument("--top", type=int, default=5, help="Slowest transitive imports listed per module.")
+    parser.add_argument("--output", help="Write results as JSON to this path.")
+    args = parser.parse_args()
+
+    baseline = statistics.median(run_python(["-c", "pass"])[0] for _ in range(args.repeat))
+    print(f"--- Interpreter startup: {1000 * baseline:.1f} ms (included in all figures below) ---")
+    results = {"interpreter_ms": round(1000 * baseline, 1), "modules": [], "commands": []}
+    for module in MODULES:
+        row = measure_module(module, args.repeat, args.top)
+        results["modules"].append(row)
+        if "error" in row:
+            print(f"{module:<24} FAILED: {row['error']}")
+        else:
+            slowest = ", ".join(f"{name} {ms}" for name, ms in row["slowest_imports_ms"].items())
+            print(f"{module:<24} {row['median_ms']:>8.1f} ms   [{slowest}]")
+    for label, command in COMMANDS:
+        elapsed = statistics.median(run_python(command)[0] for _ in range(args.repeat))
+        results["commands"].append({"command": label, "median_ms": round(1000 * elapsed, 1)})
+        print(f"{label:<24} {1000 * elapsed:>8.1f} ms")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"--- Results written to {args.output} ---")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Headless load test for the live conversation path. Drives many concurrent
+Conversation sessions, each streaming a WAV file through FileAudioInterface,
+against a local websocket stand-in, and reports per-turn
+transcript-to-analysis latency and jitter.
+
+    python benchmarks/live_sessions.py --sessions 50 --duration 30 --speed 4
+"""
+import os
+import sys
+import math
+import time
+import wave
+import argparse
+import tempfile
+import threading
+import statistics
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from elevenlabs.client import ElevenLabs
+from elevenlabs.conversational_ai.conversation import Conversation
+
+from benchmarks.ws_stub import WebsocketStub
+from src.file_audio_interface import FileAudioInterface, SAMPLE_RATE, SAMPLE_WIDTH
+from src.emotion_analysis import get_emotion_and_check_escalation
+from src.coping_strategies import get_coping_advice
+from src.tracing import percentile
+
+def write_test_wav(path: str, seconds: float = 5.0):
+    """Writes a quiet 220 Hz tone, enough for the stand-in to count audio chunks."""
+    n = int(SAMPLE_RATE * seconds)
+    samples = bytearray()
+    for i in range(n):
+        value = int(800 * math.sin(2 * math.pi * 220 * i / SAMPLE_RATE))
+        samples += value.to_bytes(SAMPLE_WIDTH, 'little', signed=True)
+    with wave.open(path, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(SAMPLE_WIDTH)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes(bytes(samples))
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent headless Conversation sessions against a local stand-in.")
+    parser.add_argument("--sessions", type=int, default=10, help="Concurrent sessions.")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds to keep the sessions running.")
+    parser.add_argument("--speed", type=float, default=1.0, help="Audio streaming speed (1 = real time, 0 = unthrottled).")
+    parser.add_argument("--wav", help="16 kHz mono 16-bit WAV to stream (default: generated tone).")
+    parser.add_argument("--chunks-per-turn", type=int, default=8, help="Audio chunks (250 ms) per simulated user turn.")
+    parser.add_argument("--record-dir", help="Record each session's agent audio into this directory.")
+    args = parser.parse_args()
+
+    wav_path = args.wav
+    if not wav_path:
+        wav_path = os.path.join(tempfile.mkdtemp(prefix="cyra_live_"), "input.wav")
+        write_test_wav(wav_path)
+
+    stub = WebsocketStub(chunks_per_turn=args.chunks_per_turn)
+    base_url = stub.start()
+    client = ElevenLabs(api_key="bench-key", base_url=base_url)
+
+    lock = threading.Lock()
+    end_to_end = [] # stand-in send -> analysis done
+    analysis_only = [] # callback entry -> analysis done
+    turns_per_session = [0] * args.sessions
+
+    def make_callback(session_index: int):
+        def on_user_transcript(transcript: str):
+            arrived = time.perf_counter()
+            emotion, escalation_needed = get_emotion_and_check_escalation(transcript)
+            if not escalation_needed:
+                get_coping_advice(emotion)
+            done = time.perf_counter()
+            sent = stub.pop_sent_time(transcript)
+            with lock:
+                turns_per_session[session_index] += 1
+                analysis_only.append(done - arrived)
+                if sent is not None:
+                    end_to_end.append(done - sent)
+        return on_user_transcript
+
+    conversations = []
+    for i in range(args.sessions):
+        record_path = os.path.join(args.record_dir, f"session_{i}.wav") if args.record_dir else None
+        audio = FileAudioInterface(wav_path, speed=args.speed, record_path=record_path, loop=True)
+        conversation = Conversation(
+            client,
+            "bench-agent",
+            requires_auth=False,
+            audio_interface=audio,
+            callback_user_transcript=make_callback(i),
+        )
+        conversations.append(conversation)
+
+    print(f"--- Starting {args.sessions} sessions for {args.duration:.0f}s at {args.speed}x audio speed ---")
+    for conversation in conversations:
+        conversation.start_session()
+    time.sleep(args.duration)
+    for conversation in conversations:
+        conversation.end_session()
+    for conversation in conversations:
+        conversation.wait_for_session_end()
+    stub.stop()
+
+    if not end_to_end:
+        print("No user turns were completed; try a longer --duration or fewer --chunks-per-turn.")
+        return
+    e2e_ms = [v * 1000 for v in end_to_end]
+    analysis_ms = [v * 1000 for v in analysis_only]
+    print(f"--- {len(e2e_ms)} turns across {args.sessions} sessions "
+          f"(min {min(turns_per_session)}, max {max(turns_per_session)} per session) ---")
+    print(f"Transcript -> analysis: p50 {percentile(e2e_ms, 50):.2f}ms  p95 {percentile(e2e_ms, 95):.2f}ms  "
+          f"p99 {percentile(e2e_ms, 99):.2f}ms  jitter (stdev) {statistics.pstdev(e2e_ms):.2f}ms")
+    print(f"Analysis only:          p50 {percentile(analysis_ms, 50):.2f}ms  p95 {percentile(analysis_ms, 95):.2f}ms  "
+          f"p99 {percentile(analysis_ms, 99):.2f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+Offline end-to-end benchmarks. Runs the watcher pipeline, transcript backfill,
+KB uploader and /mood-trends against local Groq/ElevenLabs stand-ins and
+reports throughput, latency percentiles and peak RSS.
+
+    python benchmarks/run_benchmarks.py --conversations 1000 --latency-ms 20 --groq-latency-ms 300
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import resource
+import tempfile
+import contextlib
+from datetime import datetime, timedelta
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.stubs import StubConfig, start_stub_server
+from benchmarks.synthetic import generate_conversation, generate_profile
+
+SCENARIOS = ("watcher", "backfill", "uploader", "mood-trends")
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is reported in KiB on Linux (bytes on macOS)
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+def summarize_run(name: str, latencies: list, elapsed: float) -> dict:
+    from src.tracing import percentile
+    ms = [value * 1000 for value in latencies]
+    return {
+        "scenario": name,
+        "count": len(latencies),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_per_s": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(ms, 50), 2),
+        "p95_ms": round(percentile(ms, 95), 2),
+        "p99_ms": round(percentile(ms, 99), 2),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+def timed_calls(module, name: str, latencies: list):
+    """Replaces module.<name> with a wrapper that records each call's duration."""
+    original = getattr(module, name)
+
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return original(*args, **kwargs)
+        finally:
+            latencies.append(time.perf_counter() - start)
+
+    setattr(module, name, wrapper)
+    return original
+
+def bench_watcher(state, n: int, rng: random.Random, page_size: int) -> dict:
+    """Releases finished calls a page at a time and lets the watcher drain them."""
+    import src.watcher_processor as watcher
+    watcher.FETCH_DELAY_SECONDS = 0
+
+    latencies = []
+    original = timed_calls(watcher, "process_conversation", latencies)
+    now = int(time.time())
+    start = time.perf_counter()
+    released = 0
+    try:
+        while released < n:
+            batch = min(page_size, n - released)
+            for _ in range(batch):
+                state.add(generate_conversation(rng, now - rng.randint(0, 3600)))
+            released += batch
+            watcher.check_for_new_conversations()
+            watcher.drain_queue()
+    finally:
+        watcher.process_conversation = original
+    return summarize_run("watcher", latencies, time.perf_counter() - start)
+
+def bench_backfill(workdir: str, n: int, rng: random.Random) -> dict:
+    """Analyzes N pre-saved transcripts (what scheduler.py does nightly)."""
+    from src.transcript_store import build_turns, write_turns, TRANSCRIPT_EXT
+    from src.analyzer_agent import analyze_and_save_profile
+
+    conv_dir = os.path.join(workdir, "backfill", "conversations")
+    os.makedirs(conv_dir, exist_ok=True)
+    paths = []
+    base = datetime(2025, 1, 1)
+    for i in range(n):
+        conv = generate_conversation(rng, int(time.time()))
+        stamp = (base + timedelta(seconds=i)).strftime("%Y%m%d_%H%M%S")
+        path = os.path.join(conv_dir, f"conversation_{conv['conversation_id']}_{stamp}{TRANSCRIPT_EXT}")
+        write_turns(build_turns(conv["transcript"], with_sentiment=False), path, conv["conversation_id"])
+        paths.append(path)
+
+    latencies = []
+    start = time.perf_counter()
+    for path in paths:
+        t0 = time.perf_counter()
+        analyze_and_save_profile(path)
+        latencies.append(time.perf_counter() - t0)
+    return summarize_run("backfill", latencies, time.perf_counter() - start)
+
+def write_profiles(profile_dir: str, n: int, rng: random.Random):
+    from src.profile_store import write_profile
+    base = datetime(2024, 1, 1)
+    for i in range(n):
+        created_at = (base + timedelta(minutes=37 * i)).timestamp()
+        write_profile(generate_profile(rng), f"conversation_bench{i}", profile_dir, created_at=created_at)
+
+def bench_uploader(workdir: str, n: int, rng: random.Random) -> dict:
+    """Uploads N profiles through process_profiles()."""
+    import src.knowledge_uploader as uploader
+    upload_dir = os.path.join(workdir, "uploader")
+    write_profiles(os.path.join(upload_dir, "user_profiles"), n, rng)
+
+    latencies = []
+    original = timed_calls(uploader, "upload_profile_file", latencies)
+    cwd = os.getcwd()
+    os.chdir(upload_dir) # process_profiles() reads user_profiles/manifest.jsonl relative to cwd
+    start = time.perf_counter()
+    try:
+        uploader.process_profiles()
+    finally:
+        os.chdir(cwd)
+        uploader.upload_profile_file = original
+    return summarize_run("uploader", latencies, time.perf_counter() - start)
+
+def bench_mood_trends(workdir: str, n: int, rng: random.Random, repeats: int) -> dict:
+    """Times GET /mood-trends over N stored profiles."""
+    from src.mood_tracker import app
+    trends_dir = os.path.join(workdir, "mood_trends")
+    write_profiles(os.path.join(trends_dir, "user_profiles"), n, rng)
+
+    client = app.test_client()
+    latencies = []
+    cwd = os.getcwd()
+    os.chdir(trends_dir)
+    start = time.perf_counter()
+    try:
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            response = client.get('/mood-trends')
+            latencies.append(time.perf_counter() - t0)
+            if response.status_code != 200:
+                raise RuntimeError(f"/mood-trends returned {response.status_code}")
+    finally:
+        os.chdir(cwd)
+    return summarize_run("mood-trends", latencies, time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks against local Groq/ElevenLabs stand-ins.")
+    parser.add_argument("--conversations", type=int, default=1000, help="Conversations/profiles per scenario.")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Comma-separated subset of {SCENARIOS}.")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="ElevenLabs stand-in latency.")
+    parser.add_argument("--groq-latency-ms", type=float, default=50.0, help="Groq stand-in latency.")
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests failing with 500.")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share of requests failing with 429.")
+    parser.add_argument("--page-size", type=int, default=30, help="Conversations released per watcher cycle.")
+    parser.add_argument("--mood-repeats", type=int, default=5, help="Requests issued to /mood-trends.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write results as JSON to this path.")
+    parser.add_argument("--verbose", action="store_true", help="Show pipeline output instead of discarding it.")
+    args = parser.parse_args()
+    output_path = os.path.abspath(args.output) if args.output else None
+
+    config = StubConfig(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                        rate_limit_rate=args.rate_limit_rate, groq_latency_ms=args.groq_latency_ms, seed=args.seed)
+    server, state, base_url = start_stub_server(config)
+    workdir = tempfile.mkdtemp(prefix="cyra_bench_")
+
+    # Must be set before the pipeline modules are imported
+    os.environ.update({
+        "AGENT_ID": "bench-agent",
+        "ELEVENLABS_API_KEY": "bench-key",
+        "GROQ_API_KEY": "bench-key",
+        "ELEVENLABS_BASE_URL": base_url,
+        "GROQ_BASE_URL": base_url,
+        "TRACE_FILE": os.path.join(workdir, "spans.jsonl"),
+    })
+    os.chdir(workdir) # conversations/, user_profiles/ and the processed IDs file land here
+
+    rng = random.Random(args.seed)
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    results = []
+    print(f"--- Benchmarking {scenarios} with {args.conversations} conversations (workdir {workdir}) ---")
+    for scenario in scenarios:
+        sink = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(open(os.devnull, 'w'))
+        with sink:
+            if scenario == "watcher":
+                result = bench_watcher(state, args.conversations, rng, args.page_size)
+            elif scenario == "backfill":
+                result = bench_backfill(workdir, args.conversations, rng)
+            elif scenario == "uploader":
+                result = bench_uploader(workdir, args.conversations, rng)
+            elif scenario == "mood-trends":
+                result = bench_mood_trends(workdir, args.conversations, rng, args.mood_repeats)
+            else:
+                raise SystemExit(f"Unknown scenario: {scenario}")
+        results.append(result)
+        print(f"{result['scenario']:<12} n={result['count']:<7} {result['throughput_per_s']:>9.2f}/s  "
+              f"p50 {result['p50_ms']:>9.2f}ms  p95 {result['p95_ms']:>9.2f}ms  p99 {result['p99_ms']:>9.2f}ms  "
+              f"peak RSS {result['peak_rss_mb']:.1f} MiB")
+
+    print(f"--- Stand-in requests: {state.requests} ---")
+    server.shutdown()
+    if output_path:
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump({"args": vars(args), "results": results, "stub_requests": state.requests}, f, indent=2)
+        print(f"--- Results written to {output_path} ---")
+
+if __name__ == "__main__":
+    main()
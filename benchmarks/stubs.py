@@ -0,0 +1,180 @@
+import json
+import time
+import random
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local HTTP stand-ins for the Groq chat-completions API and the ElevenLabs
+# conversations / knowledge-base API. A single server answers both; point the
+# clients at it with GROQ_BASE_URL and ELEVENLABS_BASE_URL.
+
+class StubConfig:
+    """Fault/latency knobs shared by every stubbed endpoint."""
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, groq_latency_ms: float | None = None, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        # Groq is usually far slower than the ElevenLabs REST calls
+        self.groq_latency_ms = latency_ms if groq_latency_ms is None else groq_latency_ms
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def delay(self, base_ms: float):
+        with self.lock:
+            jitter = self.rng.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+        if base_ms + jitter > 0:
+            time.sleep((base_ms + jitter) / 1000)
+
+    def fault(self) -> int | None:
+        """Returns an HTTP status to fail with (429/500), or None."""
+        with self.lock:
+            roll = self.rng.random()
+        if roll < self.rate_limit_rate:
+            return 429
+        if roll < self.rate_limit_rate + self.error_rate:
+            return 500
+        return None
+
+class StubState:
+    """Conversations visible to the list endpoint, plus request counters."""
+
+    def __init__(self):
+        self.conversations = {} # conversation_id -> full conversation dict
+        self.order = [] # conversation ids, oldest first
+        self.kb_documents = 0
+        self.requests = {}
+        self.lock = threading.Lock()
+
+    def add(self, conversation: dict):
+        with self.lock:
+            self.conversations[conversation["conversation_id"]] = conversation
+            self.order.append(conversation["conversation_id"])
+
+    def count(self, route: str):
+        with self.lock:
+            self.requests[route] = self.requests.get(route, 0) + 1
+
+def _summary(conv: dict) -> dict:
+    return {
+        "agent_id": conv["agent_id"],
+        "agent_name": "Bench Agent",
+        "conversation_id": conv["conversation_id"],
+        "start_time_unix_secs": conv["metadata"]["start_time_unix_secs"],
+        "call_duration_secs": conv["metadata"]["call_duration_secs"],
+        "message_count": len(conv["transcript"]),
+        "status": conv["status"],
+        "call_successful": "success",
+    }
+
+PROFILE_CONTENT = json.dumps({
+    "user_name": "Unknown",
+    "mood": "neutral",
+    "emotion_trend": "stable",
+    "topics": ["family", "health concerns"],
+    "profile_tags": ["#storyteller", "#seeking_reassurance", "#optimistic"],
+    "persona_summary": "The user shared updates about family and health.",
+})
+
+def make_handler(state: StubState, config: StubConfig):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, status: int, payload: dict, headers: dict = None):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _read_body(self) -> dict:
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length) if length else b""
+            return json.loads(raw) if raw else {}
+
+        def _faulted(self) -> bool:
+            status = config.fault()
+            if status == 429:
+                self._send(429, {"error": "rate limited"}, {"Retry-After": "0"})
+                return True
+            if status:
+                self._send(status, {"error": "stub failure"})
+                return True
+            return False
+
+        def do_GET(self):
+            parsed = urlparse(self.path)
+            path = parsed.path.rstrip("/")
+            config.delay(config.latency_ms)
+            if path == "/v1/convai/conversations":
+                state.count("list")
+                if self._faulted():
+                    return
+                page_size = int(parse_qs(parsed.query).get("page_size", ["30"])[0])
+                with state.lock:
+                    newest = state.order[-page_size:][::-1]
+                    items = [_summary(state.conversations[cid]) for cid in newest]
+                self._send(200, {"conversations": items, "has_more": len(state.order) > page_size,
+                                 "next_cursor": None})
+            elif path.startswith("/v1/convai/conversations/"):
+                state.count("fetch")
+                if self._faulted():
+                    return
+                conv = state.conversations.get(path.rsplit("/", 1)[1])
+                if conv is None:
+                    self._send(404, {"detail": "not found"})
+                else:
+                    self._send(200, conv)
+            else:
+                self._send(404, {"detail": "unknown route"})
+
+        def do_POST(self):
+            path = urlparse(self.path).path.rstrip("/")
+            body = self._read_body()
+            if path.endswith("/chat/completions"):
+                state.count("groq")
+                config.delay(config.groq_latency_ms)
+                if self._faulted():
+                    return
+                prompt_chars = sum(len(m.get("content", "")) for m in body.get("messages", []))
+                self._send(200, {
+                    "id": "chatcmpl-bench",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get("model", "stub"),
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": PROFILE_CONTENT}}],
+                    "usage": {"prompt_tokens": prompt_chars // 4, "completion_tokens": len(PROFILE_CONTENT) // 4,
+                              "total_tokens": (prompt_chars + len(PROFILE_CONTENT)) // 4},
+                })
+            elif path == "/v1/convai/knowledge-base/text":
+                state.count("kb_upload")
+                config.delay(config.latency_ms)
+                if self._faulted():
+                    return
+                with state.lock:
+                    state.kb_documents += 1
+                    doc_id = state.kb_documents
+                self._send(200, {"id": f"doc-{doc_id}", "name": body.get("name", "")})
+            else:
+                self._send(404, {"detail": "unknown route"})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+def start_stub_server(config: StubConfig, port: int = 0) -> tuple:
+    """Starts the stand-in server in a daemon thread. Returns (server, state, base_url)."""
+    state = StubState()
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state, config))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    return server, state, base_url
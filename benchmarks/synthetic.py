@@ -0,0 +1,86 @@
+import random
+import string
+
+# Synthetic conversation generator for offline benchmarks. Turn counts and
+# utterance lengths follow log-normal distributions (most calls are short,
+# a long tail runs to hundreds of turns), roughly matching real companion calls.
+TURNS_MEDIAN = 14
+TURNS_SIGMA = 0.8
+WORDS_MEDIAN = 12
+WORDS_SIGMA = 0.7
+ESCALATION_RATE = 0.02 # Share of conversations containing an escalation phrase
+
+USER_PHRASES = [
+    "I've been feeling a bit lonely since my daughter moved away",
+    "work has been really stressful this week",
+    "I went for a walk in the park and it was lovely",
+    "I can't sleep well lately and I keep worrying about my health",
+    "my grandson called me yesterday, that made me happy",
+    "honestly I'm just tired of everything",
+    "I miss my husband, it's been two years now",
+    "I started painting again, it feels good to create something",
+    "the doctor said my results look fine",
+    "I had an argument with my neighbour and I'm still angry",
+    "nothing much happened today",
+    "I'm anxious about the appointment on Friday",
+]
+AGENT_PHRASES = [
+    "That sounds like a lot to carry. Would you like to tell me more?",
+    "I'm really glad you shared that with me.",
+    "How did that make you feel?",
+    "It's completely understandable to feel that way.",
+    "What usually helps you when you feel like this?",
+    "That's wonderful to hear!",
+]
+FILLER = ["um", "yeah", "okay", "right", "mm-hmm", "I see"]
+ESCALATION_PHRASES = ["sometimes I feel hopeless", "I just can't go on like this"]
+NAMES = ["Margaret", "Tom", "Aisha", "Jorge", "Mei", "Unknown"]
+
+def _utterance(rng: random.Random, phrases: list) -> str:
+    target_words = max(1, int(rng.lognormvariate(0, WORDS_SIGMA) * WORDS_MEDIAN))
+    words = []
+    while len(words) < target_words:
+        if rng.random() < 0.15:
+            words.append(rng.choice(FILLER))
+        else:
+            words.extend(rng.choice(phrases).split())
+    return " ".join(words[:target_words])
+
+def conversation_id(rng: random.Random) -> str:
+    return "".join(rng.choices(string.ascii_letters + string.digits, k=20))
+
+def generate_conversation(rng: random.Random, start_time: int) -> dict:
+    """Returns a conversation in the shape of the ElevenLabs get_conversation response."""
+    n_turns = max(2, int(rng.lognormvariate(0, TURNS_SIGMA) * TURNS_MEDIAN))
+    escalate = rng.random() < ESCALATION_RATE
+    transcript = []
+    t = 0.0
+    for i in range(n_turns):
+        role = "agent" if i % 2 == 0 else "user"
+        message = _utterance(rng, AGENT_PHRASES if role == "agent" else USER_PHRASES)
+        if escalate and role == "user" and i >= n_turns // 2:
+            message += ", " + rng.choice(ESCALATION_PHRASES)
+            escalate = False
+        transcript.append({"role": role, "message": message, "time_in_call_secs": int(t)})
+        t += 2 + len(message.split()) * 0.4
+    conv_id = conversation_id(rng)
+    return {
+        "agent_id": "bench-agent",
+        "conversation_id": conv_id,
+        "status": "done",
+        "transcript": transcript,
+        "metadata": {"start_time_unix_secs": start_time, "call_duration_secs": int(t)},
+    }
+
+def generate_profile(rng: random.Random) -> dict:
+    """Returns a profile in the shape produced by analyzer_agent."""
+    return {
+        "user_name": rng.choice(NAMES),
+        "mood": rng.choice(["lonely", "anxious", "grateful", "neutral", "sad", "frustrated", "happy"]),
+        "emotion_trend": rng.choice(["started sad, ended neutral", "consistently positive",
+                                     "increasing frustration", "stable"]),
+        "topics": rng.sample(["family", "work stress", "health concerns", "hobbies", "memories", "sleep"], 3),
+        "profile_tags": rng.sample(["#grieving", "#seeking_reassurance", "#storyteller", "#caregiver",
+                                    "#optimistic", "#hopeful", "#withdrawn", "#anxious"], 4),
+        "persona_summary": "The user talked about their week and how they have been feeling.",
+    }
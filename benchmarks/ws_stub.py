@@ -0,0 +1,83 @@
+import json
+import time
+import base64
+import random
+import threading
+import itertools
+from websockets.sync.server import serve
+from websockets.exceptions import ConnectionClosed
+
+from benchmarks.synthetic import USER_PHRASES, AGENT_PHRASES
+
+# Local stand-in for the Conversational AI websocket. After every
+# `chunks_per_turn` user audio chunks it "recognises" an utterance and sends a
+# user_transcript event, then an agent_response and a short audio reply.
+# Send times are recorded per transcript so the runner can measure
+# transcript-to-analysis latency on the client side.
+
+class WebsocketStub:
+    def __init__(self, chunks_per_turn: int = 8, agent_delay_ms: float = 0.0, seed: int = 0):
+        self.chunks_per_turn = chunks_per_turn
+        self.agent_delay_ms = agent_delay_ms
+        self.rng = random.Random(seed)
+        self.sent_at = {} # transcript text -> [send times]
+        self.lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._server = None
+
+    def _utterance(self) -> str:
+        with self.lock:
+            # Two phrases plus a sequence number keep transcripts unique per turn
+            text = f"{self.rng.choice(USER_PHRASES)}, and {self.rng.choice(USER_PHRASES)} ({next(self._ids)})"
+        return text
+
+    def pop_sent_time(self, transcript: str) -> float | None:
+        with self.lock:
+            times = self.sent_at.get(transcript)
+            return times.pop(0) if times else None
+
+    def _handle(self, websocket):
+        conversation_id = f"bench-live-{next(self._ids)}"
+        chunks = 0
+        try:
+            for raw in websocket:
+                message = json.loads(raw)
+                if message.get("type") == "conversation_initiation_client_data":
+                    websocket.send(json.dumps({
+                        "type": "conversation_initiation_metadata",
+                        "conversation_initiation_metadata_event": {
+                            "conversation_id": conversation_id,
+                            "agent_output_audio_format": "pcm_16000",
+                        },
+                    }))
+                elif "user_audio_chunk" in message:
+                    chunks += 1
+                    if chunks % self.chunks_per_turn == 0:
+                        self._send_turn(websocket)
+        except ConnectionClosed:
+            pass
+
+    def _send_turn(self, websocket):
+        transcript = self._utterance()
+        with self.lock:
+            self.sent_at.setdefault(transcript, []).append(time.perf_counter())
+        websocket.send(json.dumps({"type": "user_transcript",
+                                   "user_transcription_event": {"user_transcript": transcript}}))
+        if self.agent_delay_ms:
+            time.sleep(self.agent_delay_ms / 1000)
+        with self.lock:
+            reply = self.rng.choice(AGENT_PHRASES)
+        websocket.send(json.dumps({"type": "agent_response", "agent_response_event": {"agent_response": reply}}))
+        silence = base64.b64encode(b"\x00\x00" * 1600).decode() # 100 ms at 16 kHz
+        websocket.send(json.dumps({"type": "audio", "audio_event": {"audio_base_64": silence, "event_id": 1}}))
+
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Starts serving in a daemon thread. Returns the http:// base URL for the SDK client."""
+        self._server = serve(self._handle, host, port)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        port = self._server.socket.getsockname()[1]
+        return f"http://{host}:{port}"
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
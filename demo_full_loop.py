@@ -12,7 +12,7 @@ from src.coping_strategies import get_coping_advice
 
 from elevenlabs.client import ElevenLabs
 from elevenlabs.conversational_ai.conversation import Conversation
-from elevenlabs.conversational_ai.default_audio_interface import DefaultAudioInterface
+from src.file_audio_interface import make_audio_interface
 
 print("--- Loading Environment Variables (.env) --- ")
 load_dotenv() # Load .env file
@@ -61,7 +61,7 @@ conversation = Conversation(
     client,
     agent_id,
     requires_auth=bool(api_key),
-    audio_interface=DefaultAudioInterface(),
+    audio_interface=make_audio_interface(), # AUDIO_INPUT_WAV=... for headless runs
     callback_agent_response=lambda response: print(f"\nAgent said: " + "-"*20 + f"\n{response}\n" + "-"*31),
     callback_agent_response_correction=lambda original, corrected: print(f"\nAgent corrected: " + "-"*13 + f"\nOriginal: {original}\nCorrected: {corrected}\n" + "-"*31),
     callback_user_transcript=process_user_transcript_for_demo, # Use the demo version
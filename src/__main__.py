@@ -0,0 +1,70 @@
+"""
+Single entry point for the companion pipeline:
+
+    python -m src live                  # live voice session (src/agent.py)
+    python -m src watch                 # watcher/processor for finished conversations
+    python -m src analyze <transcript>  # analyze one transcript and save its profile
+    python -m src upload [--new-only]   # upload profiles to the ElevenLabs knowledge base
+    python -m src backfill [--limit N]  # analyze saved transcripts that have no profile yet
+    python -m src serve                 # mood tracker API (/mood-trends, /mood-series, ...)
+
+Only argparse is imported up front; each command imports what it needs after the
+arguments are parsed, so `--help` and short commands start quickly.
+"""
+import os
+import sys
+import runpy
+import argparse
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def run_live(args):
+    # agent.py runs the session at import time and uses sibling (non-package) imports
+    sys.path.insert(0, SRC_DIR)
+    runpy.run_path(os.path.join(SRC_DIR, "agent.py"), run_name="__main__")
+
+def run_watch(args):
+    runpy.run_module("src.watcher_processor", run_name="__main__")
+
+def run_analyze(args):
+    from src.analyzer_agent import main
+    main([args.transcript_file])
+
+def run_upload(args):
+    from src.knowledge_uploader import process_profiles
+    process_profiles(only_new=args.new_only)
+
+def run_backfill(args):
+    from src.analyzer_agent import analyze_missing_profiles
+    analyze_missing_profiles(args.dir, limit=args.limit)
+
+def run_serve(args):
+    runpy.run_module("src.mood_tracker", run_name="__main__")
+
+def main(argv: list | None = None):
+    parser = argparse.ArgumentParser(prog="python -m src", description="AI companion pipeline.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("live", help="Run a live conversation session.").set_defaults(func=run_live)
+    subparsers.add_parser("watch", help="Process finished conversations as they arrive.").set_defaults(func=run_watch)
+
+    analyze_parser = subparsers.add_parser("analyze", help="Analyze a transcript and save the profile.")
+    analyze_parser.add_argument("transcript_file", help="Transcript (.jsonl.gz / .txt) or <archive>.cseg#<name>.")
+    analyze_parser.set_defaults(func=run_analyze)
+
+    upload_parser = subparsers.add_parser("upload", help="Upload profiles to the knowledge base.")
+    upload_parser.add_argument("--new-only", action="store_true", help="Only profiles saved since the last upload.")
+    upload_parser.set_defaults(func=run_upload)
+
+    backfill_parser = subparsers.add_parser("backfill", help="Analyze transcripts that have no profile yet.")
+    backfill_parser.add_argument("--dir", default="conversations", help="Transcript directory.")
+    backfill_parser.add_argument("--limit", type=int, default=None, help="Analyze at most this many transcripts.")
+    backfill_parser.set_defaults(func=run_backfill)
+
+    subparsers.add_parser("serve", help="Start the mood tracker API.").set_defaults(func=run_serve)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -2,18 +2,26 @@ import os
 import signal
 import json
 import time
+import threading
+from contextlib import ExitStack
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv # Import dotenv
 
-# MODIFIED: Import the combined function
-from emotion_analysis import get_emotion_and_check_escalation
-from coping_strategies import get_coping_advice
+from emotion_analysis import get_emotion
+from escalation import check_turn, link_alerts, AGENT_INSTRUCTION
+from coping_strategies import get_coping_advice, load_advice_table
 # NEW: Import functions from other modules
-from analyzer_agent import analyze_and_save_profile
+from analyzer_agent import analyze_and_save_profile, save_profile
+from rolling_analysis import RollingAnalyzer
 from knowledge_uploader import upload_profile_file
+from transcript_store import save_transcript
+from event_stream import publish_event, start_event_server
+from tracing import trace_conversation, span
+from lease_registry import claim, keep_alive, complete, release
 
 from elevenlabs.client import ElevenLabs
 from elevenlabs.conversational_ai.conversation import Conversation
-from elevenlabs.conversational_ai.default_audio_interface import DefaultAudioInterface
+from file_audio_interface import make_audio_interface
 
 load_dotenv() # Load .env file
 
@@ -29,34 +37,65 @@ if not agent_id or not api_key:
 # Create the ElevenLabs client instance
 client = ElevenLabs(api_key=api_key)
 
+# Profile is built in the background during the call (see rolling_analysis.py)
+rolling_analyzer = RollingAnalyzer()
+
+# Advice personalized from the user's past profiles, precomputed whenever a profile is saved.
+# Only for an identified caller (COMPANION_USER): tables quote the user's own topics.
+advice_table = load_advice_table(os.getenv("COMPANION_USER"))
+print("--- Using personalized coping advice ---" if advice_table else "--- Using generic coping advice (no COMPANION_USER or no table yet) ---")
+
+# Live alerts are deduplicated per conversation, using the SDK's private `_conversation_id`
+# (there is no public accessor during the call). Alerts raised before it is set are linked
+# to the conversation once its id is known, at the latest with the ID returned at session end.
+unlinked_alert_ids = []
+
+def link_live_alerts(conversation_id: str):
+    if link_alerts(unlinked_alert_ids, conversation_id):
+        print(f"--- Linked {len(unlinked_alert_ids)} escalation alert(s) to conversation {conversation_id} ---")
+
 # NEW: Define a function to handle user transcript processing
 def process_user_transcript(transcript: str):
     """
     Processes the user's transcript, performs emotion analysis, checks for
     escalation, and prints relevant information or advice.
     """
+    received_at = time.time()
+    # Escalation fast path first: keyword match + durable alert, before any sentiment scoring
+    alert = check_turn(transcript, "live", getattr(conversation, "_conversation_id", None), received_at)
+    if alert and not alert["conversation_id"]:
+        unlinked_alert_ids.append(alert["id"])
+    if alert:
+        # Frontend subscribers on /events receive this immediately
+        publish_event("escalation", keyword=alert["keyword"], alert_id=alert["id"])
+        try:
+            conversation.send_contextual_update(AGENT_INSTRUCTION) # Steer the live agent
+        except Exception as e: # Older SDKs have no contextual updates
+            print(f"   [Could not send contextual update to agent: {e}]")
+
     print(f"User: {transcript}")
+    rolling_analyzer.add_turn("user", transcript)
 
-    # Get emotion and check for escalation flags
-    emotion, escalation_needed = get_emotion_and_check_escalation(transcript)
+    emotion = get_emotion(transcript)
+    escalation_needed = alert is not None
     print(f"   [Detected Emotion: {emotion}]")
+    publish_event("emotion", emotion=emotion, escalation=escalation_needed) # No transcript text over the wire
 
-    # Handle escalation OR provide coping advice
     if escalation_needed:
         # IMPORTANT: This is a placeholder. Real applications need robust handling.
-        print("*-* ESCALATION DETECTED *-*")
-        print("   It sounds like you're going through a really tough time. Please know that help is available.")
-        print("   Consider reaching out to a crisis hotline or mental health professional.")
-        print("   [Placeholder: Link/Number to Crisis Support]") 
-        # TODO: Trigger frontend popup/alert (Phase 5)
-        # TODO: Potentially stop the conversation or change agent behavior here?
-    else:
-        # Get coping advice based on emotion if no escalation needed
-        advice = get_coping_advice(emotion)
-        print(f"   [Suggested Action/Reflection: {advice}]")
+        print(f"*-* ESCALATION DETECTED (alert {alert['id']}, {alert['latency_ms']:.1f} ms) *-*")
+        print("   [Placeholder: Link/Number to Crisis Support]")
+
+    # Coping advice (crisis-support lines on escalation): a lookup in the precomputed table, no LLM call
+    advice = get_coping_advice(emotion, escalation_needed, advice_table)
+    print(f"   [Suggested Action/Reflection: {advice}]")
+    publish_event("advice", emotion=emotion, advice=advice, escalation=escalation_needed)
 
     # TODO: Future integration - maybe send advice back to agent to speak?
-    # TODO: Future integration - update UI with emotion/advice
+
+def process_agent_response(response: str):
+    print(f"Agent: {response}")
+    rolling_analyzer.add_turn("agent", response)
 
 # Initialize the Conversation instance
 conversation = Conversation(
@@ -67,11 +106,11 @@ conversation = Conversation(
     # Assume auth is required when API_KEY is set
     requires_auth=bool(api_key),
 
-    # Use the default audio interface
-    audio_interface=DefaultAudioInterface(),
+    # Microphone/speakers by default; AUDIO_INPUT_WAV streams a WAV file instead (headless)
+    audio_interface=make_audio_interface(),
 
     # Simple callbacks that print the conversation to the console
-    callback_agent_response=lambda response: print(f"Agent: {response}"),
+    callback_agent_response=process_agent_response,
     callback_agent_response_correction=lambda original, corrected: print(f"Agent: {original} -> {corrected}"),
     # MODIFIED: Use the new processing function for user transcript
     callback_user_transcript=process_user_transcript,
@@ -80,6 +119,34 @@ conversation = Conversation(
     # callback_latency_measurement=lambda latency: print(f"Latency: {latency}ms"),
 )
 
+# The conversation is claimed as soon as the SDK knows its id and held for the whole call,
+# so the watcher (started by the post-call webhook) leaves it to this process and the
+# rolling profile is used. The id comes from the SDK's private `_conversation_id`, set
+# once the session is initiated; without it, the claim waits for the session to end.
+live_lease = ExitStack()
+live_conversation_id = None
+session_over = threading.Event()
+
+def claim_live_conversation(timeout: float = 30.0):
+    global live_conversation_id
+    deadline = time.time() + timeout
+    while not session_over.is_set() and time.time() < deadline:
+        session_id = getattr(conversation, "_conversation_id", None)
+        if session_id:
+            link_live_alerts(session_id)
+            if claim(session_id):
+                live_conversation_id = session_id
+                live_lease.enter_context(keep_alive(session_id))
+                print(f"--- Claimed conversation {session_id} for post-call processing ---")
+            else:
+                print(f"Warning: Conversation {session_id} is already claimed by another process.")
+            return
+        session_over.wait(0.1)
+    print("Warning: Conversation ID not available during the call; claiming it after the session ends.")
+
+# Serve live emotion events (SSE) to the frontend while the session runs
+start_event_server()
+
 # Start the conversation
 print("Starting AI Companion session...")
 print("Speak into your microphone. Press Ctrl+C to end.")
@@ -90,9 +157,12 @@ transcript_filepath = None
 signal.signal(signal.SIGINT, lambda sig, frame: conversation.end_session())
 
 recovered_id = False # Flag to indicate if we used the recovery method
+claim_thread = None
 
 try:
     conversation.start_session()
+    claim_thread = threading.Thread(target=claim_live_conversation, daemon=True, name="live-claim")
+    claim_thread.start()
     print("Waiting for session to end...")
     conversation_id = conversation.wait_for_session_end()
     print(f"Session ended. Conversation ID: {conversation_id}")
@@ -116,6 +186,8 @@ except Exception as e:
     else:
         print("Could not retrieve Conversation ID directly after unexpected error.")
 
+call_ended_at = time.time() # Start of the "call ended -> KB updated" trace
+
 # --- NEW: Recovery Logic --- 
 if not conversation_id:
     print("\n--- Attempting to recover latest conversation ID via API list... ---")
@@ -136,55 +208,82 @@ if not conversation_id:
         print(f"--- Error calling list_conversations API: {api_err} ---")
 # --- End Recovery Logic ---
 
+if conversation_id and not recovered_id: # A recovered ID may not be this session's call
+    link_live_alerts(conversation_id) # So the watcher doesn't alert (and page) a second time
+
 # --- Post-Conversation Processing --- 
-if conversation_id:
+# Claim the conversation so the watcher (or another worker) doesn't process it a second time.
+# Usually it was claimed during the call already, and this only renews the lease.
+session_over.set()
+if claim_thread:
+    claim_thread.join(timeout=5)
+claimed = bool(conversation_id) and claim(conversation_id)
+live_lease.close() # Post-processing keeps the lease alive from here on
+if live_conversation_id and live_conversation_id != conversation_id:
+    release(live_conversation_id) # The ID at session end wins (e.g. a recovered ID)
+
+if conversation_id and not claimed:
+    print(f"--- Skipping post-conversation processing: {conversation_id} is already claimed or processed. ---")
+
+elif conversation_id:
     print("\n--- Starting Post-Conversation Processing --- ")
     if recovered_id:
         print("(Using recovered Conversation ID)")
-    try:
-        # 1. Get and Save Transcript
-        print(f"Fetching details for conversation: {conversation_id}")
-        # Increased sleep slightly just in case recovery method introduces timing issues
-        time.sleep(3) 
-        conv_data = client.conversational_ai.get_conversation(conversation_id)
-        transcript = conv_data.get('transcript', None)
-
-        if transcript:
-            history = []
-            for entry in transcript:
-                role = "User" if entry.get('role') == 'user' else "Agent"
-                message = entry.get('message', '[message missing]')
-                history.append(f"{role}: {message}")
-
-            conv_dir = "conversations"
-            os.makedirs(conv_dir, exist_ok=True)
-            timestamp = time.strftime("%Y%m%d_%H%M%S")
-            transcript_filename = f"conversation_{conversation_id}_{timestamp}.txt"
-            transcript_filepath = os.path.join(conv_dir, transcript_filename)
-            
-            with open(transcript_filepath, 'w', encoding='utf-8') as f:
-                f.write('\n'.join(history))
-            print(f"--- Conversation successfully saved to {transcript_filepath} ---")
-        else:
-             print("Warning: Transcript not found or empty in API response. Skipping analysis and upload.")
-             transcript_filepath = None # Ensure path is None if not saved
+    # Trace keyed by conversation_id; analyzer/uploader spans attach to it automatically.
+    # The lease is renewed in the background so slow steps don't let the watcher take it over.
+    with keep_alive(conversation_id), trace_conversation(conversation_id, call_ended_at=call_ended_at):
+        # The delta pass over the last few turns runs while the transcript is fetched
+        finalize_executor = ThreadPoolExecutor(max_workers=1)
+        rolling_profile_future = finalize_executor.submit(rolling_analyzer.finalize)
+        try:
+            # 1. Get and Save Transcript
+            print(f"Fetching details for conversation: {conversation_id}")
+            # Increased sleep slightly just in case recovery method introduces timing issues
+            time.sleep(3) 
+            with span("fetch"):
+                conv_data = client.conversational_ai.get_conversation(conversation_id)
+            transcript = conv_data.get('transcript', None)
 
-        # 2. Analyze Transcript and Save Profile (if transcript saved)
-        profile_filepath = None
-        if transcript_filepath:
-            profile_filepath = analyze_and_save_profile(transcript_filepath)
+            if transcript:
+                # Saved as structured, compressed turns (see transcript_store.py)
+                with span("transcript_save"):
+                    transcript_filepath = save_transcript(conversation_id, transcript)
+                print(f"--- Conversation successfully saved to {transcript_filepath} ---")
+            else:
+                 print("Warning: Transcript not found or empty in API response. Skipping analysis and upload.")
+                 transcript_filepath = None # Ensure path is None if not saved
+
+            # 2. Analyze Transcript and Save Profile (if transcript saved)
+            profile_filepath = None
+            if transcript_filepath:
+                with span("rolling_finalize"):
+                    rolling_profile = rolling_profile_future.result()
+                if rolling_profile and not recovered_id: # A recovered ID may not be this session's call
+                    print("--- Using the profile built during the call ---")
+                    with span("save_profile"):
+                        profile_filepath = save_profile(rolling_profile, transcript_filepath)
+                else:
+                    # Rolling analysis unavailable or incomplete: analyze the saved transcript in full
+                    profile_filepath = analyze_and_save_profile(transcript_filepath)
         
-        # 3. Upload Profile to Knowledge Base (if profile saved)
-        if profile_filepath:
-            upload_profile_file(profile_filepath)
-        else:
-            print("--- Skipping knowledge base upload as profile was not generated or transcript failed. ---")
+            # 3. Upload Profile to Knowledge Base (if profile saved)
+            if profile_filepath:
+                upload_profile_file(profile_filepath)
+            else:
+                print("--- Skipping knowledge base upload as profile was not generated or transcript failed. ---")
+
+            if transcript_filepath:
+                complete(conversation_id)
+            else:
+                release(conversation_id) # Let the watcher retry once the transcript is available
             
-    except Exception as e:
-        import traceback
-        print(f"--- Error during post-conversation processing: {str(e)} ---")
-        print("Traceback:")
-        traceback.print_exc()
+        except Exception as e:
+            release(conversation_id)
+            import traceback
+            print(f"--- Error during post-conversation processing: {str(e)} ---")
+            print("Traceback:")
+            traceback.print_exc()
+        finalize_executor.shutdown(wait=False)
     
     print("--- Post-Conversation Processing Finished --- ")
 
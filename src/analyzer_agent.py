@@ -1,17 +1,40 @@
 import os
 import json
-import time
 import argparse
-from groq import Groq
 from dotenv import load_dotenv
 
+try:
+    from src.transcript_store import (read_transcript_text, transcript_basename, transcript_dir, is_archive_ref,
+                                      list_transcript_files)
+    from src.prompt_compaction import compact_transcript
+    from src.profile_store import write_profile, ManifestReader
+    from src.profile_analytics import record_profile
+    from src.coping_strategies import refresh_advice_table
+    from src.profile_schema import parse_profile, PARSE_OK, PARSE_FAILED
+    from src.metrics import (GROQ_REQUEST_SECONDS, GROQ_TOKENS, PROFILE_PARSE_RESULTS,
+                             PROMPT_TOKENS_ESTIMATED)
+    from src.tracing import span
+except ImportError:
+    from transcript_store import (read_transcript_text, transcript_basename, transcript_dir, is_archive_ref,
+                                  list_transcript_files)
+    from prompt_compaction import compact_transcript
+    from profile_store import write_profile, ManifestReader
+    from profile_analytics import record_profile
+    from coping_strategies import refresh_advice_table
+    from profile_schema import parse_profile, PARSE_OK, PARSE_FAILED
+    from metrics import (GROQ_REQUEST_SECONDS, GROQ_TOKENS, PROFILE_PARSE_RESULTS,
+                         PROMPT_TOKENS_ESTIMATED)
+    from tracing import span
+
 load_dotenv() # Load .env file for API keys
 
+# Groq's JSON mode guarantees a syntactically valid object; set GROQ_JSON_MODE=0 for models without it
+GROQ_JSON_MODE = os.getenv("GROQ_JSON_MODE", "1") != "0"
+
 def read_transcript(filepath: str) -> str:
-    """Reads the content of a transcript file."""
+    """Reads the content of a transcript file (structured .jsonl.gz or legacy .txt)."""
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            return f.read()
+        return read_transcript_text(filepath)
     except FileNotFoundError:
         print(f"Error: Transcript file not found at {filepath}")
         return None
@@ -19,6 +42,11 @@ def read_transcript(filepath: str) -> str:
         print(f"Error reading transcript file {filepath}: {e}")
         return None
 
+def groq_client(api_key: str):
+    """Creates a Groq client. The SDK is imported here, on first use, to keep imports of this module fast."""
+    from groq import Groq
+    return Groq(api_key=api_key)
+
 def analyze_transcript_with_llama(transcript: str, api_key: str) -> dict | None:
     """
     Analyzes the transcript using Llama 4 via Groq API to extract profile info.
@@ -27,13 +55,20 @@ def analyze_transcript_with_llama(transcript: str, api_key: str) -> dict | None:
         print("Error: GROQ_API_KEY not found in environment variables.")
         return None
         
-    client = Groq(api_key=api_key)
+    client = groq_client(api_key)
+
+    # Agent chatter, filler and repeats add latency and cost without helping the profile
+    transcript, compaction = compact_transcript(transcript)
+    PROMPT_TOKENS_ESTIMATED.inc(compaction["tokens_before"], stage="raw")
+    PROMPT_TOKENS_ESTIMATED.inc(compaction["tokens_after"], stage="compacted")
+    print(f"--- Transcript compacted: ~{compaction['tokens_before']} -> ~{compaction['tokens_after']} tokens "
+          f"({compaction['turns_before']} -> {compaction['turns_after']} turns) ---")
 
     # --- Prompt Engineering ---
     # This is the crucial part. We need to instruct Llama 4 precisely
     # what to extract and the exact JSON format required.
     prompt = f"""
-Analyze the following conversation transcript. Based *only* on the content of the transcript, generate a JSON object containing the following fields:
+Analyze the following conversation transcript (agent lines may be shortened). Based *only* on the content of the transcript, generate a JSON object containing the following fields:
 - "user_name": Infer the user's name if mentioned, otherwise use "Unknown".
 - "mood": Identify the dominant overall mood (e.g., "lonely", "anxious", "grateful", "neutral", "sad", "frustrated", "happy").
 - "emotion_trend": Describe any noticeable shift in emotion during the conversation (e.g., "started sad, ended neutral", "consistently positive", "increasing frustration").
@@ -55,70 +90,130 @@ JSON Output:
 """
 
     print("\n--- Sending request to Groq API for analysis... ---")
+    with span("groq", prompt_tokens_raw=compaction["tokens_before"], prompt_tokens_compacted=compaction["tokens_after"]):
+        return request_profile(client, prompt)
+
+def request_profile(client, prompt: str) -> dict | None:
+    """
+    Sends a profile prompt to Groq and returns the schema-validated profile. Malformed
+    or truncated JSON is repaired locally (see profile_schema.py) rather than re-requested.
+    """
+    response_content = None
     try:
-        completion = client.chat.completions.create(
-            # model="meta-llama/llama-4-scout-17b-16e-instruct", # Your example model
-            model="llama3-70b-8192", # Using a generally available Llama 3 model on Groq
-            messages=[
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-                # No assistant message needed here as we provide full instructions
-            ],
-            temperature=0.5, # Lower temperature for more deterministic JSON output
-            max_tokens=1024, # Adjust as needed
-            top_p=1,
-            stream=False, # Get the full response at once for easier JSON parsing
-            stop=None, # Model should stop naturally after generating JSON
-            # response_format={"type": "json_object"} # If supported by model/Groq, enforce JSON output
-        )
+        with GROQ_REQUEST_SECONDS.time():
+            completion = client.chat.completions.create(
+                # model="meta-llama/llama-4-scout-17b-16e-instruct", # Your example model
+                model="llama3-70b-8192", # Using a generally available Llama 3 model on Groq
+                messages=[
+                    {
+                        "role": "user",
+                        "content": prompt
+                    }
+                    # No assistant message needed here as we provide full instructions
+                ],
+                temperature=0.5, # Lower temperature for more deterministic JSON output
+                max_tokens=1024, # Adjust as needed
+                top_p=1,
+                stream=False, # Get the full response at once for easier JSON parsing
+                stop=None, # Model should stop naturally after generating JSON
+                **({"response_format": {"type": "json_object"}} if GROQ_JSON_MODE else {}),
+            )
+
+        usage = getattr(completion, 'usage', None)
+        if usage:
+            GROQ_TOKENS.inc(getattr(usage, 'prompt_tokens', 0) or 0, kind="prompt")
+            GROQ_TOKENS.inc(getattr(usage, 'completion_tokens', 0) or 0, kind="completion")
 
         response_content = completion.choices[0].message.content
         print("--- Groq API Analysis Response Received ---")
         # print(response_content) # Optional: print raw response for debugging
 
-        # Attempt to parse the JSON response
-        # It might be necessary to clean up potential markdown code blocks (```json ... ```)
-        if response_content.startswith("```json"):
-             response_content = response_content[7:-3].strip() # Remove markdown fences
-        elif response_content.startswith("```"):
-             response_content = response_content[3:-3].strip()
-
-        profile_data = json.loads(response_content)
+        # Fences, surrounding prose, single quotes and truncation are fixed up locally;
+        # fields are coerced to the profile schema with defaults for anything missing
+        profile_data, result = parse_profile(response_content)
+        PROFILE_PARSE_RESULTS.inc(result=result)
+        if result == PARSE_FAILED:
+            print("Error: Could not parse or repair the JSON response from Groq API.")
+            print("Received content was:\n", response_content)
+            return None
+        if result != PARSE_OK:
+            print(f"--- Profile JSON {result} to match the schema ---")
         return profile_data
 
-    except json.JSONDecodeError as e:
-        print(f"Error: Failed to decode JSON response from Groq API: {e}")
-        print("Received content was:\n", response_content)
-        return None
     except Exception as e:
         print(f"Error interacting with Groq API: {e}")
         import traceback
         traceback.print_exc()
         return None
 
+def update_profile_with_llama(previous_profile: dict | None, new_turns: str, api_key: str) -> dict | None:
+    """
+    Incremental analysis: folds a window of new turns into the profile built from
+    the earlier part of the same conversation. With no previous profile this is a
+    normal full analysis of the window.
+    """
+    if previous_profile is None:
+        return analyze_transcript_with_llama(new_turns, api_key)
+    if not api_key:
+        print("Error: GROQ_API_KEY not found in environment variables.")
+        return None
+
+    client = groq_client(api_key)
+    new_turns, compaction = compact_transcript(new_turns)
+    PROMPT_TOKENS_ESTIMATED.inc(compaction["tokens_before"], stage="raw")
+    PROMPT_TOKENS_ESTIMATED.inc(compaction["tokens_after"], stage="compacted")
+
+    prompt = f"""
+Below is a JSON profile built from the earlier part of an ongoing conversation, followed by the turns that came after it.
+Update the profile so it describes the *whole* conversation so far and return the complete updated JSON object with the same fields
+("user_name", "mood", "emotion_trend", "topics" (max 5), "profile_tags" (3-5 hashtags), "persona_summary").
+
+**IMPORTANT RULES:**
+1. Respond *only* with the valid JSON object. Do not include any explanatory text before or after the JSON.
+2. Keep earlier information unless the new turns contradict it; "mood" and "emotion_trend" should reflect how the conversation is developing.
+3. Base the analysis *strictly* on the profile and transcript provided. Do not invent information.
+
+Profile so far:
+{json.dumps(previous_profile, indent=2)}
+
+New turns:
+---
+{new_turns}
+---
+
+JSON Output:
+"""
+    print(f"\n--- Sending incremental analysis request to Groq API (~{compaction['tokens_after']} transcript tokens)... ---")
+    with span("groq_delta", prompt_tokens_raw=compaction["tokens_before"], prompt_tokens_compacted=compaction["tokens_after"]):
+        return request_profile(client, prompt)
+
 def save_profile(profile_data: dict, transcript_filepath: str) -> str | None:
-    """Saves the generated profile data to a JSON file. Returns the path if successful."""
+    """
+    Saves the generated profile data into the sharded profile store (atomic write +
+    manifest entry, see profile_store.py). Returns the path if successful.
+    """
     try:
         # Use absolute path of transcript to find the base directory
-        abs_transcript_path = os.path.abspath(transcript_filepath)
-        base_dir = os.path.dirname(abs_transcript_path)
+        # (for archived transcripts, the conversations dir the archive lives in)
+        base_dir = transcript_dir(os.path.abspath(transcript_filepath))
         project_root = os.path.dirname(base_dir) # Assumes conversations dir is one level down
         profile_dir = os.path.join(project_root, "user_profiles")
-        os.makedirs(profile_dir, exist_ok=True)
 
-        timestamp = time.strftime("%Y%m%d_%H%M%S")
         # Extract original conversation ID/timestamp from transcript filename for linkage
-        transcript_filename = os.path.basename(transcript_filepath)
-        # Handle potential '.txt' extension
-        base_transcript_name = transcript_filename.rsplit('.', 1)[0]
-        profile_filename = f"user_profile_{base_transcript_name}_{timestamp}.json"
-        profile_filepath = os.path.join(profile_dir, profile_filename)
-
-        with open(profile_filepath, 'w', encoding='utf-8') as f:
-            json.dump(profile_data, f, indent=2)
+        # Handle both '.txt' and '.jsonl.gz' extensions
+        base_transcript_name = transcript_basename(transcript_filepath)
+        profile_filepath = write_profile(profile_data, base_transcript_name, profile_dir)
         print(f"--- Successfully saved user profile to {profile_filepath} ---")
+        try:
+            # Topic/tag counters for /analytics/topics; never worth losing the saved profile over
+            record_profile(profile_data, os.path.basename(profile_filepath))
+        except Exception as e:
+            print(f"Warning: Could not update profile analytics: {e}")
+        try:
+            # Personalized advice for the next live call (coping_strategies.py)
+            refresh_advice_table(profile_data)
+        except Exception as e:
+            print(f"Warning: Could not refresh coping advice table: {e}")
         return profile_filepath
     except Exception as e:
         print(f"Error saving user profile: {e}")
@@ -128,7 +223,8 @@ def save_profile(profile_data: dict, transcript_filepath: str) -> str | None:
 def analyze_and_save_profile(transcript_filepath: str) -> str | None:
     """Reads a transcript, analyzes it, and saves the profile. Returns profile path."""
     print(f"--- Starting analysis for transcript: {transcript_filepath} ---")
-    transcript_content = read_transcript(transcript_filepath)
+    with span("read_transcript"):
+        transcript_content = read_transcript(transcript_filepath)
     if not transcript_content:
         return None
 
@@ -141,20 +237,48 @@ def analyze_and_save_profile(transcript_filepath: str) -> str | None:
     profile_data = analyze_transcript_with_llama(transcript_content, groq_api_key)
 
     if profile_data:
-        profile_filepath = save_profile(profile_data, transcript_filepath)
+        with span("save_profile"):
+            profile_filepath = save_profile(profile_data, transcript_filepath)
         return profile_filepath
     else:
         print("--- Failed to generate user profile data from analysis. ---")
         return None
 
-# Keep the main block for potential direct script execution/testing
-if __name__ == "__main__":
+def analyze_missing_profiles(conv_dir: str = "conversations", limit: int | None = None) -> int:
+    """
+    Analyzes saved transcripts that have no profile yet (checked against the profile
+    manifest), oldest first, in this process. Returns the number of profiles saved.
+    """
+    profile_dir = os.path.join(os.path.dirname(os.path.abspath(conv_dir)), "user_profiles")
+    analyzed_sources = {entry["source"] for entry in ManifestReader(profile_dir).read_new()}
+    pending = [path for path in sorted(list_transcript_files(conv_dir), key=transcript_basename)
+               if transcript_basename(path) not in analyzed_sources]
+    saved = 0
+    for attempt, transcript_filepath in enumerate(pending):
+        if limit is not None and attempt >= limit:
+            break
+        if transcript_basename(transcript_filepath) in analyzed_sources:
+            continue # Same conversation kept as both .txt and .jsonl.gz
+        if analyze_and_save_profile(transcript_filepath):
+            analyzed_sources.add(transcript_basename(transcript_filepath))
+            saved += 1
+    print(f"--- Backfill complete: {saved} new profiles ({len(pending)} transcripts without one) ---")
+    return saved
+
+def main(argv: list | None = None):
     parser = argparse.ArgumentParser(description="Analyze conversation transcript using Llama 4 via Groq.")
-    parser.add_argument("transcript_file", help="Path to the conversation transcript .txt file.")
-    args = parser.parse_args()
+    parser.add_argument("transcript_file", help="Path to the conversation transcript (.jsonl.gz or .txt) file, "
+                                                "or an archived one as <archive>.cseg#<transcript name>.")
+    args = parser.parse_args(argv)
 
     # Validate input file path
-    if not os.path.exists(args.transcript_file) or not args.transcript_file.endswith(".txt"):
+    if is_archive_ref(args.transcript_file):
+        analyze_and_save_profile(args.transcript_file)
+    elif not os.path.exists(args.transcript_file) or not args.transcript_file.endswith((".txt", ".jsonl.gz")):
         print(f"Error: Invalid transcript file path: {args.transcript_file}")
     else:
-        analyze_and_save_profile(args.transcript_file) 
\ No newline at end of file
+        analyze_and_save_profile(args.transcript_file)
+
+# Keep the main block for potential direct script execution/testing
+if __name__ == "__main__":
+    main()
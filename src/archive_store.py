@@ -0,0 +1,341 @@
+import os
+import gzip
+import json
+import time
+import argparse
+from functools import lru_cache
+
+try:
+    from src.transcript_store import (TRANSCRIPT_EXT, INDEX_EXT, ARCHIVE_REF_SEP, transcript_basename, index_path_for,
+                                      load_index, parse_text_transcript, _decode_segment)
+    from src.profile_store import PROFILE_DIR, ManifestReader, atomic_write_json
+except ImportError:
+    from transcript_store import (TRANSCRIPT_EXT, INDEX_EXT, ARCHIVE_REF_SEP, transcript_basename, index_path_for,
+                                  load_index, parse_text_transcript, _decode_segment)
+    from profile_store import PROFILE_DIR, ManifestReader, atomic_write_json
+
+# Tiered retention for conversations/ and user_profiles/:
+#   hot  - one file per call, as written by the pipeline
+#   warm - after *_ARCHIVE_AFTER_DAYS, rolled into one compressed archive per month
+#          (<dir>/archive/<YYYYMM>.cseg / .pseg) with a side index (.idx.json)
+#   gone - after *_RETENTION_DAYS (0 = keep forever), purged
+# Transcript files are already a series of gzip members, so they are appended to
+# the archive byte-for-byte and keep their segment index; readers address an
+# archived transcript as "<archive path>#<transcript name>" and transcript_store
+# resolves such references transparently. Profiles are batched PROFILES_PER_MEMBER
+# to a gzip member and looked up by their manifest path (profile_store.load_profile).
+# Purging works per archive: a month is deleted once its newest entry has expired.
+ARCHIVE_DIRNAME = "archive"
+TRANSCRIPT_ARCHIVE_EXT = ".cseg"
+PROFILE_ARCHIVE_EXT = ".pseg"
+PROFILES_PER_MEMBER = 256
+ARCHIVE_VERSION = 1
+
+TRANSCRIPT_ARCHIVE_AFTER_DAYS = int(os.getenv("TRANSCRIPT_ARCHIVE_AFTER_DAYS", "30"))
+TRANSCRIPT_RETENTION_DAYS = int(os.getenv("TRANSCRIPT_RETENTION_DAYS", "0"))
+PROFILE_ARCHIVE_AFTER_DAYS = int(os.getenv("PROFILE_ARCHIVE_AFTER_DAYS", "30"))
+PROFILE_RETENTION_DAYS = int(os.getenv("PROFILE_RETENTION_DAYS", "0"))
+
+_DAY = 24 * 3600
+_index_cache = {} # archive index path -> ((mtime_ns, size), index)
+
+# --- Archive files ---
+
+def archive_index_path(archive_path: str) -> str:
+    return archive_path + INDEX_EXT
+
+def load_archive_index(archive_path: str) -> dict:
+    """Loads (and caches until it changes) the index of an archive. Empty if it doesn't exist."""
+    path = archive_index_path(archive_path)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return {"version": ARCHIVE_VERSION, "newest_ts": 0, "entries": {}}
+    key = (stat.st_mtime_ns, stat.st_size)
+    cached = _index_cache.get(path)
+    if cached and cached[0] == key:
+        return cached[1]
+    with open(path, 'r', encoding='utf-8') as f:
+        index = json.load(f)
+    _index_cache[path] = (key, index)
+    return index
+
+def _append_members(archive_path: str, blobs: list) -> list:
+    """Appends blobs to the archive and fsyncs. Returns their offsets."""
+    os.makedirs(os.path.dirname(archive_path), exist_ok=True)
+    offsets = []
+    with open(archive_path, 'ab') as f:
+        offset = f.seek(0, os.SEEK_END)
+        for blob in blobs:
+            offsets.append(offset)
+            f.write(blob)
+            offset += len(blob)
+        f.flush()
+        os.fsync(f.fileno())
+    return offsets
+
+def _read_member(archive_path: str, offset: int, length: int) -> bytes:
+    with open(archive_path, 'rb') as f:
+        f.seek(offset)
+        return f.read(length)
+
+def list_archives(directory: str, ext: str) -> list:
+    archive_dir = os.path.join(directory, ARCHIVE_DIRNAME)
+    if not os.path.isdir(archive_dir):
+        return []
+    with os.scandir(archive_dir) as entries:
+        return sorted(e.path for e in entries if e.name.endswith(ext))
+
+def _month(ts: float) -> str:
+    return time.strftime("%Y%m", time.localtime(ts))
+
+def _remove_quietly(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+# --- Transcripts ---
+
+def split_ref(ref: str) -> tuple[str, str]:
+    archive_path, key = ref.rsplit(ARCHIVE_REF_SEP, 1)
+    return archive_path, key
+
+def transcript_created_at(filepath: str) -> float:
+    """Save time from the conversation_<id>_<YYYYMMDD>_<HHMMSS> name, falling back to mtime."""
+    parts = transcript_basename(filepath).split("_")
+    try:
+        return time.mktime(time.strptime(f"{parts[-2]}_{parts[-1]}", "%Y%m%d_%H%M%S"))
+    except (ValueError, IndexError):
+        return os.path.getmtime(filepath)
+
+def _transcript_files(conv_dir: str) -> list:
+    if not os.path.isdir(conv_dir):
+        return []
+    with os.scandir(conv_dir) as entries:
+        return [e.path for e in entries if e.is_file() and e.name.endswith((TRANSCRIPT_EXT, ".txt"))]
+
+def archive_transcripts(conv_dir: str = "conversations", older_than_days: int = TRANSCRIPT_ARCHIVE_AFTER_DAYS,
+                        dry_run: bool = False) -> int:
+    """Rolls transcripts older than the cutoff into monthly archives. Returns the number archived."""
+    cutoff = time.time() - older_than_days * _DAY
+    by_month = {}
+    for path in _transcript_files(conv_dir):
+        created_at = transcript_created_at(path)
+        if created_at < cutoff:
+            by_month.setdefault(_month(created_at), []).append((path, created_at))
+    if dry_run:
+        return sum(len(files) for files in by_month.values())
+
+    archived = 0
+    for month, files in sorted(by_month.items()):
+        archive_path = os.path.join(conv_dir, ARCHIVE_DIRNAME, month + TRANSCRIPT_ARCHIVE_EXT)
+        index = load_archive_index(archive_path)
+        blobs, pending = [], []
+        for path, created_at in sorted(files):
+            key = transcript_basename(path)
+            if key in index["entries"]:
+                pending.append((path, key, None)) # Archived by an interrupted run; only the cleanup is left
+                continue
+            with open(path, 'rb') as f:
+                raw = f.read()
+            if path.endswith(TRANSCRIPT_EXT):
+                file_index = load_index(path) or {}
+                entry = {"format": "jsonl", "segments": file_index.get("segments"),
+                         "turn_count": file_index.get("turn_count"),
+                         "conversation_id": file_index.get("conversation_id")}
+                blob = raw
+            else:
+                entry = {"format": "txt"}
+                blob = gzip.compress(raw, mtime=0)
+            entry.update({"length": len(blob), "ts": created_at})
+            blobs.append(blob)
+            pending.append((path, key, entry))
+
+        new_entries = [(key, entry) for _, key, entry in pending if entry is not None]
+        for (key, entry), offset in zip(new_entries, _append_members(archive_path, blobs)):
+            entry["offset"] = offset
+            index["entries"][key] = entry
+            index["newest_ts"] = max(index["newest_ts"], entry["ts"])
+        # Index first, originals last: a crash in between leaves files that the next run just removes
+        atomic_write_json(index, archive_index_path(archive_path), indent=None)
+        for path, _, _ in pending:
+            _remove_quietly(path)
+            if path.endswith(TRANSCRIPT_EXT):
+                _remove_quietly(index_path_for(path))
+            archived += 1
+    return archived
+
+def _archived_entry(ref: str) -> tuple[str, dict]:
+    archive_path, key = split_ref(ref)
+    entry = load_archive_index(archive_path)["entries"].get(key)
+    if entry is None:
+        raise FileNotFoundError(f"{key} not found in {archive_path}")
+    return archive_path, entry
+
+def read_archived_turns(ref: str, start: int = 0, stop: int | None = None) -> list:
+    """read_turns() for an archived transcript: only the needed segments are decompressed."""
+    archive_path, entry = _archived_entry(ref)
+    if entry["format"] == "txt":
+        raw = _read_member(archive_path, entry["offset"], entry["length"])
+        return parse_text_transcript(gzip.decompress(raw).decode('utf-8'))[start:stop]
+    if not entry.get("segments"):
+        raw = _read_member(archive_path, entry["offset"], entry["length"])
+        return _decode_segment(raw)[start:stop]
+
+    if stop is None or stop > entry["turn_count"]:
+        stop = entry["turn_count"]
+    turns = []
+    with open(archive_path, 'rb') as f:
+        for segment in entry["segments"]:
+            seg_first = segment["first_turn"]
+            if seg_first + segment["turn_count"] <= start or seg_first >= stop:
+                continue
+            f.seek(entry["offset"] + segment["offset"])
+            turns.extend(t for t in _decode_segment(f.read(segment["length"])) if start <= t["turn"] < stop)
+    return turns
+
+def archived_transcript_index(ref: str) -> dict | None:
+    """load_index() for an archived transcript."""
+    try:
+        _, entry = _archived_entry(ref)
+    except FileNotFoundError:
+        return None
+    if entry["format"] != "jsonl" or entry.get("turn_count") is None:
+        return None
+    return {"conversation_id": entry.get("conversation_id"), "turn_count": entry["turn_count"],
+            "segments": entry.get("segments")}
+
+def find_archived_transcripts(conversation_id: str, conv_dir: str = "conversations") -> list:
+    """References to every archived transcript of a conversation."""
+    prefix = f"conversation_{conversation_id}_"
+    refs = []
+    for archive_path in list_archives(conv_dir, TRANSCRIPT_ARCHIVE_EXT):
+        for key in load_archive_index(archive_path)["entries"]:
+            if key.startswith(prefix):
+                refs.append(f"{archive_path}{ARCHIVE_REF_SEP}{key}")
+    return refs
+
+# --- Profiles ---
+
+def profile_archive_path(profile_dir: str, created: str) -> str:
+    """Archive for a profile, from its manifest "created" stamp (YYYYMMDD_HHMMSS)."""
+    return os.path.join(profile_dir, ARCHIVE_DIRNAME, created[:6] + PROFILE_ARCHIVE_EXT)
+
+@lru_cache(maxsize=16)
+def _profile_member(archive_path: str, offset: int, length: int) -> tuple:
+    # Sequential readers (mood trends) hit the same member up to PROFILES_PER_MEMBER times in a row
+    raw = _read_member(archive_path, offset, length)
+    return tuple(json.loads(line) for line in gzip.decompress(raw).decode('utf-8').splitlines() if line)
+
+def load_archived_profile(entry: dict, profile_dir: str = PROFILE_DIR) -> dict | None:
+    archive_path = profile_archive_path(profile_dir, entry["created"])
+    location = load_archive_index(archive_path)["entries"].get(entry["path"])
+    if location is None:
+        return None
+    return _profile_member(archive_path, location["offset"], location["length"])[location["line"]]
+
+def archive_profiles(profile_dir: str = PROFILE_DIR, older_than_days: int = PROFILE_ARCHIVE_AFTER_DAYS,
+                     dry_run: bool = False) -> int:
+    """Rolls profiles older than the cutoff (found via the manifest) into monthly archives."""
+    cutoff = time.time() - older_than_days * _DAY
+    reader = ManifestReader(profile_dir)
+    by_month = {}
+    for entry in reader.read_new():
+        if entry["ts"] < cutoff and os.path.exists(reader.profile_path(entry)):
+            by_month.setdefault(entry["created"][:6], []).append(entry)
+    if dry_run:
+        return sum(len(entries) for entries in by_month.values())
+
+    archived = 0
+    for month, entries in sorted(by_month.items()):
+        archive_path = profile_archive_path(profile_dir, month)
+        index = load_archive_index(archive_path)
+        members, locations, done = [], [], []
+        for first in range(0, len(entries), PROFILES_PER_MEMBER):
+            lines = []
+            for entry in entries[first:first + PROFILES_PER_MEMBER]:
+                path = reader.profile_path(entry)
+                done.append(path)
+                if entry["path"] in index["entries"]:
+                    continue
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        profile_data = json.load(f)
+                except (OSError, json.JSONDecodeError) as e:
+                    print(f"Warning: Not archiving unreadable profile {path}: {e}")
+                    done.pop()
+                    continue
+                locations.append((entry, len(members), len(lines)))
+                lines.append(json.dumps(profile_data, ensure_ascii=False))
+            if lines:
+                members.append(gzip.compress(("\n".join(lines) + "\n").encode('utf-8'), mtime=0))
+
+        offsets = _append_members(archive_path, members)
+        for entry, member, line in locations:
+            index["entries"][entry["path"]] = {"offset": offsets[member], "length": len(members[member]), "line": line}
+            index["newest_ts"] = max(index["newest_ts"], entry["ts"])
+        atomic_write_json(index, archive_index_path(archive_path), indent=None)
+        for path in done:
+            _remove_quietly(path)
+            try:
+                os.removedirs(os.path.dirname(path)) # Drop now-empty day/month/year/user shards
+            except OSError:
+                pass
+            archived += 1
+    return archived
+
+# --- Retention ---
+
+def purge_expired(directory: str, ext: str, retention_days: int, dry_run: bool = False) -> int:
+    """
+    Deletes archives whose newest entry is past retention, and hot files past
+    retention that were never archived. Returns the number of archives + files deleted.
+    """
+    if retention_days <= 0:
+        return 0
+    cutoff = time.time() - retention_days * _DAY
+    purged = 0
+    for archive_path in list_archives(directory, ext):
+        if load_archive_index(archive_path)["newest_ts"] < cutoff:
+            purged += 1
+            if not dry_run:
+                _remove_quietly(archive_path)
+                _remove_quietly(archive_index_path(archive_path))
+
+    if ext == TRANSCRIPT_ARCHIVE_EXT:
+        for path in _transcript_files(directory):
+            if transcript_created_at(path) < cutoff:
+                purged += 1
+                if not dry_run:
+                    _remove_quietly(path)
+                    _remove_quietly(index_path_for(path))
+    else:
+        reader = ManifestReader(directory)
+        for entry in reader.read_new():
+            path = reader.profile_path(entry)
+            if entry["ts"] < cutoff and os.path.exists(path):
+                purged += 1
+                if not dry_run:
+                    _remove_quietly(path)
+    return purged
+
+def run_compaction(conv_dir: str = "conversations", profile_dir: str = PROFILE_DIR, dry_run: bool = False) -> dict:
+    """Applies the configured archive and retention policies to transcripts and profiles."""
+    verb = "Would" if dry_run else "Did"
+    result = {
+        "transcripts_archived": archive_transcripts(conv_dir, TRANSCRIPT_ARCHIVE_AFTER_DAYS, dry_run),
+        "profiles_archived": archive_profiles(profile_dir, PROFILE_ARCHIVE_AFTER_DAYS, dry_run),
+        "transcripts_purged": purge_expired(conv_dir, TRANSCRIPT_ARCHIVE_EXT, TRANSCRIPT_RETENTION_DAYS, dry_run),
+        "profiles_purged": purge_expired(profile_dir, PROFILE_ARCHIVE_EXT, PROFILE_RETENTION_DAYS, dry_run),
+    }
+    print(f"--- {verb} compaction: {result} ---")
+    return result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive old transcripts/profiles and purge expired data.")
+    parser.add_argument("--conversations-dir", default="conversations")
+    parser.add_argument("--profiles-dir", default=PROFILE_DIR)
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be archived/purged.")
+    args = parser.parse_args()
+    run_compaction(args.conversations_dir, args.profiles_dir, args.dry_run)
@@ -1,4 +1,28 @@
+import os
+import re
+import json
 import random
+import argparse
+
+try:
+    from src.profile_store import PROFILE_DIR, user_key, atomic_write_json, iter_profiles
+    from src.profile_analytics import calculate_mood_score, summary
+except ImportError:
+    from profile_store import PROFILE_DIR, user_key, atomic_write_json, iter_profiles
+    from profile_analytics import calculate_mood_score, summary
+
+# Personalized advice is precomputed, not generated during the call. Every time a
+# user's profile is saved, refresh_advice_table() rebuilds their table in
+# COPING_TABLE_DIR/<user>.json: for each (emotion, escalation) pair, the lines that
+# fit their recent mood trend (last TREND_WINDOW profile scores) and their top
+# topics (profile analytics, last TOPIC_DAYS days). The live callback loads the
+# table once per session and get_coping_advice() is a dict lookup; the generic
+# lists below are the fallback when the caller isn't identified or has no table yet.
+COPING_TABLE_DIR = os.getenv("COPING_TABLE_DIR", "coping_tables")
+TREND_WINDOW = 5
+TREND_THRESHOLD = 1.0 # Score change vs. the earlier average that counts as a trend
+TOP_TOPICS = 3
+TOPIC_DAYS = 30
 
 # Dictionary mapping simple emotion labels to coping strategies or affirmations
 COPING_STRATEGIES = {
@@ -22,27 +46,218 @@ COPING_STRATEGIES = {
     ]
 }
 
-def get_coping_advice(emotion: str) -> str:
+# Used instead of the lists above when escalation keywords were detected
+ESCALATION_STRATEGIES = [
+    "You don't have to go through this alone. Please consider calling a crisis line or someone you trust right now.",
+    "Your safety matters most right now. If you're in danger, please contact emergency services.",
+    "Let's slow down together: take one deep breath, and think of one person you could reach out to today.",
+]
+
+# Lines for a user's recurring topics, matched on whole words (or their plural) in their top profile
+# topics. {topic} is the topic in the user's own profile wording.
+TOPIC_STRATEGIES = {
+    "work": {
+        "keywords": ("work", "job", "career", "boss", "deadline", "office", "colleague"),
+        "negative": ["{topic} has come up a lot lately. Could you set one small boundary there this week?",
+                     "When {topic} feels heavy, try writing down the single next step, and just that."],
+        "positive": ["Sounds like things with {topic} might be going better. What's been helping?"],
+        "neutral": ["How are things going with {topic} these days?"],
+    },
+    "sleep": {
+        "keywords": ("sleep", "insomnia", "tired", "rest", "fatigue"),
+        "negative": ["You've mentioned {topic} before. A short wind-down routine tonight might help a little."],
+        "positive": ["Good rest makes a difference. Has {topic} been a bit easier recently?"],
+        "neutral": ["How has {topic} been for you this week?"],
+    },
+    "relationships": {
+        "keywords": ("family", "partner", "relationship", "breakup", "parent", "mother", "father", "marriage"),
+        "negative": ["Things around {topic} seem to weigh on you. Is there someone you feel safe talking to about it?",
+                     "It's okay to take a little space from {topic} to look after yourself."],
+        "positive": ["It sounds like {topic} is bringing you some warmth. Hold onto those moments."],
+        "neutral": ["Last time we talked about {topic}. How is that going?"],
+    },
+    "loneliness": {
+        "keywords": ("lonely", "loneliness", "isolation", "alone", "friend", "friends", "friendship"),
+        "negative": ["Feeling alone is hard. Could you send a short message to one person today, even just to say hi?"],
+        "positive": ["It's lovely to hear you're feeling more connected. Who have you been spending time with?"],
+        "neutral": ["You've mentioned {topic} before. Have you been able to connect with anyone lately?"],
+    },
+    "study": {
+        "keywords": ("school", "exam", "study", "studies", "university", "college", "class", "homework"),
+        "negative": ["{topic} can be a lot. Try breaking the next task into a 20-minute block with a break after."],
+        "positive": ["Nice to hear {topic} is going well. What's been working for you?"],
+        "neutral": ["How are things with {topic} at the moment?"],
+    },
+    "health": {
+        "keywords": ("health", "illness", "pain", "doctor", "anxiety", "stress"),
+        "negative": ["You've been dealing with {topic}. Be gentle with yourself, and rest if you can."],
+        "positive": ["Glad to hear you're feeling a bit better with {topic}."],
+        "neutral": ["How has {topic} been treating you lately?"],
+    },
+    "money": {
+        "keywords": ("money", "finance", "finances", "debt", "rent", "bills"),
+        "negative": ["Worries about {topic} are stressful. Is there one small thing you could check or sort out today?"],
+        "positive": ["It sounds like {topic} feels a bit more under control. That's a real relief."],
+        "neutral": ["Is {topic} still on your mind?"],
+    },
+}
+
+# Lines for the direction of the user's recent mood scores ("stable" has none)
+TREND_STRATEGIES = {
+    "worsening": {
+        "negative": ["The last few weeks seem to have been harder for you. It's okay to ask for more support right now."],
+        "neutral": ["Things have felt heavier for you lately. How are you holding up today?"],
+        "positive": ["I'm glad to hear something good after a tougher stretch. What made today different?"],
+        "escalation": ["Things have been getting harder for you lately, and you don't have to carry that alone."],
+    },
+    "improving": {
+        "negative": ["Even on a hard day, remember things have been getting a little better for you lately."],
+        "neutral": ["You've been doing better recently. What's been helping you most?"],
+        "positive": ["You've been on an upward path lately. Keep doing what's working for you!"],
+    },
+}
+
+def mood_trend(scores: list) -> str:
+    """Compares the latest score with the average of the earlier ones: "worsening", "improving" or "stable"."""
+    if len(scores) < 2:
+        return "stable"
+    change = scores[-1] - sum(scores[:-1]) / (len(scores) - 1)
+    if change <= -TREND_THRESHOLD:
+        return "worsening"
+    if change >= TREND_THRESHOLD:
+        return "improving"
+    return "stable"
+
+def _table_path(user: str, table_dir: str = COPING_TABLE_DIR) -> str:
+    return os.path.join(table_dir, f"{user}.json")
+
+def _top_topics(user_name: str | None, profile_data: dict, analytics_db: str = None) -> list:
+    """The user's most frequent recent topics (profile analytics), topped up with this profile's topics."""
+    topics = []
+    try:
+        topics = [row["term"] for row in summary(TOPIC_DAYS, user_name or "unknown", TOP_TOPICS, analytics_db)["topics"]]
+    except Exception as e: # Analytics unavailable: personalize from this profile alone
+        print(f"Warning: Could not read topic analytics for coping advice: {e}")
+    for topic in profile_data.get("topics") or []:
+        topic = str(topic).strip().lower()
+        if topic and topic not in topics:
+            topics.append(topic)
+    return topics[:TOP_TOPICS]
+
+def _topic_words(topic: str) -> set:
+    """Words of a topic plus their singular ("exams" -> "exam"), so "painting" never matches "pain"."""
+    words = set(re.findall(r"[a-z]+", topic.lower()))
+    return words | {word[:-1] for word in words if word.endswith("s")}
+
+def build_advice_table(trend: str, topics: list) -> dict:
+    """Advice lines for every (emotion, escalation) pair, given a mood trend and top topics."""
+    table = {}
+    for emotion, generic in COPING_STRATEGIES.items():
+        personal = []
+        for topic in topics:
+            words = _topic_words(topic)
+            for strategy in TOPIC_STRATEGIES.values():
+                if words.intersection(strategy["keywords"]):
+                    lines = (line.format(topic=topic) for line in strategy[emotion])
+                    personal.extend(line[:1].upper() + line[1:] for line in lines)
+                    break
+        personal.extend(TREND_STRATEGIES.get(trend, {}).get(emotion, []))
+        escalation = TREND_STRATEGIES.get(trend, {}).get("escalation", []) + ESCALATION_STRATEGIES
+        table[emotion] = {"default": personal or list(generic), "escalation": escalation}
+    return table
+
+def _write_advice_table(user_name: str | None, profile_data: dict, scores: list, table_dir: str,
+                        analytics_db: str = None) -> str:
+    user = user_key(user_name)
+    topics = _top_topics(user_name, profile_data, analytics_db)
+    trend = mood_trend(scores)
+    path = _table_path(user, table_dir)
+    atomic_write_json({"user": user, "recent_scores": scores, "trend": trend, "topics": topics,
+                       "advice": build_advice_table(trend, topics)}, path)
+    return path
+
+def refresh_advice_table(profile_data: dict, table_dir: str = COPING_TABLE_DIR, analytics_db: str = None) -> str:
+    """Rebuilds the advice table of the profile's user after a profile is saved. Returns its path."""
+    user_name = profile_data.get("user_name")
+    try:
+        with open(_table_path(user_key(user_name), table_dir), 'r', encoding='utf-8') as f:
+            scores = json.load(f).get("recent_scores", [])
+    except (FileNotFoundError, json.JSONDecodeError):
+        scores = []
+    scores = (scores + [calculate_mood_score(profile_data)])[-TREND_WINDOW:]
+    return _write_advice_table(user_name, profile_data, scores, table_dir, analytics_db)
+
+def load_advice_table(user_name: str | None = None, table_dir: str = COPING_TABLE_DIR) -> dict | None:
+    """
+    Loads a user's advice table as {(emotion, escalation): [lines]} for get_coping_advice.
+    Returns None (generic advice) if there is no table yet or no user is identified:
+    the lines quote the user's own topics, so another user's table is never used.
     """
-    Selects a random coping strategy or affirmation based on the detected emotion.
+    if not user_name or user_key(user_name) == user_key(None): # "Unknown" profiles may be anyone
+        return None
+    path = _table_path(user_key(user_name), table_dir)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    table = {}
+    for emotion, lines in data["advice"].items():
+        table[(emotion, False)] = lines["default"]
+        table[(emotion, True)] = lines["escalation"]
+    return table
+
+def rebuild_advice_tables(profile_dir: str = PROFILE_DIR, table_dir: str = COPING_TABLE_DIR,
+                          analytics_db: str = None) -> int:
+    """Rebuilds every user's table from the saved profiles (in manifest order). Returns the number of users."""
+    latest = {}
+    for _, profile_data in iter_profiles(profile_dir):
+        user = user_key(profile_data.get("user_name"))
+        previous_scores = latest.get(user, (None, []))[1]
+        latest[user] = (profile_data, (previous_scores + [calculate_mood_score(profile_data)])[-TREND_WINDOW:])
+    for profile_data, scores in latest.values():
+        _write_advice_table(profile_data.get("user_name"), profile_data, scores, table_dir, analytics_db)
+    return len(latest)
+
+def get_coping_advice(emotion: str, escalation: bool = False, table: dict | None = None) -> str:
+    """
+    Selects a coping strategy or affirmation for the detected emotion.
 
     Args:
         emotion: The detected emotion label ("positive", "negative", "neutral").
+        escalation: Whether escalation keywords were detected in the turn.
+        table: A user's precomputed advice table (load_advice_table); without one,
+            the generic lists are used.
 
     Returns:
-        A randomly selected piece of advice or affirmation corresponding to the emotion,
-        or a default message if the emotion is not recognized.
+        A randomly selected piece of advice for the emotion (personalized when a
+        table is given), or a default message if the emotion is not recognized.
     """
-    advice_list = COPING_STRATEGIES.get(emotion)
+    advice_list = table.get((emotion, escalation)) if table else None
+    if not advice_list:
+        advice_list = ESCALATION_STRATEGIES if escalation else COPING_STRATEGIES.get(emotion)
     if advice_list:
         return random.choice(advice_list)
     else:
         # Fallback for unrecognized emotion strings (shouldn't happen with current setup)
         return "It's important to acknowledge how you feel. Tell me more if you like."
 
-# Example Usage (for testing)
 if __name__ == '__main__':
-    print(f"Positive advice: {get_coping_advice('positive')}")
-    print(f"Negative advice: {get_coping_advice('negative')}")
-    print(f"Neutral advice: {get_coping_advice('neutral')}")
-    print(f"Unknown advice: {get_coping_advice('confused')}") 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Per-user coping advice tables.")
+    parser.add_argument("--tables", default=COPING_TABLE_DIR)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    rebuild_parser = subparsers.add_parser("rebuild", help="Rebuild every user's table from saved profiles.")
+    rebuild_parser.add_argument("--dir", default=PROFILE_DIR)
+    show_parser = subparsers.add_parser("show", help="Print sample advice for a user.")
+    show_parser.add_argument("--user", required=True, help="User name.")
+    args = parser.parse_args()
+
+    if args.command == "rebuild":
+        print(f"--- Rebuilt coping advice tables for {rebuild_advice_tables(args.dir, args.tables)} users ---")
+    else:
+        table = load_advice_table(args.user, args.tables)
+        if table is None:
+            print("--- No advice table found; showing generic advice ---")
+        for emotion in COPING_STRATEGIES:
+            print(f"{emotion.capitalize()} advice: {get_coping_advice(emotion, table=table)}")
+        print(f"Escalation advice: {get_coping_advice('negative', True, table)}")
@@ -1,6 +1,15 @@
 import argparse
 import os
-from textblob import TextBlob
+import re
+
+try:
+    from src.metrics import TEXTBLOB_SECONDS, EMOTION_LEXICON_SECONDS
+except ImportError:
+    from metrics import TEXTBLOB_SECONDS, EMOTION_LEXICON_SECONDS
+
+# "textblob" (default) or "lexicon": the NumPy emotion-lexicon scorer in emotion_lexicon.py,
+# which is faster and also yields per-emotion scores (sadness, anxiety, loneliness, ...)
+EMOTION_SCORER = os.getenv("EMOTION_SCORER", "textblob")
 
 # Keywords that might indicate a need for escalation or specific support
 escalation_keywords = [
@@ -9,38 +18,91 @@ escalation_keywords = [
     # Add more sensitive terms carefully
     "self-harm", "hurting myself"
 ]
+# One case-insensitive pass over the text instead of a substring search per keyword
+_escalation_re = re.compile("|".join(re.escape(k) for k in sorted(escalation_keywords, key=len, reverse=True)),
+                            re.IGNORECASE)
 
-def get_emotion_and_check_escalation(text: str):
-    """Analyzes text for basic sentiment and checks for escalation keywords."""
-    # Basic Sentiment Analysis
-    blob = TextBlob(text)
-    polarity = blob.sentiment.polarity
-
-    # Categorize sentiment
+def polarity_label(polarity: float) -> str:
+    """Maps a polarity in [-1, 1] to "positive", "negative" or "neutral"."""
     if polarity > 0.1:
-        emotion_label = "positive"
+        return "positive"
     elif polarity < -0.1:
-        emotion_label = "negative"
-    else:
-        emotion_label = "neutral"
+        return "negative"
+    return "neutral"
+
+def get_polarity(text: str, scorer: str | None = None) -> float:
+    """Polarity of text in [-1, 1] from the selected scorer (default EMOTION_SCORER)."""
+    if (scorer or EMOTION_SCORER) == "lexicon":
+        return get_polarities([text], scorer="lexicon")[0]
+    from textblob import TextBlob # Deferred: loading TextBlob/NLTK dominates this module's import time
+    with TEXTBLOB_SECONDS.time():
+        return TextBlob(text).sentiment.polarity
+
+def get_polarities(texts: list, scorer: str | None = None) -> list:
+    """Polarity for many texts; the lexicon scorer handles the whole list in one batch."""
+    if (scorer or EMOTION_SCORER) != "lexicon":
+        return [get_polarity(text, scorer="textblob") if text else 0.0 for text in texts]
+    # Imported on first use so the default TextBlob path doesn't load NumPy
+    try:
+        from src.emotion_lexicon import score_emotions_batch, polarity
+    except ImportError:
+        from emotion_lexicon import score_emotions_batch, polarity
+    with EMOTION_LEXICON_SECONDS.time():
+        return [float(p) for p in polarity(score_emotions_batch(texts))]
 
-    # Check for escalation keywords (case-insensitive)
-    escalation_needed = False
-    lower_text = text.lower()
-    for keyword in escalation_keywords:
-        if keyword in lower_text:
-            escalation_needed = True
-            break # Stop checking once one keyword is found
+def get_emotion_and_check_escalation(text: str):
+    """Analyzes text for basic sentiment and checks for escalation keywords."""
+    # Basic Sentiment Analysis, categorized as positive/negative/neutral
+    emotion_label = polarity_label(get_polarity(text))
+
+    escalation_needed = check_escalation(text)
 
     return emotion_label, escalation_needed
 
+def find_escalation_keyword(text: str) -> str | None:
+    """Returns the first escalation keyword in text (case-insensitive), or None."""
+    match = _escalation_re.search(text)
+    return match.group(0).lower() if match else None
+
+def check_escalation(text: str) -> bool:
+    """Checks for escalation keywords (case-insensitive)."""
+    return find_escalation_keyword(text) is not None
+
+# Risk classes used by the watcher to order post-call processing
+RISK_ESCALATION = "escalation"
+RISK_NEGATIVE = "negative"
+RISK_ROUTINE = "routine"
+PRESCAN_NEGATIVE_POLARITY = -0.3 # Stricter than the -0.1 "negative" label threshold
+
+def prescan_risk(user_text: str) -> str:
+    """
+    Cheap pre-scan of a finished conversation's user turns: escalation keywords first
+    (no TextBlob needed on a hit), then overall polarity.
+    """
+    if not user_text:
+        return RISK_ROUTINE
+    if check_escalation(user_text):
+        return RISK_ESCALATION
+    return RISK_NEGATIVE if get_polarity(user_text) < PRESCAN_NEGATIVE_POLARITY else RISK_ROUTINE
+
 # NEW FUNCTION: Analyzes a whole file
 def analyze_transcript_file(filepath: str):
     """Reads a transcript file and prints its overall emotion analysis."""
+    # Imported here: transcript_store itself uses get_emotions from this module
+    try:
+        from src.transcript_store import is_structured, read_turns, format_turns
+    except ImportError:
+        from transcript_store import is_structured, read_turns, format_turns
+
     print(f"--- Analyzing file: {filepath} ---")
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            content = f.read()
+        if is_structured(filepath):
+            turns = read_turns(filepath)
+            content = format_turns(turns)
+        else:
+            turns = None
+            with open(filepath, 'r', encoding='utf-8') as f:
+                content = f.read()
         if not content:
             print("Error: File is empty.")
             return
@@ -51,6 +113,14 @@ def analyze_transcript_file(filepath: str):
         print(f"  Overall Emotion Detected: {emotion}")
         print(f"  Potential Escalation Needed: {escalation_needed}")
 
+        # Structured transcripts already carry per-turn sentiment, no re-scoring needed
+        if turns:
+            counts = {}
+            for turn in turns:
+                if turn.get('sentiment'):
+                    counts[turn['sentiment']] = counts.get(turn['sentiment'], 0) + 1
+            print(f"  Per-turn User Sentiment: {counts}")
+
     except FileNotFoundError:
         print(f"Error: File not found at {filepath}")
     except Exception as e:
@@ -63,15 +133,15 @@ if __name__ == "__main__":
     )
     parser.add_argument(
         "filepath",
-        help="Path to the transcript file (e.g., conversations/conversation_xyz.txt)"
+        help="Path to the transcript file (e.g., conversations/conversation_xyz.jsonl.gz or .txt)"
     )
     args = parser.parse_args()
 
     # Basic validation
     if not os.path.exists(args.filepath):
         print(f"Error: The file '{args.filepath}' does not exist.")
-    elif not args.filepath.endswith(".txt"):
-        print(f"Error: Input file should be a .txt file.")
+    elif not args.filepath.endswith((".txt", ".jsonl.gz")):
+        print(f"Error: Input file should be a .jsonl.gz or .txt transcript file.")
     # Optional: Check if it's in the expected directory
     # elif not args.filepath.startswith("conversations/"):
     #     print(f"Warning: File might not be in the expected 'conversations' directory.")
@@ -82,13 +152,14 @@ if __name__ == "__main__":
 # (Keep the existing get_emotion function for now if needed elsewhere, 
 # or remove if get_emotion_and_check_escalation replaces its use cases)
 
-def get_emotion(text: str) -> str:
+def get_emotion(text: str, scorer: str | None = None) -> str:
     """
-    Analyzes the sentiment of the text using TextBlob and returns a
-    simple emotion label based on polarity.
+    Analyzes the sentiment of the text and returns a simple emotion label
+    based on polarity.
 
     Args:
         text: The input text (e.g., user's speech transcript).
+        scorer: "textblob" or "lexicon"; defaults to EMOTION_SCORER.
 
     Returns:
         A simple emotion label: "positive", "negative", or "neutral".
@@ -97,21 +168,19 @@ def get_emotion(text: str) -> str:
         return "neutral" # Handle empty input
 
     try:
-        blob = TextBlob(text)
-        polarity = blob.sentiment.polarity
-
-        # Simple mapping based on polarity score
-        if polarity > 0.1:  # Threshold can be adjusted
-            return "positive"
-        elif polarity < -0.1: # Threshold can be adjusted
-            return "negative"
-        else:
-            return "neutral"
-            
+        return polarity_label(get_polarity(text, scorer))
     except Exception as e:
         print(f"Error during sentiment analysis: {e}")
         return "neutral" # Default to neutral on error
 
+def get_emotions(texts: list, scorer: str | None = None) -> list:
+    """Labels for many texts (e.g. all user turns of a transcript) in one pass."""
+    try:
+        return [polarity_label(p) if text else "neutral" for text, p in zip(texts, get_polarities(texts, scorer))]
+    except Exception as e:
+        print(f"Error during sentiment analysis: {e}")
+        return ["neutral"] * len(texts)
+
 # Example Usage (for testing)
 if __name__ == '__main__':
     sample_text_positive = "I am feeling really happy and wonderful today!"
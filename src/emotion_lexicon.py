@@ -0,0 +1,122 @@
+import os
+import re
+import numpy as np
+
+# Lexicon-based multi-emotion scorer, an optional faster alternative to TextBlob
+# (EMOTION_SCORER=lexicon in emotion_analysis). Texts are tokenized once, tokens
+# are mapped to lexicon row indices, and a whole batch is scored with a single
+# scatter-add into an (n_texts, n_emotions) matrix.
+#
+# The built-in lexicon is small and tuned for companion calls; a larger one (e.g.
+# the NRC Emotion Lexicon) can be loaded from EMOTION_LEXICON_PATH, one
+# "word<TAB>emotion<TAB>weight" line each. Unknown emotion names are ignored.
+EMOTIONS = ("sadness", "anxiety", "anger", "loneliness", "joy", "gratitude", "hope")
+POSITIVE_EMOTIONS = ("joy", "gratitude", "hope")
+EMOTION_LEXICON_PATH = os.getenv("EMOTION_LEXICON_PATH")
+NEGATION_WINDOW = 3 # Tokens after "not"/"never"/... whose emotion is ignored
+INTENSIFIER_WEIGHT = 1.5
+
+_BUILTIN_LEXICON = {
+    "sadness": "sad sadness unhappy miserable depressed depressing down low cry crying cried tears grief grieving "
+               "grieve mourning heartbroken hurt hurting loss lost miss missing missed gloomy awful terrible "
+               "empty sorrow upset disappointed hopeless pointless tired exhausted numb devastated broken "
+               "died death dead funeral",
+    "anxiety": "anxious anxiety worried worry worrying worries nervous scared afraid fear fearful panic panicking "
+               "stressed stress stressful overwhelmed tense uneasy restless dread frightened terrified "
+               "insomnia sleepless uncertain unsure concerned",
+    "anger": "angry anger mad furious annoyed annoying irritated irritating frustrated frustrating frustration "
+             "hate hated resent resentful unfair argument arguing fight fighting rage outraged bitter",
+    "loneliness": "lonely loneliness alone isolated isolation abandoned forgotten nobody unwanted "
+                  "ignored invisible withdrawn disconnected",
+    "joy": "happy happiness glad joy joyful lovely love loved wonderful great good nice fun enjoy enjoyed "
+           "enjoying delighted excited exciting cheerful laugh laughed laughing smile smiled proud pleased "
+           "relaxed calm peaceful content fine better beautiful",
+    "gratitude": "grateful gratitude thankful thanks thank appreciate appreciated appreciative blessed "
+                 "lucky kindness",
+    "hope": "hope hopeful hoping optimistic forward improving improve better recovering "
+            "progress confident encouraged motivated",
+}
+_NEGATORS = {"not", "no", "never", "nothing", "nobody's", "don't", "dont", "didn't", "didnt", "isn't", "isnt",
+             "wasn't", "wasnt", "can't", "cant", "cannot", "won't", "wont", "aren't", "arent", "hardly"}
+_INTENSIFIERS = {"very", "so", "really", "extremely", "incredibly", "terribly", "totally", "completely", "too"}
+_TOKEN_RE = re.compile(r"[a-z']+")
+
+def _load_lexicon(path: str | None = EMOTION_LEXICON_PATH) -> tuple[dict, np.ndarray]:
+    """Returns (word -> row index, weights matrix of shape (n_words, n_emotions))."""
+    entries = {}
+    for emotion, words in _BUILTIN_LEXICON.items():
+        for word in words.split():
+            entries.setdefault(word, {})[emotion] = 1.0
+    if path:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                parts = line.strip().split("\t")
+                if len(parts) != 3 or parts[1] not in EMOTIONS:
+                    continue
+                weight = float(parts[2])
+                if weight:
+                    entries.setdefault(parts[0].lower(), {})[parts[1]] = weight
+    vocabulary = {word: i for i, word in enumerate(entries)}
+    weights = np.zeros((len(vocabulary), len(EMOTIONS)), dtype=np.float32)
+    for word, row in vocabulary.items():
+        for emotion, weight in entries[word].items():
+            weights[row, EMOTIONS.index(emotion)] = weight
+    return vocabulary, weights
+
+VOCABULARY, WEIGHTS = _load_lexicon()
+_POSITIVE_MASK = np.array([emotion in POSITIVE_EMOTIONS for emotion in EMOTIONS])
+
+def _token_hits(text: str, text_index: int, rows: list, owners: list, scales: list) -> int:
+    """Appends (lexicon row, text index, weight) for every scored token in text. Returns the token count."""
+    tokens = _TOKEN_RE.findall(text.lower())
+    negated_until = -1
+    boost = 1.0
+    for position, token in enumerate(tokens):
+        if token in _NEGATORS:
+            negated_until = position + NEGATION_WINDOW
+            continue
+        if token in _INTENSIFIERS:
+            boost = INTENSIFIER_WEIGHT
+            continue
+        row = VOCABULARY.get(token)
+        if row is not None and position > negated_until:
+            rows.append(row)
+            owners.append(text_index)
+            scales.append(boost)
+        boost = 1.0
+    return len(tokens)
+
+def score_emotions_batch(texts: list) -> np.ndarray:
+    """
+    Scores many texts at once. Returns a float32 matrix of shape (len(texts),
+    len(EMOTIONS)) of per-emotion intensities, normalized by sqrt(token count) so
+    long turns don't dominate.
+    """
+    rows, owners, scales = [], [], []
+    lengths = np.ones(len(texts), dtype=np.float32)
+    for i, text in enumerate(texts):
+        if text:
+            lengths[i] = max(1, _token_hits(text, i, rows, owners, scales))
+    scores = np.zeros((len(texts), len(EMOTIONS)), dtype=np.float32)
+    if rows:
+        # Sparse lookup: gather the lexicon rows of all hits, then scatter-add them per text
+        hits = WEIGHTS[np.asarray(rows)] * np.asarray(scales, dtype=np.float32)[:, None]
+        np.add.at(scores, np.asarray(owners), hits)
+    return scores / np.sqrt(lengths)[:, None]
+
+def score_emotions(text: str) -> dict:
+    """Per-emotion intensities for a single text, e.g. {"sadness": 0.58, "joy": 0.0, ...}."""
+    return dict(zip(EMOTIONS, (round(float(v), 4) for v in score_emotions_batch([text])[0])))
+
+def polarity(scores: np.ndarray) -> np.ndarray:
+    """Maps emotion vectors to a TextBlob-like polarity in [-1, 1]."""
+    scores = np.atleast_2d(scores)
+    positive = scores[:, _POSITIVE_MASK].sum(axis=1)
+    negative = scores[:, ~_POSITIVE_MASK].sum(axis=1)
+    return (positive - negative) / (positive + negative + 1.0)
+
+def dominant_emotion(scores: np.ndarray) -> list:
+    """Strongest emotion per row, or None where nothing in the lexicon matched."""
+    scores = np.atleast_2d(scores)
+    best = scores.argmax(axis=1)
+    return [EMOTIONS[j] if scores[i, j] > 0 else None for i, j in enumerate(best)]
@@ -0,0 +1,188 @@
+import os
+import json
+import time
+import uuid
+import queue
+import threading
+
+try:
+    from src.emotion_analysis import find_escalation_keyword
+    from src.metrics import (ESCALATION_ALERTS, ESCALATION_ALERT_SECONDS, ESCALATION_ALERT_SLA_BREACHES,
+                             ESCALATION_WEBHOOK_DELIVERIES)
+except ImportError:
+    from emotion_analysis import find_escalation_keyword
+    from metrics import (ESCALATION_ALERTS, ESCALATION_ALERT_SECONDS, ESCALATION_ALERT_SLA_BREACHES,
+                         ESCALATION_WEBHOOK_DELIVERIES)
+
+# Escalation fast path. A keyword hit on a user turn is written straight away as
+# one JSON line in ESCALATION_ALERTS_FILE: a single append plus an fsync, before
+# sentiment scoring or any other pipeline work runs. The alert is then POSTed to
+# ESCALATION_WEBHOOK_URL, if set, from a background thread. The file is the
+# durable record; the webhook is a best-effort notification with retries.
+# Turn received -> alert written is measured against ESCALATION_BUDGET_MS.
+# A conversation is alerted once: later hits for the same conversation_id (more
+# live turns, or the watcher seeing the finished call) reuse the first alert and
+# page nobody again. Live alerts raised before the conversation id is known are
+# tied to it afterwards with a link line (link_alerts).
+# The excerpt of the user's words stays in the local file: the webhook payload
+# leaves it out, and /alerts only returns it to admins.
+ALERTS_FILE = os.getenv("ESCALATION_ALERTS_FILE", os.path.join("alerts", "escalations.jsonl"))
+WEBHOOK_URL = os.getenv("ESCALATION_WEBHOOK_URL")
+WEBHOOK_RETRIES = 3
+ESCALATION_BUDGET_MS = float(os.getenv("ESCALATION_BUDGET_MS", "100"))
+EXCERPT_CHARS = 200
+
+# Sent to the live agent as a contextual update when a turn escalates
+AGENT_INSTRUCTION = ("The user may be in crisis. Respond calmly and with empathy, do not change the subject, "
+                     "gently ask whether they are safe right now, and encourage them to contact a crisis line "
+                     "or emergency services.")
+
+_file_lock = threading.Lock()
+_alerted = {} # alerts file -> (bytes read, {conversation_id: alert id})
+_webhook_queue = queue.Queue()
+_webhook_thread = None
+
+def _existing_alert_id(conversation_id: str, alerts_file: str) -> str | None:
+    """Id of an alert already written for the conversation (by any process). Call with _file_lock held."""
+    offset, alerted = _alerted.get(alerts_file, (0, {}))
+    try:
+        with open(alerts_file, 'rb') as f:
+            f.seek(offset) # Only the lines appended since the last check are parsed
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    end = data.rfind(b"\n") + 1
+    for line in data[:end].splitlines():
+        if line.strip():
+            alert = json.loads(line)
+            alerted.setdefault(alert.get("conversation_id"), alert.get("link") or alert["id"])
+    _alerted[alerts_file] = (offset + end, alerted)
+    return alerted.get(conversation_id)
+
+def _write_line(record: dict, alerts_file: str):
+    """Appends one JSON line and fsyncs it. Call with _file_lock held."""
+    line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+    os.makedirs(os.path.dirname(alerts_file) or ".", exist_ok=True)
+    fd = os.open(alerts_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line) # One write per line, so concurrent processes don't interleave
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def _append_alert(alert: dict, alerts_file: str) -> str | None:
+    """Appends the alert unless its conversation was already alerted; then returns the earlier alert's id."""
+    with _file_lock:
+        if alert["conversation_id"]:
+            existing_id = _existing_alert_id(alert["conversation_id"], alerts_file)
+            if existing_id:
+                return existing_id
+        _write_line(alert, alerts_file)
+    return None
+
+def _deliver_webhooks():
+    import requests # Deferred: only needed when a webhook is configured
+    while True:
+        url, alert = _webhook_queue.get()
+        for attempt in range(WEBHOOK_RETRIES):
+            try:
+                requests.post(url, json=alert, timeout=5).raise_for_status()
+                ESCALATION_WEBHOOK_DELIVERIES.inc(outcome="ok")
+                break
+            except Exception as e:
+                if attempt == WEBHOOK_RETRIES - 1:
+                    ESCALATION_WEBHOOK_DELIVERIES.inc(outcome="failed")
+                    print(f"Warning: Escalation webhook failed for alert {alert['id']}: {e}")
+                else:
+                    time.sleep(0.5 * 2 ** attempt)
+
+def _send_webhook(alert: dict, url: str):
+    global _webhook_thread
+    if _webhook_thread is None:
+        _webhook_thread = threading.Thread(target=_deliver_webhooks, daemon=True, name="escalation-webhook")
+        _webhook_thread.start()
+    _webhook_queue.put((url, alert))
+
+def emit_alert(text: str, keyword: str, source: str, conversation_id: str | None = None,
+               received_at: float | None = None, alerts_file: str | None = None,
+               webhook_url: str | None = None) -> dict:
+    """
+    Writes an escalation alert (durably) and queues the webhook. `received_at` is the
+    time.time() at which the triggering turn arrived, for the latency measurement.
+    The file and webhook default to ALERTS_FILE / WEBHOOK_URL. Returns the alert; if
+    the conversation was already alerted, nothing is written or sent and the returned
+    alert carries the earlier id with "duplicate": True.
+    """
+    webhook_url = webhook_url or WEBHOOK_URL
+    now = time.time()
+    alert = {
+        "id": uuid.uuid4().hex,
+        "ts": round(now, 3),
+        "source": source,
+        "conversation_id": conversation_id,
+        "keyword": keyword,
+        "excerpt": text[:EXCERPT_CHARS],
+    }
+    existing_id = _append_alert(alert, alerts_file or ALERTS_FILE)
+    if existing_id:
+        alert.update(id=existing_id, duplicate=True)
+    else:
+        ESCALATION_ALERTS.inc(source=source)
+    if received_at is not None:
+        latency = time.time() - received_at
+        alert["latency_ms"] = round(1000 * latency, 2)
+    if received_at is not None and not existing_id:
+        ESCALATION_ALERT_SECONDS.observe(latency)
+        if source == "live" and 1000 * latency > ESCALATION_BUDGET_MS:
+            ESCALATION_ALERT_SLA_BREACHES.inc()
+            print(f"Warning: Escalation alert took {alert['latency_ms']:.0f} ms (budget {ESCALATION_BUDGET_MS:.0f} ms)")
+    if webhook_url and not existing_id:
+        # No excerpt: the user's own words don't leave this machine
+        _send_webhook({key: value for key, value in alert.items() if key != "excerpt"}, webhook_url)
+    return alert
+
+def link_alerts(alert_ids: list, conversation_id: str, alerts_file: str | None = None) -> bool:
+    """
+    Ties alerts written without a conversation id to the conversation, so later hits
+    for it (e.g. the watcher) reuse the first of them. Returns False if there was
+    nothing to link or the conversation already had an alert.
+    """
+    alerts_file = alerts_file or ALERTS_FILE
+    if not alert_ids or not conversation_id:
+        return False
+    with _file_lock:
+        if _existing_alert_id(conversation_id, alerts_file):
+            return False
+        _write_line({"link": alert_ids[0], "ts": round(time.time(), 3), "conversation_id": conversation_id},
+                    alerts_file)
+    return True
+
+def check_turn(text: str, source: str, conversation_id: str | None = None,
+               received_at: float | None = None) -> dict | None:
+    """Keyword check for one turn (no sentiment scoring); emits and returns an alert on a hit."""
+    received_at = time.time() if received_at is None else received_at
+    keyword = find_escalation_keyword(text)
+    if keyword is None:
+        return None
+    return emit_alert(text, keyword, source, conversation_id, received_at)
+
+def read_alerts(alerts_file: str | None = None, since: float = 0.0) -> list:
+    """Alerts written at or after `since` (epoch seconds), oldest first."""
+    try:
+        with open(alerts_file or ALERTS_FILE, 'r', encoding='utf-8') as f:
+            lines = f.readlines()
+    except FileNotFoundError:
+        return []
+    alerts = []
+    by_id = {}
+    for line in lines:
+        if line.endswith("\n"): # A line without its newline is still being written
+            alert = json.loads(line)
+            if "link" in alert:
+                if alert["link"] in by_id and not by_id[alert["link"]]["conversation_id"]:
+                    by_id[alert["link"]]["conversation_id"] = alert["conversation_id"]
+                continue
+            by_id[alert["id"]] = alert
+            if alert["ts"] >= since:
+                alerts.append(alert)
+    return alerts
@@ -0,0 +1,108 @@
+import os
+import json
+import time
+import queue
+import threading
+from flask import Flask, Response
+from flask_cors import CORS
+
+try:
+    from src.metrics import render_metrics
+except ImportError:
+    from metrics import render_metrics
+
+# Max events buffered per subscriber. When a client falls behind, its oldest
+# events are dropped so publishing never blocks the conversation callback.
+MAX_CLIENT_BUFFER = 100
+HEARTBEAT_SECONDS = 15
+EVENT_STREAM_PORT = int(os.getenv("EVENT_STREAM_PORT", "5001"))
+# Events describe a user's emotional state, so the stream is only reachable from this
+# machine and from the frontend's origin unless configured otherwise
+EVENT_STREAM_HOST = os.getenv("EVENT_STREAM_HOST", "127.0.0.1")
+EVENT_STREAM_ORIGIN = os.getenv("EVENT_STREAM_ORIGIN", "http://localhost:3000")
+
+class EventBus:
+    """Minimal in-process pub/sub with a bounded queue per subscriber."""
+
+    def __init__(self, max_buffer: int = MAX_CLIENT_BUFFER):
+        self.max_buffer = max_buffer
+        self._subscribers = []
+        self._lock = threading.Lock()
+
+    def subscribe(self) -> queue.Queue:
+        q = queue.Queue(maxsize=self.max_buffer)
+        with self._lock:
+            self._subscribers.append(q)
+        return q
+
+    def unsubscribe(self, q: queue.Queue):
+        with self._lock:
+            if q in self._subscribers:
+                self._subscribers.remove(q)
+
+    def publish(self, event_type: str, data: dict):
+        """Delivers an event to every subscriber without blocking."""
+        event = {"type": event_type, "time": time.time(), **data}
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for q in subscribers:
+            try:
+                q.put_nowait(event)
+            except queue.Full:
+                # Slow client: drop its oldest event to make room
+                try:
+                    q.get_nowait()
+                    q.put_nowait(event)
+                except (queue.Empty, queue.Full):
+                    pass
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+bus = EventBus()
+
+def publish_event(event_type: str, **data):
+    """Publishes an event on the shared bus (safe to call from SDK callbacks)."""
+    bus.publish(event_type, data)
+
+app = Flask(__name__)
+CORS(app, origins=[origin.strip() for origin in EVENT_STREAM_ORIGIN.split(",")])
+
+@app.route('/events', methods=['GET'])
+def stream_events():
+    """Server-Sent Events endpoint streaming live emotion/escalation/advice events."""
+    q = bus.subscribe()
+
+    def generate():
+        try:
+            while True:
+                try:
+                    event = q.get(timeout=HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    yield ": heartbeat\n\n" # Keeps proxies from closing idle streams
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            bus.unsubscribe(q)
+
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus scrape endpoint for the live agent process."""
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+def start_event_server(port: int = EVENT_STREAM_PORT, host: str = EVENT_STREAM_HOST) -> threading.Thread:
+    """Runs the SSE endpoint in a daemon thread inside the current process."""
+    thread = threading.Thread(
+        target=lambda: app.run(host=host, port=port, threaded=True, use_reloader=False),
+        daemon=True,
+    )
+    thread.start()
+    print(f"--- Live event stream available at http://{host}:{port}/events ---")
+    return thread
+
+if __name__ == "__main__":
+    app.run(debug=True, host=EVENT_STREAM_HOST, port=EVENT_STREAM_PORT, threaded=True)
@@ -0,0 +1,95 @@
+import os
+import wave
+import time
+import threading
+
+from elevenlabs.conversational_ai.conversation import AudioInterface
+
+# The Conversational AI websocket expects 16-bit mono PCM at 16 kHz, sent in
+# 250 ms chunks (same framing as DefaultAudioInterface).
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2
+CHUNK_FRAMES = 4000
+
+class FileAudioInterface(AudioInterface):
+    """
+    Headless AudioInterface: streams PCM from a WAV file instead of a microphone and
+    discards (or records) the agent's audio instead of playing it.
+
+    speed=1.0 streams in real time, speed=N streams N times faster, speed=0 sends
+    as fast as possible. With loop=True the file repeats until stop() is called.
+    """
+
+    def __init__(self, wav_path: str, speed: float = 1.0, record_path: str | None = None, loop: bool = False):
+        self.wav_path = wav_path
+        self.speed = speed
+        self.record_path = record_path
+        self.loop = loop
+        self._frames = self._load_pcm(wav_path)
+        self._recorded = []
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.chunks_sent = 0
+
+    @staticmethod
+    def _load_pcm(wav_path: str) -> bytes:
+        with wave.open(wav_path, 'rb') as wav:
+            if (wav.getframerate(), wav.getnchannels(), wav.getsampwidth()) != (SAMPLE_RATE, 1, SAMPLE_WIDTH):
+                raise ValueError(f"{wav_path} must be 16 kHz mono 16-bit PCM, got "
+                                 f"{wav.getframerate()} Hz, {wav.getnchannels()} ch, {8 * wav.getsampwidth()}-bit")
+            return wav.readframes(wav.getnframes())
+
+    def start(self, input_callback):
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._stream, args=(input_callback,), daemon=True)
+        self._thread.start()
+
+    def _stream(self, input_callback):
+        chunk_bytes = CHUNK_FRAMES * SAMPLE_WIDTH
+        chunk_seconds = CHUNK_FRAMES / SAMPLE_RATE
+        next_send = time.perf_counter()
+        while not self._stop_event.is_set():
+            for offset in range(0, len(self._frames), chunk_bytes):
+                if self._stop_event.is_set():
+                    return
+                input_callback(self._frames[offset:offset + chunk_bytes])
+                self.chunks_sent += 1
+                if self.speed > 0:
+                    # Schedule against a fixed clock so callback time doesn't accumulate as drift
+                    next_send += chunk_seconds / self.speed
+                    delay = next_send - time.perf_counter()
+                    if delay > 0:
+                        self._stop_event.wait(delay)
+            if not self.loop:
+                return
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1)
+        if self.record_path and self._recorded:
+            with wave.open(self.record_path, 'wb') as wav:
+                wav.setnchannels(1)
+                wav.setsampwidth(SAMPLE_WIDTH)
+                wav.setframerate(SAMPLE_RATE)
+                wav.writeframes(b''.join(self._recorded))
+
+    def output(self, audio: bytes):
+        if self.record_path:
+            self._recorded.append(audio)
+
+    def interrupt(self):
+        pass # Nothing is playing, so there is nothing to cut off
+
+def make_audio_interface() -> AudioInterface:
+    """
+    Returns a FileAudioInterface when AUDIO_INPUT_WAV is set (headless runs), otherwise
+    the microphone/speaker DefaultAudioInterface.
+    """
+    wav_path = os.getenv("AUDIO_INPUT_WAV")
+    if wav_path:
+        speed = float(os.getenv("AUDIO_INPUT_SPEED", "1.0"))
+        print(f"--- Using file audio input: {wav_path} (speed {speed}x) ---")
+        return FileAudioInterface(wav_path, speed=speed, record_path=os.getenv("AUDIO_OUTPUT_WAV"))
+    from elevenlabs.conversational_ai.default_audio_interface import DefaultAudioInterface
+    return DefaultAudioInterface()
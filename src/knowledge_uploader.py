@@ -1,12 +1,34 @@
 import os
 import json
-import requests
-import glob
 from datetime import datetime
 from dotenv import load_dotenv
 
+try:
+    from src.metrics import KB_UPLOAD_SECONDS, KB_UPLOAD_RESPONSES
+    from src.tracing import span, mark
+    from src.profile_store import (ManifestReader, PROFILE_DIR, load_offset, save_offset, load_profile,
+                                   migrate_flat_profiles, atomic_write_json)
+except ImportError:
+    from metrics import KB_UPLOAD_SECONDS, KB_UPLOAD_RESPONSES
+    from tracing import span, mark
+    from profile_store import (ManifestReader, PROFILE_DIR, load_offset, save_offset, load_profile,
+                               migrate_flat_profiles, atomic_write_json)
+
 load_dotenv()
 
+# Manifest offset up to which profiles have been uploaded (see process_profiles(only_new=True))
+UPLOAD_CHECKPOINT = os.path.join(PROFILE_DIR, ".uploaded_offset")
+# Entries whose upload failed, retried on the next pass: [{"entry": ..., "attempts": n}, ...]
+UPLOAD_RETRY_FILE = os.path.join(PROFILE_DIR, ".upload_retries.json")
+UPLOAD_MAX_ATTEMPTS = 5
+
+def load_upload_retries() -> list:
+    try:
+        with open(UPLOAD_RETRY_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return []
+
 def format_profile_to_text(profile_data: dict) -> str:
     """Convert JSON profile to natural text format."""
     text = f"""
@@ -27,7 +49,8 @@ def upload_to_elevenlabs(text_content: str, profile_name: str) -> bool:
         print("Error: ELEVENLABS_API_KEY not found in environment variables.")
         return False
 
-    url = "https://api.elevenlabs.io/v1/convai/knowledge-base/text"
+    base_url = os.getenv("ELEVENLABS_BASE_URL", "https://api.elevenlabs.io")
+    url = f"{base_url}/v1/convai/knowledge-base/text"
     headers = {
         "xi-api-key": api_key,
         "Content-Type": "application/json"
@@ -39,12 +62,17 @@ def upload_to_elevenlabs(text_content: str, profile_name: str) -> bool:
     }
 
     print(f"--- Uploading profile '{profile_name}' to ElevenLabs KB... ---")
+    import requests # Deferred: only needed once there is something to upload
     try:
-        response = requests.post(url, headers=headers, json=data)
+        with KB_UPLOAD_SECONDS.time(), span("kb_upload"):
+            response = requests.post(url, headers=headers, json=data)
+        KB_UPLOAD_RESPONSES.inc(status=response.status_code)
         response.raise_for_status()
         print(f"--- Successfully uploaded profile: {profile_name} ---")
         return True
     except requests.exceptions.RequestException as e:
+        if e.response is None:
+            KB_UPLOAD_RESPONSES.inc(status="error") # Connection error / timeout, no HTTP status
         print(f"--- Failed to upload profile '{profile_name}'. Status code: {e.response.status_code if e.response else 'N/A'} ---")
         print(f"Response: {e.response.text if e.response else 'No response'}")
         return False
@@ -52,48 +80,70 @@ def upload_to_elevenlabs(text_content: str, profile_name: str) -> bool:
         print(f"--- Error uploading profile '{profile_name}': {e} ---")
         return False
 
-def upload_profile_file(profile_filepath: str):
-    """Reads a profile JSON file, formats it, and uploads it."""
+def upload_profile(profile_data: dict, profile_filename: str) -> bool:
+    """Formats a loaded profile and uploads it. Returns True on success."""
+    # Format profile data into text
+    text_content = format_profile_to_text(profile_data)
+
+    # Create profile name from filename
+    profile_name = f"User Profile - {profile_filename}"
+
+    # Upload to ElevenLabs
+    if upload_to_elevenlabs(text_content, profile_name):
+        mark("kb_updated")
+        print(f"--- Successfully processed and uploaded {profile_filename} ---")
+        return True
+    print(f"--- Failed to upload {profile_filename} ---")
+    return False
+
+def upload_profile_file(profile_filepath: str) -> bool:
+    """Reads a profile JSON file, formats it, and uploads it. Returns True on success."""
     if not profile_filepath or not os.path.exists(profile_filepath):
         print(f"Error: Profile file not found or invalid path: {profile_filepath}")
-        return
+        return False
 
     print(f"--- Processing profile file for upload: {profile_filepath} ---")
     try:
         with open(profile_filepath, 'r', encoding='utf-8') as f:
             profile_data = json.load(f)
-        
-        # Format profile data into text
-        text_content = format_profile_to_text(profile_data)
-        
-        # Create profile name from filename
-        profile_name = f"User Profile - {os.path.basename(profile_filepath)}"
-        
-        # Upload to ElevenLabs
-        if upload_to_elevenlabs(text_content, profile_name):
-            print(f"--- Successfully processed and uploaded {profile_filepath} ---")
-        else:
-            print(f"--- Failed to upload {profile_filepath} ---")
-            
+        return upload_profile(profile_data, os.path.basename(profile_filepath))
     except Exception as e:
         print(f"Error processing profile file {profile_filepath}: {e}")
+        return False
 
-def process_profiles():
-    """Process all JSON profiles in user_profiles directory."""
+def process_profiles(only_new: bool = False):
+    """
+    Uploads the profiles listed in the profile manifest. With only_new, only those
+    added since the last run are uploaded (the manifest offset is checkpointed),
+    plus earlier failures, which are retried up to UPLOAD_MAX_ATTEMPTS times.
+    """
     print("--- Starting batch profile processing and upload... ---")
-    profile_files = glob.glob("user_profiles/*.json")
-    if not profile_files:
-        print("No profiles found in user_profiles directory.")
+    migrate_flat_profiles() # Picks up profiles saved in the old flat layout, if any
+    reader = ManifestReader(PROFILE_DIR, load_offset(UPLOAD_CHECKPOINT) if only_new else 0)
+    retries = load_upload_retries() if only_new else []
+    pending = retries + [{"entry": entry, "attempts": 0} for entry in reader.read_new()]
+    if not pending:
+        print("No new profiles found in user_profiles manifest." if only_new else "No profiles found in user_profiles manifest.")
         return
     
     success_count = 0
-    failure_count = 0
-    for profile_file in profile_files:
-        if upload_profile_file(profile_file):
+    failed = []
+    for item in pending:
+        entry = item["entry"]
+        profile_data = load_profile(entry, PROFILE_DIR) # Live file, or the archive once compacted
+        if profile_data is not None and upload_profile(profile_data, os.path.basename(entry["path"])):
              success_count += 1
+        elif item["attempts"] + 1 < UPLOAD_MAX_ATTEMPTS:
+             failed.append({"entry": entry, "attempts": item["attempts"] + 1})
         else:
-             failure_count += 1
-    print(f"--- Batch upload complete. Success: {success_count}, Failures: {failure_count} ---")
+             print(f"Warning: Giving up on uploading {entry['path']} after {UPLOAD_MAX_ATTEMPTS} attempts")
+    if only_new:
+        # Failures are recorded before the offset moves past them, so none is ever skipped
+        if failed or retries:
+            atomic_write_json(failed, UPLOAD_RETRY_FILE)
+        save_offset(UPLOAD_CHECKPOINT, reader.offset)
+    print(f"--- Batch upload complete. Success: {success_count}, Failures: {len(pending) - success_count} "
+          f"({len(failed)} to retry) ---")
 
 if __name__ == "__main__":
     process_profiles() 
\ No newline at end of file
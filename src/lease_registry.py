@@ -0,0 +1,176 @@
+import os
+import time
+import socket
+import sqlite3
+import argparse
+import threading
+from contextlib import contextmanager
+
+# Shared claim/lease registry so agent.py, the watcher and any number of extra
+# workers can split post-call processing without doing a conversation twice.
+# A process claims a conversation before fetching it; the lease expires after
+# LEASE_TTL_SECONDS so work held by a crashed process is picked up again. While a
+# process works on a conversation, keep_alive() renews its lease every third of the
+# TTL, so slow Groq calls or uploads don't let another worker take it over.
+LEASE_DB = os.getenv("LEASE_DB", "conversation_leases.db")
+LEASE_TTL_SECONDS = int(os.getenv("LEASE_TTL_SECONDS", "600"))
+DEFAULT_OWNER = f"{socket.gethostname()}:{os.getpid()}"
+
+def _connect(db_path: str = None) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path or LEASE_DB, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL") # Readers don't block the writer
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS leases (
+            conversation_id TEXT PRIMARY KEY,
+            owner TEXT NOT NULL,
+            state TEXT NOT NULL,          -- 'leased' or 'done'
+            expires_at REAL NOT NULL,
+            updated_at REAL NOT NULL
+        )
+    """)
+    return conn
+
+def claim(conversation_id: str, owner: str = DEFAULT_OWNER, ttl: float = LEASE_TTL_SECONDS,
+          db_path: str = None) -> bool:
+    """
+    Takes the lease on a conversation. Succeeds if nobody holds it, the previous
+    lease expired, or `owner` already holds it (renewal). Fails once it is done.
+    """
+    now = time.time()
+    conn = _connect(db_path)
+    try:
+        conn.execute("BEGIN IMMEDIATE") # Serialize claimers across processes
+        row = conn.execute("SELECT owner, state, expires_at FROM leases WHERE conversation_id = ?",
+                           (conversation_id,)).fetchone()
+        if row is not None:
+            current_owner, state, expires_at = row
+            if state == "done" or (current_owner != owner and expires_at > now):
+                conn.execute("ROLLBACK")
+                return False
+        conn.execute("""
+            INSERT INTO leases (conversation_id, owner, state, expires_at, updated_at)
+            VALUES (?, ?, 'leased', ?, ?)
+            ON CONFLICT(conversation_id) DO UPDATE SET
+                owner = excluded.owner, state = 'leased',
+                expires_at = excluded.expires_at, updated_at = excluded.updated_at
+        """, (conversation_id, owner, now + ttl, now))
+        conn.execute("COMMIT")
+        return True
+    finally:
+        conn.close()
+
+def renew(conversation_id: str, owner: str = DEFAULT_OWNER, ttl: float = LEASE_TTL_SECONDS,
+          db_path: str = None) -> bool:
+    """Extends a lease `owner` still holds. Returns False if it was lost or is already done."""
+    now = time.time()
+    conn = _connect(db_path)
+    try:
+        return conn.execute("""
+            UPDATE leases SET expires_at = ?, updated_at = ?
+            WHERE conversation_id = ? AND owner = ? AND state = 'leased'
+        """, (now + ttl, now, conversation_id, owner)).rowcount == 1
+    finally:
+        conn.close()
+
+@contextmanager
+def keep_alive(conversation_id: str, owner: str = DEFAULT_OWNER, ttl: float = LEASE_TTL_SECONDS,
+               db_path: str = None):
+    """Renews a claimed lease from a background thread until the enclosed block finishes."""
+    stopped = threading.Event()
+
+    def heartbeat():
+        while not stopped.wait(ttl / 3):
+            try:
+                if not renew(conversation_id, owner, ttl, db_path):
+                    if not is_done(conversation_id, db_path):
+                        print(f"Warning: Lost the lease on {conversation_id}; another worker may process it")
+                    return
+            except sqlite3.Error as e:
+                print(f"Warning: Could not renew the lease on {conversation_id}: {e}")
+
+    thread = threading.Thread(target=heartbeat, daemon=True, name="lease-heartbeat")
+    thread.start()
+    try:
+        yield
+    finally:
+        stopped.set()
+        thread.join()
+
+def complete(conversation_id: str, owner: str = DEFAULT_OWNER, db_path: str = None):
+    """Marks a conversation as done so no process will claim it again."""
+    now = time.time()
+    conn = _connect(db_path)
+    try:
+        conn.execute("""
+            INSERT INTO leases (conversation_id, owner, state, expires_at, updated_at)
+            VALUES (?, ?, 'done', ?, ?)
+            ON CONFLICT(conversation_id) DO UPDATE SET
+                owner = excluded.owner, state = 'done', updated_at = excluded.updated_at
+        """, (conversation_id, owner, now, now))
+    finally:
+        conn.close()
+
+def release(conversation_id: str, owner: str = DEFAULT_OWNER, db_path: str = None):
+    """Gives up a lease (e.g. after an error) so another attempt can claim it immediately."""
+    conn = _connect(db_path)
+    try:
+        conn.execute("DELETE FROM leases WHERE conversation_id = ? AND owner = ? AND state = 'leased'",
+                     (conversation_id, owner))
+    finally:
+        conn.close()
+
+def is_done(conversation_id: str, db_path: str = None) -> bool:
+    conn = _connect(db_path)
+    try:
+        row = conn.execute("SELECT state FROM leases WHERE conversation_id = ?", (conversation_id,)).fetchone()
+        return row is not None and row[0] == "done"
+    finally:
+        conn.close()
+
+def is_claimable(conversation_id: str, owner: str = DEFAULT_OWNER, db_path: str = None) -> bool:
+    """True if claim() would currently succeed (no live lease held by someone else, not done)."""
+    conn = _connect(db_path)
+    try:
+        row = conn.execute("SELECT owner, state, expires_at FROM leases WHERE conversation_id = ?",
+                           (conversation_id,)).fetchone()
+    finally:
+        conn.close()
+    return row is None or (row[1] != "done" and (row[0] == owner or row[2] <= time.time()))
+
+def done_ids(db_path: str = None) -> set:
+    conn = _connect(db_path)
+    try:
+        return {row[0] for row in conn.execute("SELECT conversation_id FROM leases WHERE state = 'done'")}
+    finally:
+        conn.close()
+
+def import_processed_ids(filepath: str = "processed_conversation_ids.txt", db_path: str = None) -> int:
+    """Marks every ID from the legacy processed-IDs file as done. Returns the number imported."""
+    if not os.path.exists(filepath):
+        return 0
+    with open(filepath, 'r') as f:
+        ids = [line.strip() for line in f if line.strip()]
+    now = time.time()
+    conn = _connect(db_path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany("""
+            INSERT INTO leases (conversation_id, owner, state, expires_at, updated_at)
+            VALUES (?, 'import', 'done', ?, ?)
+            ON CONFLICT(conversation_id) DO UPDATE SET state = 'done'
+        """, [(cid, now, now) for cid in ids])
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+    return len(ids)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or seed the conversation lease registry.")
+    parser.add_argument("--import-processed", metavar="FILE", help="Mark IDs from a processed-IDs file as done.")
+    args = parser.parse_args()
+    if args.import_processed:
+        print(f"--- Imported {import_processed_ids(args.import_processed)} IDs into {LEASE_DB} ---")
+    conn = _connect()
+    for state, count in conn.execute("SELECT state, COUNT(*) FROM leases GROUP BY state"):
+        print(f"{state}: {count}")
+    conn.close()
@@ -0,0 +1,174 @@
+import os
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+
+# Prometheus-style metrics kept in process memory. Recording is a dict update
+# under a lock, cheap enough to leave on in the hot path; the text exposition
+# format is only produced when /metrics is scraped.
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1") # Set 0.0.0.0 for a Prometheus on another host
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+REGISTRY = []
+
+def _label_key(labelnames: tuple, labels: dict) -> tuple:
+    return tuple(str(labels.get(name, "")) for name in labelnames)
+
+def _format_labels(labelnames: tuple, key: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(labelnames, key)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class _Metric:
+    type_name = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _header(self) -> list:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.type_name}"]
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list:
+        with self._lock:
+            items = list(self._values.items())
+        return self._header() + [f"{self.name}{_format_labels(self.labelnames, k)} {v}" for k, v in items]
+
+class Gauge(Counter):
+    type_name = "gauge"
+
+    def set(self, value: float, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = _label_key(self.labelnames, labels)
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket counts (last slot is +Inf), sum, count
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][slot] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Context manager observing the elapsed wall time of the block in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> list:
+        with self._lock:
+            items = [(k, (list(s[0]), s[1], s[2])) for k, s in self._values.items()]
+        lines = self._header()
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                bucket_labels = _format_labels(self.labelnames, key, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+def render_metrics() -> str:
+    """Renders every registered metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+# --- Pipeline metrics ---
+# watcher_processor
+WATCHER_LIST_SECONDS = Histogram("cyra_watcher_list_seconds", "Latency of listing conversations from ElevenLabs.")
+WATCHER_FETCH_SECONDS = Histogram("cyra_watcher_fetch_seconds", "Latency of fetching a single conversation transcript.")
+WATCHER_QUEUE_DEPTH = Gauge("cyra_watcher_queue_depth", "Conversations waiting in the watcher's priority queue.")
+CONVERSATIONS_PROCESSED = Counter("cyra_conversations_processed_total", "Conversations run through the pipeline.", ("outcome",))
+PIPELINE_START_DELAY_SECONDS = Histogram("cyra_pipeline_start_delay_seconds", "Call ended -> processing started.",
+                                         buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 900.0))
+TIME_TO_KB_SECONDS = Histogram("cyra_time_to_kb_seconds", "Call ended (or queued) -> processing finished, by risk class.",
+                               ("risk",), buckets=(1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 900.0, 3600.0))
+AT_RISK_SLA_BREACHES = Counter("cyra_at_risk_sla_breaches_total", "At-risk conversations finished after the SLA.")
+WEBHOOK_EVENTS = Counter("cyra_webhook_events_total", "Post-call webhook deliveries by result.", ("result",))
+TRANSCRIPT_SAVE_SECONDS = Histogram("cyra_transcript_save_seconds", "Latency of saving a transcript to disk.")
+# analyzer_agent
+GROQ_REQUEST_SECONDS = Histogram("cyra_groq_request_seconds", "Latency of Groq chat completion requests.")
+GROQ_TOKENS = Counter("cyra_groq_tokens_total", "Tokens used by Groq requests.", ("kind",))
+PROMPT_TOKENS_ESTIMATED = Counter("cyra_prompt_tokens_estimated_total", "Estimated transcript tokens before and after compaction.",
+                                  ("stage",))
+ROLLING_ANALYSIS_PASSES = Counter("cyra_rolling_analysis_passes_total", "In-call window and post-call delta analyses.",
+                                  ("kind", "outcome"))
+PROFILE_PARSE_RESULTS = Counter("cyra_profile_parse_results_total", "LLM profile responses by parse result (ok/coerced/repaired/failed).",
+                                ("result",))
+# knowledge_uploader
+KB_UPLOAD_SECONDS = Histogram("cyra_kb_upload_seconds", "Latency of ElevenLabs knowledge base uploads.")
+KB_UPLOAD_RESPONSES = Counter("cyra_kb_upload_responses_total", "Knowledge base upload responses by status code.", ("status",))
+# emotion_analysis
+TEXTBLOB_SECONDS = Histogram("cyra_textblob_seconds", "TextBlob sentiment time per turn.",
+                             buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25))
+# escalation
+ESCALATION_ALERTS = Counter("cyra_escalation_alerts_total", "Escalation alerts written, by source (live/watcher).", ("source",))
+ESCALATION_ALERT_SECONDS = Histogram("cyra_escalation_alert_seconds", "Turn received -> escalation alert durably written.",
+                                     buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0))
+ESCALATION_ALERT_SLA_BREACHES = Counter("cyra_escalation_alert_sla_breaches_total", "Live escalation alerts slower than the budget.")
+ESCALATION_WEBHOOK_DELIVERIES = Counter("cyra_escalation_webhook_deliveries_total", "Escalation webhook deliveries by outcome.",
+                                        ("outcome",))
+EMOTION_LEXICON_SECONDS = Histogram("cyra_emotion_lexicon_seconds", "Lexicon scorer time per call (one text or a batch).",
+                                    buckets=(0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05))
+
+def start_metrics_server(port: int = METRICS_PORT, host: str = METRICS_HOST):
+    """Serves /metrics from a daemon thread, for processes without a Flask app."""
+    # http.server is imported here: every pipeline module imports metrics, few serve it
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?', 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render_metrics().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass # Keep scrapes out of the console output
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"--- Metrics available at http://{host}:{port}/metrics ---")
+    return server
@@ -0,0 +1,69 @@
+import numpy as np
+
+# Downsampling for long mood histories (served by mood_tracker's /mood-series).
+# Both methods keep the first and last point and return at most max_points points
+# of the original series, so the shape can be plotted and zoomed client-side:
+#   lttb   - Largest-Triangle-Three-Buckets: per bucket, the point forming the
+#            largest triangle with the previously chosen point and the next
+#            bucket's average. Preserves the visual shape; good default.
+#   minmax - the lowest and highest point of every bucket (in time order), so no
+#            spike or dip disappears. Useful when looking for outliers.
+METHODS = ("lttb", "minmax")
+MIN_POINTS = 3
+
+def _bucket_edges(n: int, buckets: int) -> np.ndarray:
+    """Edges splitting the inner points 1..n-2 into `buckets` nearly equal ranges."""
+    return np.linspace(1, n - 1, buckets + 1).astype(int)
+
+def lttb(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """Returns the indices of the points LTTB keeps, in order."""
+    n = len(x)
+    if max_points >= n:
+        return np.arange(n)
+    edges = _bucket_edges(n, max_points - 2)
+    keep = np.empty(max_points, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    prev = 0
+    for b in range(max_points - 2):
+        lo, hi = edges[b], edges[b + 1]
+        # Average of the next bucket (the last point for the final bucket)
+        nlo, nhi = (edges[b + 1], edges[b + 2]) if b + 2 < len(edges) else (n - 1, n)
+        avg_x, avg_y = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        # Twice the triangle area (prev, candidate, next average), vectorized over the bucket
+        area = np.abs((x[prev] - avg_x) * (y[lo:hi] - y[prev]) - (x[prev] - x[lo:hi]) * (avg_y - y[prev]))
+        prev = lo + int(area.argmax())
+        keep[b + 1] = prev
+    return keep
+
+def minmax(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """Returns the indices of each bucket's min and max point (plus first/last), in order."""
+    n = len(x)
+    if max_points >= n:
+        return np.arange(n)
+    if max_points < 4: # No room for a min and a max between the endpoints
+        return lttb(x, y, max_points)
+    edges = _bucket_edges(n, (max_points - 2) // 2)
+    keep = [0]
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        if hi <= lo:
+            continue
+        bucket = y[lo:hi]
+        keep.extend(sorted({lo + int(bucket.argmin()), lo + int(bucket.argmax())}))
+    keep.append(n - 1)
+    return np.array(keep)
+
+def downsample(x: list, y: list, max_points: int, method: str = "lttb") -> tuple[list, list]:
+    """
+    Reduces (x, y) - x ascending, e.g. epoch seconds - to at most max_points points.
+    Returns the kept (x, y) values as lists.
+    """
+    if max_points < MIN_POINTS:
+        raise ValueError(f"max_points must be at least {MIN_POINTS}")
+    if method not in METHODS:
+        raise ValueError(f"Unknown downsampling method '{method}', expected one of {METHODS}")
+    if not x:
+        return [], []
+    xs = np.asarray(x, dtype=np.float64)
+    ys = np.asarray(y, dtype=np.float64)
+    keep = (lttb if method == "lttb" else minmax)(xs, ys, max_points)
+    return xs[keep].tolist(), ys[keep].tolist()
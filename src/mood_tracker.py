@@ -1,26 +1,46 @@
 import os
-import json
+import re
 import glob
+import hmac
+import threading
 from datetime import datetime, timedelta
-from flask import Flask, jsonify
+from flask import Flask, jsonify, request, Response
 
-# NEW: Set Matplotlib backend *before* importing pyplot
-import matplotlib
-matplotlib.use('Agg') # Use non-interactive backend
-import matplotlib.pyplot as plt
-
-import numpy as np
+try:
+    from src.transcript_store import read_turns, load_index, is_structured, transcript_basename, TRANSCRIPT_EXT
+    from src.metrics import render_metrics
+    from src.profile_store import ManifestReader, load_profile, migrate_flat_profiles
+    from src.profile_analytics import calculate_mood_score, summary as analytics_summary
+    from src.escalation import read_alerts
+    from src import profiling
+    from src.archive_store import find_archived_transcripts
+except ImportError:
+    from transcript_store import read_turns, load_index, is_structured, transcript_basename, TRANSCRIPT_EXT
+    from metrics import render_metrics
+    from profile_store import ManifestReader, load_profile, migrate_flat_profiles
+    from profile_analytics import calculate_mood_score, summary as analytics_summary
+    from escalation import read_alerts
+    import profiling
+    from archive_store import find_archived_transcripts
 
 app = Flask(__name__)
+app.wsgi_app = profiling.wsgi_middleware(app.wsgi_app) # Pass-through unless profiling is armed
+
+# Token for /admin/profile and alert excerpts on /alerts; the endpoint is disabled when unset
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
 
-# Mood categories and their weights
-MOOD_CATEGORIES = {
-    "Withdrawn": -2,
-    "Open": 2,
-    "Angry": -1,
-    "Anxious": -1,
-    "Hopeful": 2
-}
+# Profiles are loaded incrementally: each request reads only the manifest lines
+# (and profile files) added since the previous one
+_manifest_reader = ManifestReader()
+_loaded_profiles = []
+_profiles_lock = threading.Lock()
+
+# /mood-series responses, keyed by query; dropped whenever new profiles arrive
+MOOD_SERIES_DEFAULT_POINTS = 200
+MOOD_SERIES_MAX_POINTS = 2000
+_series_cache = {}
+_series_cache_profiles = 0
+_series_lock = threading.Lock()
 
 def analyze_mood_trend(profile_data: dict) -> str:
     """Analyze mood trend from profile data."""
@@ -36,28 +56,6 @@ def analyze_mood_trend(profile_data: dict) -> str:
         return "mood stable"
     return "mood neutral"
 
-def calculate_mood_score(profile_data: dict) -> float:
-    """Calculate a numerical score for the mood."""
-    mood = profile_data.get('mood', 'neutral').lower()
-    tags = profile_data.get('profile_tags', [])
-    
-    # Base score from mood
-    score = 0
-    if mood in ['happy', 'hopeful']:
-        score = 2
-    elif mood in ['sad', 'lonely', 'anxious']:
-        score = -1
-    elif mood == 'neutral':
-        score = 0
-    
-    # Adjust score based on tags
-    for tag in tags:
-        tag = tag.lower().replace('#', '')
-        if tag in MOOD_CATEGORIES:
-            score += MOOD_CATEGORIES[tag]
-    
-    return score
-
 def generate_mood_insight(profiles: list) -> str:
     """Generate insight text based on mood trends."""
     if len(profiles) < 2:
@@ -79,28 +77,25 @@ def create_mood_graph(profiles: list):
     scores = []
     
     for profile in profiles:
+        # Creation time (YYYYMMDD_HHMMSS) recorded in the profile manifest
+        date_str = profile.get('sort_key', '')
         try:
-            # Extract date string (YYYYMMDD_HHMMSS) from filename
-            filename = profile.get('filename', '')
-            parts = filename.replace('.json', '').split('_')
-            if len(parts) >= 2:
-                 # Combine the last two parts assuming format YYYYMMDD_HHMMSS
-                 date_str = f"{parts[-2]}_{parts[-1]}"
-                 # Use the correct format string for parsing
-                 date = datetime.strptime(date_str, '%Y%m%d_%H%M%S')
-                 dates.append(date)
-                 scores.append(calculate_mood_score(profile))
-            else:
-                print(f"Warning: Could not parse date from filename format: {filename}")
-                continue
+            date = datetime.strptime(date_str, '%Y%m%d_%H%M%S')
+            dates.append(date)
+            scores.append(calculate_mood_score(profile))
         except ValueError:
-            print(f"Warning: Error parsing date string '{date_str}' from filename: {filename}")
+            print(f"Warning: Error parsing date string '{date_str}' for profile: {profile.get('filename', '')}")
             continue # Skip profile if date cannot be parsed
 
     if not dates or len(dates) < 2: # Need at least two points to plot
         print("Warning: Not enough data points with valid dates to create graph.")
         return None
     
+    # Imported on first use (matplotlib is slow to load); set the backend *before* importing pyplot
+    import matplotlib
+    matplotlib.use('Agg') # Use non-interactive backend
+    import matplotlib.pyplot as plt
+
     plt.figure(figsize=(10, 6))
     plt.plot(dates, scores, marker='o')
     plt.title('Mood Evolution Over Time')
@@ -116,39 +111,28 @@ def create_mood_graph(profiles: list):
     
     return graph_path
 
+def load_profiles() -> list:
+    """
+    Returns all profiles sorted by creation time, reading only the profiles added to
+    the manifest since the last call.
+    """
+    with _profiles_lock:
+        for entry in _manifest_reader.read_new():
+            profile_data = load_profile(entry, _manifest_reader.profile_dir) # Live or archived
+            if profile_data is None:
+                continue # Skip purged or problematic files
+            profile_data['filename'] = os.path.basename(entry['path'])
+            profile_data['sort_key'] = entry['created'] # YYYYMMDD_HHMMSS
+            _loaded_profiles.append(profile_data)
+        # Manifest order is append order, which is nearly sorted; Timsort handles that in ~linear time
+        _loaded_profiles.sort(key=lambda x: x.get('sort_key', ''))
+        return list(_loaded_profiles)
+
 @app.route('/mood-trends', methods=['GET'])
 def get_mood_trends():
     """API endpoint to get mood trends data."""
-    # Get all profile files
-    profile_files = glob.glob("user_profiles/*.json")
-    profiles = []
-    dates_for_json = [] # Store correctly extracted date strings for response
-
-    for file in profile_files:
-        try:
-            with open(file, 'r', encoding='utf-8') as f:
-                profile_data = json.load(f)
-                filename = os.path.basename(file)
-                profile_data['filename'] = filename # Add filename for sorting/parsing
-
-                 # Extract date string (YYYYMMDD_HHMMSS) from filename for sorting and response
-                parts = filename.replace('.json', '').split('_')
-                if len(parts) >= 2:
-                    date_str = f"{parts[-2]}_{parts[-1]}"
-                    # Validate date string format before adding
-                    datetime.strptime(date_str, '%Y%m%d_%H%M%S') # Raises ValueError if wrong format
-                    profile_data['sort_key'] = date_str # Use for sorting
-                    profiles.append(profile_data)
-                    dates_for_json.append(date_str) # Add correct string to list
-                else:
-                     print(f"Warning: Skipping file due to unexpected filename format: {filename}")
-
-        except (json.JSONDecodeError, ValueError, FileNotFoundError) as e:
-             print(f"Warning: Error processing file {file}: {e}")
-             continue # Skip problematic files
-
-    # Sort profiles by the extracted date string
-    profiles.sort(key=lambda x: x.get('sort_key', ''))
+    profiles = load_profiles()
+    dates_for_json = [p['sort_key'] for p in profiles]
 
     # Generate insights and graph
     insight = generate_mood_insight(profiles)
@@ -165,6 +149,165 @@ def get_mood_trends():
 
     return jsonify(response)
 
+def _parse_series_bound(value: str | None) -> str | None:
+    """Accepts YYYY-MM-DD or YYYYMMDD[_HHMMSS] and returns it as a sort_key prefix."""
+    if not value:
+        return None
+    compact = value.replace('-', '')
+    datetime.strptime(compact[:8], '%Y%m%d') # Validates; raises ValueError
+    return compact
+
+def build_mood_series(profiles: list, points: int, method: str, user: str | None = None,
+                      start: str | None = None, end: str | None = None) -> dict:
+    """
+    Mood scores over time for the selected profiles, downsampled to at most `points`
+    points. Raises ValueError for an unknown method or too few points.
+    """
+    # Imported on first use: downsampling needs NumPy, the rest of the app doesn't
+    try:
+        from src.mood_series import downsample
+    except ImportError:
+        from mood_series import downsample
+    times, scores = [], []
+    for profile in profiles:
+        sort_key = profile.get('sort_key', '')
+        if user and profile.get('user_name', '').lower() != user.lower():
+            continue
+        if (start and sort_key < start) or (end and sort_key[:len(end)] > end):
+            continue
+        try:
+            times.append(datetime.strptime(sort_key, '%Y%m%d_%H%M%S').timestamp())
+        except ValueError:
+            continue
+        scores.append(calculate_mood_score(profile))
+    xs, ys = downsample(times, scores, points, method)
+    return {
+        'method': method,
+        'total_points': len(times),
+        'points': [[datetime.fromtimestamp(x).isoformat(), y] for x, y in zip(xs, ys)],
+    }
+
+@app.route('/mood-series', methods=['GET'])
+def get_mood_series():
+    """
+    API endpoint returning the mood history as a compact JSON series for client-side
+    charts. Query parameters: points (default 200), method (lttb | minmax),
+    user, start and end (YYYY-MM-DD) to zoom into a range.
+    """
+    global _series_cache_profiles
+    points = request.args.get('points', default=MOOD_SERIES_DEFAULT_POINTS, type=int)
+    method = request.args.get('method', default='lttb')
+    user = request.args.get('user')
+    try:
+        start = _parse_series_bound(request.args.get('start'))
+        end = _parse_series_bound(request.args.get('end'))
+    except ValueError:
+        return jsonify({'error': 'start/end must be dates (YYYY-MM-DD)'}), 400
+    points = min(points, MOOD_SERIES_MAX_POINTS)
+
+    profiles = load_profiles()
+    key = (points, method, user and user.lower(), start, end)
+    with _series_lock:
+        if _series_cache_profiles != len(profiles):
+            _series_cache.clear()
+            _series_cache_profiles = len(profiles)
+        series = _series_cache.get(key)
+    if series is None:
+        try:
+            series = build_mood_series(profiles, points, method, user, start, end)
+        except ValueError as e: # Unknown method / too few points
+            return jsonify({'error': str(e)}), 400
+        with _series_lock:
+            if len(_series_cache) >= 256: # Arbitrary zoom ranges; don't let them pile up
+                _series_cache.clear()
+            _series_cache[key] = series
+    return jsonify(series)
+
+@app.route('/analytics/topics', methods=['GET'])
+def get_topic_analytics():
+    """
+    API endpoint for trending topics/tags and tag x mood co-occurrence, served from
+    the incrementally maintained counters (profile_analytics.py). Query parameters:
+    days (default 30, 0 = all time), user, limit (default 10).
+    """
+    days = request.args.get('days', default=30, type=int)
+    limit = request.args.get('limit', default=10, type=int)
+    return jsonify(analytics_summary(days or None, request.args.get('user'), max(1, min(limit, 100))))
+
+def _is_admin() -> bool:
+    """True if the X-Admin-Token header matches ADMIN_TOKEN (never when it is unset)."""
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(request.headers.get('X-Admin-Token', ''), ADMIN_TOKEN)
+
+@app.route('/alerts', methods=['GET'])
+def get_alerts():
+    """
+    API endpoint listing escalation alerts (live and watcher). Optional ?since=<epoch seconds>.
+    The excerpt of the user's words is only included for the X-Admin-Token holder.
+    """
+    since = request.args.get('since', default=0.0, type=float)
+    alerts = read_alerts(since=since)
+    if not _is_admin():
+        alerts = [{key: value for key, value in alert.items() if key != 'excerpt'} for alert in alerts]
+    return jsonify({'alerts': alerts})
+
+@app.route('/admin/profile', methods=['GET', 'POST', 'DELETE'])
+def admin_profile():
+    """
+    Admin endpoint for on-demand profiling (see profiling.py). POST arms it for the
+    next ?count= requests of each path (?mode=cprofile|sample, ?stage= to limit it
+    to e.g. http_mood-trends), GET shows the state, DELETE disarms. Requires the
+    X-Admin-Token header to match ADMIN_TOKEN.
+    """
+    if not ADMIN_TOKEN:
+        return jsonify({'error': 'Not found'}), 404
+    if not _is_admin():
+        return jsonify({'error': 'Forbidden'}), 403
+    if request.method == 'DELETE':
+        profiling.disarm()
+    elif request.method == 'POST':
+        try:
+            return jsonify(profiling.arm(request.args.get('count', default=profiling.PROFILE_CAPTURE_COUNT, type=int),
+                                         request.args.get('mode', default=profiling.PROFILE_MODE),
+                                         request.args.getlist('stage') or None))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+    return jsonify({'armed': profiling.status()})
+
+CONVERSATION_ID_RE = re.compile(r"^[A-Za-z0-9_-]+$")
+
+@app.route('/api/conversations/<conversation_id>', methods=['GET'])
+def get_conversation_detail(conversation_id):
+    """
+    API endpoint serving a locally stored transcript. Optional ?start=&limit= query
+    parameters page through the turns; only the needed segments are decompressed.
+    Transcripts compacted into monthly archives are served the same way.
+    """
+    if not CONVERSATION_ID_RE.match(conversation_id): # Keeps glob patterns out of the lookup
+        return jsonify({'error': 'Invalid conversation id'}), 400
+    candidates = glob.glob(f"conversations/conversation_{conversation_id}_*{TRANSCRIPT_EXT}")
+    candidates += glob.glob(f"conversations/conversation_{conversation_id}_*.txt")
+    candidates += find_archived_transcripts(conversation_id)
+    if not candidates:
+        return jsonify({'error': 'Conversation not found'}), 404
+    filepath = max(candidates, key=transcript_basename) # Latest save wins (timestamped filenames)
+
+    start = request.args.get('start', default=0, type=int)
+    limit = request.args.get('limit', default=None, type=int)
+    stop = start + limit if limit is not None else None
+
+    index = load_index(filepath) if is_structured(filepath) else None
+    turns = read_turns(filepath, start, stop)
+    return jsonify({
+        'conversation_id': conversation_id,
+        'turn_count': index['turn_count'] if index else len(turns),
+        'transcript': turns,
+    })
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus scrape endpoint."""
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
 def analyze_emotional_degradation(profiles: list) -> str:
     """Analyze if there's emotional degradation over time."""
     if len(profiles) < 7:  # Need at least 7 days of data
@@ -176,4 +319,5 @@ def analyze_emotional_degradation(profiles: list) -> str:
     return "No significant degradation detected"
 
 if __name__ == "__main__":
+    migrate_flat_profiles() # Profiles saved before the sharded layout
     app.run(debug=True, port=5000) 
\ No newline at end of file
@@ -0,0 +1,268 @@
+import os
+import time
+import sqlite3
+import argparse
+
+try:
+    from src.profile_store import PROFILE_DIR, user_key, iter_profiles
+    from src.profile_schema import normalize_tag
+except ImportError:
+    from profile_store import PROFILE_DIR, user_key, iter_profiles
+    from profile_schema import normalize_tag
+
+# Topic/tag analytics, maintained incrementally as profiles are saved. Counters are
+# kept per user and per day, so any time window (and the global view, summed over
+# users) is answered from the counters instead of rescanning profiles:
+#   term_counts    - how often each topic / tag appears
+#   tag_moods      - tag x reported mood ("lonely", "anxious", ...)
+#   tag_directions - tag x mood direction vs. the user's previous profile
+#                    (worsening / improving / stable, from calculate_mood_score)
+# Each profile is counted once (recorded_profiles), so re-recording or a rebuild
+# from the manifest is safe. SQLite (WAL) like the lease registry, since agent.py
+# and the watcher both save profiles.
+ANALYTICS_DB = os.getenv("PROFILE_ANALYTICS_DB", "profile_analytics.db")
+DIRECTIONS = ("worsening", "improving", "stable")
+DAY_FORMAT = "%Y%m%d"
+
+# Mood categories and their weights, keyed like normalized tags without the '#'
+# (profile_schema.normalize_tag: "#withdrawn")
+MOOD_CATEGORIES = {
+    "withdrawn": -2,
+    "open": 2,
+    "angry": -1,
+    "anxious": -1,
+    "hopeful": 2
+}
+
+def calculate_mood_score(profile_data: dict) -> float:
+    """Calculate a numerical score for the mood."""
+    mood = profile_data.get('mood', 'neutral').lower()
+    tags = profile_data.get('profile_tags', [])
+
+    # Base score from mood
+    score = 0
+    if mood in ['happy', 'hopeful']:
+        score = 2
+    elif mood in ['sad', 'lonely', 'anxious']:
+        score = -1
+    elif mood == 'neutral':
+        score = 0
+
+    # Adjust score based on tags
+    for tag in tags:
+        tag = (normalize_tag(str(tag)) or '').lstrip('#')
+        if tag in MOOD_CATEGORIES:
+            score += MOOD_CATEGORIES[tag]
+
+    return score
+
+def _connect(db_path: str = None) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path or ANALYTICS_DB, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL") # Readers don't block the writer
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS recorded_profiles (
+            profile TEXT PRIMARY KEY
+        );
+        CREATE TABLE IF NOT EXISTS user_state (
+            user TEXT PRIMARY KEY,
+            last_score REAL NOT NULL,
+            last_ts REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS term_counts (
+            user TEXT NOT NULL,
+            day TEXT NOT NULL,            -- YYYYMMDD
+            kind TEXT NOT NULL,           -- 'topic' or 'tag'
+            term TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (user, day, kind, term)
+        );
+        CREATE TABLE IF NOT EXISTS tag_moods (
+            user TEXT NOT NULL,
+            day TEXT NOT NULL,
+            tag TEXT NOT NULL,
+            mood TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (user, day, tag, mood)
+        );
+        CREATE TABLE IF NOT EXISTS tag_directions (
+            user TEXT NOT NULL,
+            day TEXT NOT NULL,
+            tag TEXT NOT NULL,
+            direction TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (user, day, tag, direction)
+        );
+        CREATE TABLE IF NOT EXISTS profile_counts (
+            user TEXT NOT NULL,
+            day TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (user, day)
+        );
+        CREATE INDEX IF NOT EXISTS term_counts_day ON term_counts (day);
+    """)
+    return conn
+
+def _terms(profile_data: dict) -> tuple[list, list]:
+    """Deduplicated, normalized (topics, tags) of a profile."""
+    topics = {str(t).strip().lower() for t in profile_data.get("topics") or [] if str(t).strip()}
+    tags = {normalize_tag(str(t)) for t in profile_data.get("profile_tags") or []} - {None}
+    return sorted(topics), sorted(tags)
+
+def record_profile(profile_data: dict, profile_id: str, created_at: float | None = None,
+                   db_path: str = None) -> bool:
+    """
+    Adds one saved profile to the counters. `profile_id` identifies the profile
+    (its file name) so it is only ever counted once. Returns False if it already was.
+    """
+    created_at = time.time() if created_at is None else created_at
+    day = time.strftime(DAY_FORMAT, time.localtime(created_at))
+    user = user_key(profile_data.get("user_name"))
+    mood = str(profile_data.get("mood") or "neutral").strip().lower()
+    topics, tags = _terms(profile_data)
+    score = calculate_mood_score(profile_data)
+
+    conn = _connect(db_path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        if conn.execute("INSERT OR IGNORE INTO recorded_profiles (profile) VALUES (?)",
+                        (profile_id,)).rowcount == 0:
+            conn.execute("ROLLBACK")
+            return False
+
+        previous = conn.execute("SELECT last_score, last_ts FROM user_state WHERE user = ?", (user,)).fetchone()
+        direction = None
+        if previous is not None and previous[1] <= created_at:
+            direction = "worsening" if score < previous[0] else "improving" if score > previous[0] else "stable"
+        if previous is None or previous[1] <= created_at:
+            conn.execute("""
+                INSERT INTO user_state (user, last_score, last_ts) VALUES (?, ?, ?)
+                ON CONFLICT(user) DO UPDATE SET last_score = excluded.last_score, last_ts = excluded.last_ts
+            """, (user, score, created_at))
+
+        conn.execute("""
+            INSERT INTO profile_counts (user, day, count) VALUES (?, ?, 1)
+            ON CONFLICT(user, day) DO UPDATE SET count = count + 1
+        """, (user, day))
+        conn.executemany("""
+            INSERT INTO term_counts (user, day, kind, term, count) VALUES (?, ?, ?, ?, 1)
+            ON CONFLICT(user, day, kind, term) DO UPDATE SET count = count + 1
+        """, [(user, day, "topic", t) for t in topics] + [(user, day, "tag", t) for t in tags])
+        conn.executemany("""
+            INSERT INTO tag_moods (user, day, tag, mood, count) VALUES (?, ?, ?, ?, 1)
+            ON CONFLICT(user, day, tag, mood) DO UPDATE SET count = count + 1
+        """, [(user, day, t, mood) for t in tags])
+        if direction:
+            conn.executemany("""
+                INSERT INTO tag_directions (user, day, tag, direction, count) VALUES (?, ?, ?, ?, 1)
+                ON CONFLICT(user, day, tag, direction) DO UPDATE SET count = count + 1
+            """, [(user, day, t, direction) for t in tags])
+        conn.execute("COMMIT")
+        return True
+    except BaseException:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+def _window(days: int | None, now: float | None = None) -> tuple[str, str | None]:
+    """(first day of the window, first day of the equally long window before it) as YYYYMMDD."""
+    if not days:
+        return "00000000", None
+    now = time.time() if now is None else now
+    start = time.strftime(DAY_FORMAT, time.localtime(now - (days - 1) * 86400))
+    previous = time.strftime(DAY_FORMAT, time.localtime(now - (2 * days - 1) * 86400))
+    return start, previous
+
+def _user_filter(user: str | None) -> tuple[str, tuple]:
+    return (" AND user = ?", (user_key(user),)) if user else ("", ())
+
+def summary(days: int | None = 30, user: str | None = None, limit: int = 10, db_path: str = None,
+            now: float | None = None) -> dict:
+    """
+    Top topics and tags in the last `days` days (None = all time), with their count
+    in the preceding window of the same length, and how each tag co-occurs with
+    moods and mood direction. Optionally for a single user.
+    """
+    start, previous_start = _window(days, now)
+    where, params = _user_filter(user)
+    conn = _connect(db_path)
+    try:
+        profiles = conn.execute(f"SELECT COALESCE(SUM(count), 0) FROM profile_counts WHERE day >= ?{where}",
+                                (start, *params)).fetchone()[0]
+        terms = {}
+        for kind in ("topic", "tag"):
+            rows = conn.execute(f"""
+                SELECT term, SUM(count) AS total FROM term_counts
+                WHERE kind = ? AND day >= ?{where} GROUP BY term ORDER BY total DESC, term LIMIT ?
+            """, (kind, start, *params, limit)).fetchall()
+            previous = {}
+            if previous_start and rows:
+                previous = dict(conn.execute(f"""
+                    SELECT term, SUM(count) FROM term_counts
+                    WHERE kind = ? AND day >= ? AND day < ?{where} AND term IN ({",".join("?" * len(rows))})
+                    GROUP BY term
+                """, (kind, previous_start, start, *params, *(term for term, _ in rows))).fetchall())
+            terms[kind] = [{"term": term, "count": total, "previous_count": previous.get(term, 0)}
+                           for term, total in rows]
+
+        tag_moods = {}
+        for tag, mood, total in conn.execute(f"""
+            SELECT tag, mood, SUM(count) FROM tag_moods WHERE day >= ?{where} GROUP BY tag, mood
+        """, (start, *params)):
+            tag_moods.setdefault(tag, {})[mood] = total
+        tag_directions = {}
+        for tag, direction, total in conn.execute(f"""
+            SELECT tag, direction, SUM(count) FROM tag_directions WHERE day >= ?{where} GROUP BY tag, direction
+        """, (start, *params)):
+            tag_directions.setdefault(tag, dict.fromkeys(DIRECTIONS, 0))[direction] = total
+    finally:
+        conn.close()
+
+    worsening = []
+    for tag, counts in tag_directions.items():
+        total = sum(counts.values())
+        worsening.append({"tag": tag, **counts, "worsening_share": round(counts["worsening"] / total, 3)})
+    worsening.sort(key=lambda row: (-row["worsening_share"], -row["worsening"], row["tag"]))
+    return {
+        "days": days,
+        "user": user_key(user) if user else None,
+        "profiles": profiles,
+        "topics": terms["topic"],
+        "tags": [dict(row, moods=tag_moods.get(row["term"], {})) for row in terms["tag"]],
+        "tags_by_worsening_mood": worsening[:limit],
+    }
+
+def rebuild(profile_dir: str = PROFILE_DIR, db_path: str = None) -> int:
+    """Records every profile in the manifest (live or archived) not counted yet. Returns the number added."""
+    added = 0
+    for entry, profile_data in iter_profiles(profile_dir):
+        if record_profile(profile_data, os.path.basename(entry["path"]), entry["ts"], db_path):
+            added += 1
+    return added
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Topic/tag analytics over saved profiles.")
+    parser.add_argument("--db", default=ANALYTICS_DB)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    rebuild_parser = subparsers.add_parser("rebuild", help="Count profiles from the manifest that aren't counted yet.")
+    rebuild_parser.add_argument("--dir", default=PROFILE_DIR)
+    top_parser = subparsers.add_parser("top", help="Print trending topics/tags.")
+    top_parser.add_argument("--days", type=int, default=30, help="Window in days (0 = all time).")
+    top_parser.add_argument("--user", default=None)
+    top_parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.command == "rebuild":
+        print(f"--- Recorded {rebuild(args.dir, args.db)} profiles in {args.db} ---")
+    else:
+        result = summary(args.days or None, args.user, args.limit, args.db)
+        print(f"--- {result['profiles']} profiles in the last {args.days or 'all'} days ---")
+        for kind in ("topics", "tags"):
+            print(f"{kind.capitalize()}:")
+            for row in result[kind]:
+                print(f"  {row['term']:<30} {row['count']:>6}  (previous window: {row['previous_count']})")
+        print("Tags by share of worsening mood:")
+        for row in result["tags_by_worsening_mood"]:
+            print(f"  {row['tag']:<30} {100 * row['worsening_share']:>5.1f}%  "
+                  f"({row['worsening']} worsening / {row['improving']} improving / {row['stable']} stable)")
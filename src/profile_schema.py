@@ -0,0 +1,262 @@
+import re
+import json
+
+# Strict shape of a user profile plus a tolerant parser for LLM output. Responses
+# that are truncated (max_tokens), wrapped in prose or written with single
+# quotes / Python literals are repaired locally instead of being discarded, and
+# every field is coerced to the schema with defaults for anything missing.
+MAX_TOPICS = 5
+MAX_TAGS = 5
+MAX_TEXT_CHARS = 600
+
+PROFILE_DEFAULTS = {
+    "user_name": "Unknown",
+    "mood": "neutral",
+    "emotion_trend": "stable",
+    "topics": [],
+    "profile_tags": [],
+    "persona_summary": "No summary available",
+}
+
+# Parse results, also used as metric labels
+PARSE_OK = "ok"             # Valid JSON that already matched the schema
+PARSE_COERCED = "coerced"   # Valid JSON, fields fixed up to match the schema
+PARSE_REPAIRED = "repaired" # Needed text repair (extraction, quoting, truncation) before parsing
+PARSE_FAILED = "failed"
+
+_PY_LITERALS = {"True": "true", "False": "false", "None": "null"}
+
+def strip_fences(text: str) -> str:
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else text[3:]
+        if text.startswith("json"):
+            text = text[4:]
+        text = text.rsplit("```", 1)[0]
+    return text.strip()
+
+def extract_json_object(text: str) -> str | None:
+    """
+    Returns the first balanced {...} in text (ignoring braces inside strings), or
+    everything from the first "{" when the object is cut off.
+    """
+    start = text.find("{")
+    if start < 0:
+        return None
+    depth = 0
+    quote = None
+    escaped = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if quote:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == quote:
+                quote = None
+        elif ch in "\"'":
+            quote = ch
+        elif ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    return text[start:]
+
+def _normalize_syntax(text: str) -> str:
+    """
+    Rewrites common non-JSON syntax outside of strings: single-quoted strings,
+    Python literals, bare keys and trailing commas.
+    """
+    out = []
+    i = 0
+    n = len(text)
+    while i < n:
+        ch = text[i]
+        if ch == '"' or ch == "'":
+            # Copy a string, re-quoting single-quoted ones with double quotes
+            quote = ch
+            out.append('"')
+            i += 1
+            while i < n and text[i] != quote:
+                c = text[i]
+                if c == "\\" and i + 1 < n:
+                    nxt = text[i + 1]
+                    out.append(nxt if (quote == "'" and nxt == "'") else c + nxt)
+                    i += 2
+                    continue
+                if c == '"' and quote == "'":
+                    out.append('\\"')
+                elif c == "\n":
+                    out.append("\\n")
+                else:
+                    out.append(c)
+                i += 1
+            if i < n:
+                out.append('"')
+            i += 1
+        elif ch.isalpha() or ch == "_":
+            j = i
+            while j < n and (text[j].isalnum() or text[j] == "_"):
+                j += 1
+            word = text[i:j]
+            rest = text[j:].lstrip()
+            if word in _PY_LITERALS:
+                out.append(_PY_LITERALS[word])
+            elif rest.startswith(":"):
+                out.append(f'"{word}"') # Bare key
+            else:
+                out.append(word)
+            i = j
+        elif ch == ",":
+            rest = text[i + 1:].lstrip()
+            if not rest.startswith(("}", "]")):
+                out.append(ch)
+            i += 1
+        else:
+            out.append(ch)
+            i += 1
+    return "".join(out)
+
+def _truncation_candidates(text: str) -> list:
+    """Ways to close an object cut off mid-way, most complete first."""
+    stack = []
+    in_string = False
+    escaped = False
+    commas = [] # (index, open brackets at that point)
+    for i, ch in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        elif ch in "}]":
+            if stack:
+                stack.pop()
+        elif ch == ",":
+            commas.append((i, list(stack)))
+    if not stack and not in_string:
+        return []
+
+    tail = (text[:-1] if escaped else text) + ('"' if in_string else "")
+    tail = tail.rstrip()
+    if tail.endswith(","):
+        tail = tail[:-1]
+    elif tail.endswith(":"):
+        tail += " null"
+    closed = tail + "".join(reversed(stack))
+    # Fall back to dropping the last partial element(s)
+    dropped = [text[:index] + "".join(reversed(open_brackets)) for index, open_brackets in reversed(commas[-20:])]
+    if in_string and stack[-1] == "]":
+        return dropped + [closed] # A cut-off list item ("daugh") is worse than no item
+    return [closed] + dropped
+
+def _loads_dict(text: str) -> dict | None:
+    try:
+        data = json.loads(text)
+    except (json.JSONDecodeError, ValueError):
+        return None
+    if isinstance(data, list):
+        data = next((item for item in data if isinstance(item, dict)), None)
+    return data if isinstance(data, dict) else None
+
+def repair_json(text: str) -> dict | None:
+    """Best-effort local repair of a malformed JSON object. Returns None if nothing parses."""
+    extracted = extract_json_object(strip_fences(text))
+    if extracted is None:
+        return None
+    for candidate in (extracted, _normalize_syntax(extracted)):
+        data = _loads_dict(candidate)
+        if data is not None:
+            return data
+        for closed in _truncation_candidates(candidate):
+            data = _loads_dict(closed)
+            if data is not None:
+                return data
+    return None
+
+def _text(value, default: str) -> str:
+    if isinstance(value, list):
+        value = ", ".join(str(v) for v in value if v not in (None, ""))
+    if value is None or isinstance(value, (dict, bool)):
+        return default
+    value = " ".join(str(value).split())
+    return value[:MAX_TEXT_CHARS] if value else default
+
+def _string_list(value) -> list:
+    if isinstance(value, str):
+        value = re.split(r"[,;\n]", value)
+    if not isinstance(value, list):
+        return []
+    items = []
+    for item in value:
+        if isinstance(item, (str, int, float)) and not isinstance(item, bool):
+            item = " ".join(str(item).split())
+            if item and item.lower() not in (existing.lower() for existing in items):
+                items.append(item)
+    return items
+
+def normalize_tag(tag: str) -> str | None:
+    """"Seeks Reassurance" -> "#seeks_reassurance"."""
+    tag = re.sub(r"[^a-z0-9]+", "_", tag.lower().lstrip("#")).strip("_")
+    return f"#{tag}" if tag else None
+
+def validate_profile(data: dict) -> tuple[dict, list]:
+    """
+    Coerces `data` to the profile schema. Returns (profile, problems) where problems
+    lists the fields that had to be fixed or defaulted. Unknown keys are dropped.
+    """
+    problems = [key for key in data if key not in PROFILE_DEFAULTS]
+    profile = {}
+    for key in ("user_name", "mood", "emotion_trend", "persona_summary"):
+        value = _text(data.get(key), PROFILE_DEFAULTS[key])
+        if key == "mood":
+            value = value.lower()
+        if value != data.get(key):
+            problems.append(key)
+        profile[key] = value
+
+    topics = [topic[:60] for topic in _string_list(data.get("topics"))][:MAX_TOPICS]
+    if topics != data.get("topics"):
+        problems.append("topics")
+    profile["topics"] = topics
+
+    tags = []
+    for tag in _string_list(data.get("profile_tags")):
+        tag = normalize_tag(tag)
+        if tag and tag not in tags:
+            tags.append(tag)
+    tags = tags[:MAX_TAGS]
+    if tags != data.get("profile_tags"):
+        problems.append("profile_tags")
+    profile["profile_tags"] = tags
+    return {key: profile[key] for key in PROFILE_DEFAULTS}, problems
+
+def parse_profile(text: str | None) -> tuple[dict | None, str]:
+    """
+    Parses an LLM profile response. Returns (profile, result) where result is one of
+    PARSE_OK, PARSE_COERCED, PARSE_REPAIRED or PARSE_FAILED (profile is None). An
+    object with none of the profile keys counts as failed.
+    """
+    if not text:
+        return None, PARSE_FAILED
+    data = _loads_dict(strip_fences(text))
+    repaired = data is None
+    if repaired:
+        data = repair_json(text)
+        if data is None:
+            return None, PARSE_FAILED
+    if not any(key in data for key in PROFILE_DEFAULTS):
+        return None, PARSE_FAILED # Some other object: an all-defaults profile would pass for a real one
+    profile, problems = validate_profile(data)
+    if repaired:
+        return profile, PARSE_REPAIRED
+    return profile, PARSE_COERCED if problems else PARSE_OK
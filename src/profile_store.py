@@ -0,0 +1,209 @@
+import os
+import re
+import json
+import time
+import uuid
+import hashlib
+import argparse
+import threading
+
+# Profile storage layout:
+#   user_profiles/<hh>/<user>/<YYYY>/<MM>/<DD>/user_profile_<source>_<YYYYMMDD_HHMMSS>_<id>.json
+#   user_profiles/manifest.jsonl  - append-only, one line per saved profile
+# <hh> is two hex digits of a hash of <user>, so no directory grows past a few
+# hundred entries even with millions of profiles. Profiles are written to a temp
+# file and renamed into place, then recorded in the manifest; consumers tail the
+# manifest (ManifestReader) instead of globbing the tree, and never see a manifest
+# line for a profile that isn't complete on disk.
+PROFILE_DIR = "user_profiles"
+MANIFEST_NAME = "manifest.jsonl"
+TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S"
+
+_manifest_lock = threading.Lock()
+
+def user_key(user_name: str | None) -> str:
+    """Directory-safe user shard name: "Mary O'Neil" -> "mary-o-neil"."""
+    slug = re.sub(r"[^a-z0-9]+", "-", (user_name or "").lower()).strip("-")[:40]
+    return slug or "unknown"
+
+def manifest_path(profile_dir: str = PROFILE_DIR) -> str:
+    return os.path.join(profile_dir, MANIFEST_NAME)
+
+def shard_dir(profile_dir: str, user: str, created: time.struct_time) -> str:
+    bucket = hashlib.md5(user.encode("utf-8")).hexdigest()[:2]
+    return os.path.join(profile_dir, bucket, user, time.strftime("%Y", created),
+                        time.strftime("%m", created), time.strftime("%d", created))
+
+def atomic_write_json(data, filepath: str, indent: int | None = 2):
+    """Writes JSON to a temp file in the target directory, fsyncs, then renames it into place."""
+    directory = os.path.dirname(filepath) or "."
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = os.path.join(directory, f".{os.path.basename(filepath)}.{uuid.uuid4().hex}.tmp")
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=indent)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, filepath) # Atomic on POSIX and Windows: readers see old or new, never partial
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def append_manifest(entry: dict, profile_dir: str = PROFILE_DIR):
+    """
+    Appends one manifest line. The whole line goes out in a single append-mode
+    write, so concurrent writers don't interleave partial lines.
+    """
+    line = (json.dumps(entry, separators=(",", ":")) + "\n").encode("utf-8")
+    os.makedirs(profile_dir, exist_ok=True)
+    with _manifest_lock:
+        fd = os.open(manifest_path(profile_dir), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+
+def write_profile(profile_data: dict, source_name: str, profile_dir: str = PROFILE_DIR,
+                  created_at: float | None = None) -> str:
+    """
+    Saves a profile into its user/date shard and records it in the manifest.
+    `source_name` is the transcript base name it was generated from. Returns the path.
+    """
+    created_at = time.time() if created_at is None else created_at
+    created = time.localtime(created_at)
+    stamp = time.strftime(TIMESTAMP_FORMAT, created)
+    user = user_key(profile_data.get("user_name"))
+    # The random suffix makes names unique even for two saves of the same source in one second
+    filename = f"user_profile_{source_name}_{stamp}_{uuid.uuid4().hex[:8]}.json"
+    filepath = os.path.join(shard_dir(profile_dir, user, created), filename)
+    atomic_write_json(profile_data, filepath)
+    append_manifest({
+        "path": os.path.relpath(filepath, profile_dir),
+        "user": user,
+        "source": source_name,
+        "created": stamp,
+        "ts": round(created_at, 3),
+    }, profile_dir)
+    return filepath
+
+class ManifestReader:
+    """
+    Tails the manifest: each read_new() returns the entries appended since the
+    previous call (all of them on the first call). A trailing line without its
+    newline is an append in progress and is left for the next call.
+    """
+
+    def __init__(self, profile_dir: str = PROFILE_DIR, offset: int = 0):
+        self.profile_dir = profile_dir
+        self.offset = offset
+
+    def read_new(self) -> list:
+        path = manifest_path(self.profile_dir)
+        try:
+            with open(path, 'rb') as f:
+                f.seek(self.offset)
+                data = f.read()
+        except FileNotFoundError:
+            return []
+        end = data.rfind(b"\n") + 1
+        entries = []
+        for line in data[:end].splitlines():
+            if line.strip():
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    print(f"Warning: Skipping corrupt manifest line in {path}")
+        self.offset += end
+        return entries
+
+    def profile_path(self, entry: dict) -> str:
+        return os.path.join(self.profile_dir, entry["path"])
+
+def load_offset(checkpoint_path: str) -> int:
+    try:
+        with open(checkpoint_path, 'r', encoding='utf-8') as f:
+            return int(f.read().strip() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+def save_offset(checkpoint_path: str, offset: int):
+    atomic_write_json(offset, checkpoint_path)
+
+def load_profile(entry: dict, profile_dir: str = PROFILE_DIR) -> dict | None:
+    """
+    Loads the profile for a manifest entry, from its shard or, once compacted,
+    from the monthly archive. None if it was purged or can't be read.
+    """
+    try:
+        with open(os.path.join(profile_dir, entry["path"]), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        pass
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Warning: Could not read profile {entry.get('path')}: {e}")
+        return None
+    try:
+        from src.archive_store import load_archived_profile
+    except ImportError:
+        from archive_store import load_archived_profile
+    try:
+        return load_archived_profile(entry, profile_dir)
+    except (OSError, ValueError) as e:
+        print(f"Warning: Could not read archived profile {entry.get('path')}: {e}")
+        return None
+
+def iter_profiles(profile_dir: str = PROFILE_DIR):
+    """Yields (entry, profile_data) for every profile in the manifest, live or archived."""
+    for entry in ManifestReader(profile_dir).read_new():
+        profile_data = load_profile(entry, profile_dir)
+        if profile_data is not None:
+            yield entry, profile_data
+
+def migrate_flat_profiles(profile_dir: str = PROFILE_DIR) -> int:
+    """
+    Moves legacy user_profiles/user_profile_*_<YYYYMMDD>_<HHMMSS>.json files into
+    the sharded layout and records them in the manifest. Returns the number moved.
+    """
+    moved = 0
+    if not os.path.isdir(profile_dir):
+        return 0
+    with os.scandir(profile_dir) as entries:
+        flat = sorted(e.path for e in entries if e.is_file() and e.name.startswith("user_profile_")
+                      and e.name.endswith(".json"))
+    for old_path in flat:
+        name = os.path.basename(old_path)[:-len(".json")]
+        parts = name.split("_")
+        try:
+            created_at = time.mktime(time.strptime(f"{parts[-2]}_{parts[-1]}", TIMESTAMP_FORMAT))
+            source_name = "_".join(parts[2:-2])
+        except (ValueError, IndexError):
+            created_at, source_name = os.path.getmtime(old_path), "_".join(parts[2:])
+        try:
+            with open(old_path, 'r', encoding='utf-8') as f:
+                profile_data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Warning: Skipping unreadable profile {old_path}: {e}")
+            continue
+        write_profile(profile_data, source_name, profile_dir, created_at=created_at)
+        os.remove(old_path)
+        moved += 1
+    return moved
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the sharded user profile store.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    migrate_parser = subparsers.add_parser("migrate", help="Move flat user_profiles/*.json files into shards.")
+    migrate_parser.add_argument("--dir", default=PROFILE_DIR)
+    stats_parser = subparsers.add_parser("stats", help="Count profiles per user from the manifest.")
+    stats_parser.add_argument("--dir", default=PROFILE_DIR)
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        print(f"--- Migrated {migrate_flat_profiles(args.dir)} profiles into {args.dir} ---")
+    else:
+        counts = {}
+        for entry in ManifestReader(args.dir).read_new():
+            counts[entry["user"]] = counts.get(entry["user"], 0) + 1
+        for user, count in sorted(counts.items(), key=lambda item: -item[1]):
+            print(f"{user}: {count}")
@@ -0,0 +1,179 @@
+import os
+import re
+import sys
+import time
+import signal
+import threading
+from contextlib import contextmanager
+
+# On-demand profiling for long-running processes (watcher, Flask apps). Nothing is
+# captured until arm() is called (SIGUSR1 or the mood tracker's /admin/profile);
+# until then capture() is two flag checks. Once armed, the next
+# PROFILE_CAPTURE_COUNT runs of each stage are captured, one file per run, in
+# PROFILE_DIR:
+#   cprofile - <stage>_<time>_<n>.pstats, exact per-function call counts and times;
+#              open with pstats, snakeviz, or turn into a flame graph with flameprof
+#   sample   - <stage>_<time>_<n>.folded, wall-clock stack samples of the running
+#              thread every PROFILE_SAMPLE_INTERVAL_MS, in the "folded" format read
+#              by flamegraph.pl / speedscope; low overhead, includes time spent waiting
+# Only one capture runs at a time (cProfile can't be enabled twice); runs that start
+# while another is being captured are skipped and don't use up the budget. Profiling
+# disarms itself once every requested capture is taken or after PROFILE_ARM_SECONDS.
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_CAPTURE_COUNT = int(os.getenv("PROFILE_CAPTURE_COUNT", "5"))
+PROFILE_MODE = os.getenv("PROFILE_MODE", "cprofile")
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5"))
+PROFILE_ARM_SECONDS = int(os.getenv("PROFILE_ARM_SECONDS", "600"))
+MODES = ("cprofile", "sample")
+
+_armed = None # {"mode", "count", "stages", "taken": {stage: n}, "expires_at"} while armed
+_arm_requested = False # Set by the signal handler, which must not take _state_lock itself
+_state_lock = threading.Lock()
+_capture_lock = threading.Lock()
+
+def arm(count: int = PROFILE_CAPTURE_COUNT, mode: str = PROFILE_MODE, stages: list | None = None) -> dict:
+    """Captures the next `count` runs of each stage (or only of `stages`). Returns the armed settings."""
+    global _armed
+    if mode not in MODES:
+        raise ValueError(f"Unknown profiling mode '{mode}', expected one of {MODES}")
+    if count < 1:
+        raise ValueError("count must be at least 1")
+    with _state_lock:
+        _armed = {"mode": mode, "count": count, "stages": set(stages) if stages else None, "taken": {},
+                  "expires_at": time.time() + PROFILE_ARM_SECONDS}
+    print(f"--- Profiling armed: next {count} run(s) of {', '.join(stages) if stages else 'every stage'} ({mode}) ---")
+    return {"mode": mode, "count": count, "stages": sorted(stages) if stages else None, "dir": PROFILE_DIR}
+
+def disarm():
+    global _armed
+    with _state_lock:
+        _armed = None
+
+def status() -> dict | None:
+    with _state_lock:
+        return None if _armed is None else {**_armed, "stages": sorted(_armed["stages"] or []) or None,
+                                            "taken": dict(_armed["taken"])}
+
+def _claim(stage: str) -> tuple | None:
+    """Reserves a capture slot for this run of `stage`. Returns (mode, n) or None."""
+    global _armed, _arm_requested
+    if _arm_requested:
+        _arm_requested = False
+        arm()
+    with _state_lock:
+        armed = _armed
+        if armed is not None and time.time() > armed["expires_at"]:
+            _armed = armed = None
+        if armed is None or (armed["stages"] and stage not in armed["stages"]):
+            return None
+        n = armed["taken"].get(stage, 0)
+        if n >= armed["count"]:
+            return None
+        armed["taken"][stage] = n + 1
+        stages_done = armed["stages"] and all(armed["taken"].get(s, 0) >= armed["count"] for s in armed["stages"])
+        if stages_done:
+            _armed = None # Back to zero overhead once every requested capture is taken
+        return armed["mode"], n + 1
+
+def _unclaim(stage: str):
+    with _state_lock:
+        if _armed is not None and _armed["taken"].get(stage):
+            _armed["taken"][stage] -= 1
+
+def _output_path(stage: str, n: int, ext: str) -> str:
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    safe_stage = re.sub(r"[^A-Za-z0-9_.-]+", "_", stage).strip("_") or "stage"
+    return os.path.join(PROFILE_DIR, f"{safe_stage}_{time.strftime('%Y%m%d_%H%M%S')}_{n}{ext}")
+
+class _StackSampler(threading.Thread):
+    """Samples one thread's stack at a fixed interval and counts folded stacks."""
+
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(daemon=True, name="profiling-sampler")
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = {}
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if names:
+                stack = ";".join(reversed(names))
+                self.stacks[stack] = self.stacks.get(stack, 0) + 1
+
+    def write(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in sorted(self.stacks.items()):
+                f.write(f"{stack} {count}\n")
+
+@contextmanager
+def capture(stage: str):
+    """Profiles the enclosed block if profiling is armed for `stage`; otherwise does nothing."""
+    if _armed is None and not _arm_requested: # The only cost when profiling is off
+        yield
+        return
+    claim = _claim(stage)
+    if claim is None or not _capture_lock.acquire(blocking=False):
+        if claim is not None:
+            _unclaim(stage) # Another capture is running; leave the slot for a later run
+        yield
+        return
+    mode, n = claim
+    try:
+        if mode == "cprofile":
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                yield
+            finally:
+                profiler.disable()
+                path = _output_path(stage, n, ".pstats")
+                profiler.dump_stats(path)
+        else:
+            sampler = _StackSampler(threading.get_ident(), PROFILE_SAMPLE_INTERVAL_MS / 1000)
+            sampler.start()
+            try:
+                yield
+            finally:
+                sampler.stopped.set()
+                sampler.join()
+                path = _output_path(stage, n, ".folded")
+                sampler.write(path)
+        print(f"--- Profile of {stage} written to {path} ---")
+    finally:
+        _capture_lock.release()
+
+def _request_arm(signum, frame):
+    # Runs on the main thread, possibly while it holds _state_lock inside _claim(), so it
+    # only sets a flag; the next capture() arms profiling (PROFILE_CAPTURE_COUNT runs, PROFILE_MODE)
+    global _arm_requested
+    _arm_requested = True
+
+def install_signal_handler(signum: int | None = None):
+    """Arms profiling on SIGUSR1 where available, from the next profiled stage on."""
+    signum = signum or getattr(signal, "SIGUSR1", None)
+    if signum is None:
+        return # Windows: use an admin endpoint instead
+    signal.signal(signum, _request_arm)
+    print(f"--- Profiling on demand: kill -USR1 {os.getpid()} ---")
+
+def wsgi_middleware(wsgi_app):
+    """Wraps a WSGI app so each request is a stage named after its path (e.g. http_mood-trends)."""
+    def profiled_app(environ, start_response):
+        if _armed is None and not _arm_requested:
+            return wsgi_app(environ, start_response)
+        with capture("http_" + environ.get("PATH_INFO", "/").strip("/")):
+            response = wsgi_app(environ, start_response)
+            try:
+                return list(response) # Consume the body inside the capture
+            finally:
+                if hasattr(response, "close"):
+                    response.close()
+    return profiled_app
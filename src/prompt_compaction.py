@@ -0,0 +1,137 @@
+import os
+import re
+import argparse
+from difflib import SequenceMatcher
+
+try:
+    from src.transcript_store import parse_text_transcript, read_transcript_text
+except ImportError:
+    from transcript_store import parse_text_transcript, read_transcript_text
+
+# Shrinks a transcript before it is sent to Groq. The profile is about the user,
+# so user turns are kept verbatim where possible (a bare "No." can answer "Are you
+# safe?"); agent turns are cut to their question (or first sentence), agent filler
+# and near-duplicate lines are dropped, and
+# the result is trimmed to PROMPT_TOKEN_BUDGET (agent lines go first, then the
+# oldest user lines after the opening of the call).
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "3000"))
+AGENT_TURN_MAX_CHARS = 120
+NEAR_DUPLICATE_RATIO = 0.9
+DUPLICATE_WINDOW = 6 # Compare each line against this many previous lines of the same role
+KEEP_OPENING_USER_TURNS = 2 # Never trimmed: names and the reason for calling usually come first
+MIN_DEDUPE_USER_WORDS = 4 # Shorter user turns are answers, kept even when repeated
+
+FILLER_RE = re.compile(
+    r"^(?:(?:ok(?:ay)?|mm+(?:-?hmm+)?|hmm+|uh(?:-?huh)?|um+|yeah|yes|yep|no|right|sure|"
+    r"i see|got it|alright|oh|ah|well|thanks|thank you)[\s,.!?…]*)+$",
+    re.IGNORECASE,
+)
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s")
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough Llama token count: words and punctuation marks. No tokenizer is shipped
+    with the Groq client, and this tracks it closely enough for budgeting.
+    """
+    return len(_TOKEN_RE.findall(text))
+
+def _normalize(message: str) -> str:
+    return " ".join(re.sub(r"[^\w\s]", " ", message.lower()).split())
+
+def _abbreviate_agent(message: str) -> str:
+    # The agent's question is what gives the next user turn its meaning
+    sentences = _SENTENCE_END_RE.split(message.strip())
+    first = next((s for s in sentences if s.endswith("?")), sentences[0])
+    if len(first) > AGENT_TURN_MAX_CHARS:
+        first = first[:AGENT_TURN_MAX_CHARS].rsplit(" ", 1)[0] + "…"
+    return first
+
+def _is_near_duplicate(normalized: str, recent: list) -> bool:
+    for previous in recent:
+        if normalized == previous:
+            return True
+        if SequenceMatcher(None, normalized, previous).ratio() >= NEAR_DUPLICATE_RATIO:
+            return True
+    return False
+
+def compact_transcript(transcript: str, token_budget: int = PROMPT_TOKEN_BUDGET) -> tuple[str, dict]:
+    """
+    Returns (compacted_text, stats) where stats has tokens_before, tokens_after,
+    turns_before and turns_after.
+    """
+    turns = parse_text_transcript(transcript)
+    tokens_before = estimate_tokens(transcript)
+    if not turns:
+        # Not in "User: / Agent:" form; only the budget can be applied
+        words = transcript.split()
+        text = transcript if tokens_before <= token_budget else " ".join(words[-token_budget:])
+        return text, {"tokens_before": tokens_before, "tokens_after": estimate_tokens(text),
+                      "turns_before": 0, "turns_after": 0}
+
+    lines = [] # (role, text)
+    recent = {"user": [], "agent": []}
+    for turn in turns:
+        message = " ".join(turn["message"].split())
+        if not message:
+            continue
+        if turn["role"] == "agent":
+            if FILLER_RE.match(message): # Only agent filler: a user's "No." may be the answer that matters
+                continue
+            message = _abbreviate_agent(message)
+        normalized = _normalize(message)
+        dedupe = turn["role"] == "agent" or len(normalized.split()) >= MIN_DEDUPE_USER_WORDS
+        if dedupe and _is_near_duplicate(normalized, recent[turn["role"]]):
+            continue
+        recent[turn["role"]] = (recent[turn["role"]] + [normalized])[-DUPLICATE_WINDOW:]
+        lines.append((turn["role"], message))
+
+    costs = [estimate_tokens(text) + 2 for _, text in lines] # +2 for the "User:" prefix and newline
+    total = sum(costs)
+    keep = [True] * len(lines)
+
+    # Over budget: drop agent lines oldest first, then user lines after the opening turns
+    if total > token_budget:
+        for i, (role, _) in enumerate(lines):
+            if total <= token_budget:
+                break
+            if role == "agent":
+                keep[i] = False
+                total -= costs[i]
+    omitted = 0
+    marker_cost = 10 # "[... N earlier user turns omitted ...]"
+    if total > token_budget:
+        user_seen = 0
+        for i, (role, _) in enumerate(lines):
+            if total <= token_budget - marker_cost:
+                break
+            if role != "user" or not keep[i]:
+                continue
+            user_seen += 1
+            if user_seen <= KEEP_OPENING_USER_TURNS:
+                continue
+            keep[i] = False
+            total -= costs[i]
+            omitted += 1
+
+    output = []
+    marker_added = False
+    for i, (role, text) in enumerate(lines):
+        if keep[i]:
+            output.append(f"{'User' if role == 'user' else 'Agent'}: {text}")
+        elif omitted and role == "user" and not marker_added:
+            output.append(f"[... {omitted} earlier user turns omitted ...]")
+            marker_added = True
+    compacted = "\n".join(output)
+    return compacted, {"tokens_before": tokens_before, "tokens_after": estimate_tokens(compacted),
+                       "turns_before": len(turns), "turns_after": len(output) - int(marker_added)}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show what the analyzer would send to Groq for a transcript.")
+    parser.add_argument("transcript_file", help="Path to a .jsonl.gz or .txt transcript.")
+    parser.add_argument("--budget", type=int, default=PROMPT_TOKEN_BUDGET, help="Token budget.")
+    args = parser.parse_args()
+    text, stats = compact_transcript(read_transcript_text(args.transcript_file), args.budget)
+    print(text)
+    print(f"\n--- ~{stats['tokens_before']} -> ~{stats['tokens_after']} tokens, "
+          f"{stats['turns_before']} -> {stats['turns_after']} turns ---")
@@ -0,0 +1,94 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from src.analyzer_agent import update_profile_with_llama
+    from src.transcript_store import format_turns
+    from src.metrics import ROLLING_ANALYSIS_PASSES
+except ImportError:
+    from analyzer_agent import update_profile_with_llama
+    from transcript_store import format_turns
+    from metrics import ROLLING_ANALYSIS_PASSES
+
+# Builds the user profile while the call is still running. Turns from the live
+# callbacks are collected here and, every ROLLING_WINDOW_USER_TURNS user turns,
+# the new window is folded into the running profile by a background Groq call.
+# At hang-up only the turns since the last window need a (small) delta pass.
+ROLLING_WINDOW_USER_TURNS = int(os.getenv("ROLLING_WINDOW_USER_TURNS", "6"))
+ROLLING_MIN_INTERVAL_SECONDS = float(os.getenv("ROLLING_MIN_INTERVAL_SECONDS", "20"))
+
+class RollingAnalyzer:
+    def __init__(self, api_key: str | None = None, window_user_turns: int = ROLLING_WINDOW_USER_TURNS,
+                 min_interval: float = ROLLING_MIN_INTERVAL_SECONDS):
+        self.api_key = api_key or os.getenv("GROQ_API_KEY")
+        self.window_user_turns = window_user_turns
+        self.min_interval = min_interval
+        self.turns = []
+        self.profile = None
+        self._analyzed = 0 # Turns already folded into self.profile (or submitted)
+        self._pending_user_turns = 0
+        self._last_submit = 0.0
+        self._future = None
+        self._lock = threading.Lock()
+        # One worker: windows must be applied in order, each on top of the previous profile
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rolling-analysis")
+
+    def add_turn(self, role: str, message: str):
+        """Records a turn from a live callback; may start a background window analysis."""
+        if not message:
+            return
+        with self._lock:
+            self.turns.append({"role": role, "message": message})
+            if role != "user":
+                return
+            self._pending_user_turns += 1
+            due = (self._pending_user_turns >= self.window_user_turns
+                   and time.monotonic() - self._last_submit >= self.min_interval
+                   and (self._future is None or self._future.done()))
+            if due and self.api_key:
+                self._submit_locked("window")
+
+    def _submit_locked(self, kind: str):
+        start = self._analyzed
+        self._analyzed = len(self.turns)
+        self._pending_user_turns = 0
+        self._last_submit = time.monotonic()
+        self._future = self._executor.submit(self._analyze_window, start, format_turns(self.turns[start:]), kind)
+        return self._future
+
+    def _analyze_window(self, start: int, window_text: str, kind: str):
+        started = time.perf_counter()
+        profile = update_profile_with_llama(self.profile, window_text, self.api_key)
+        ROLLING_ANALYSIS_PASSES.inc(kind=kind, outcome="ok" if profile else "failed")
+        if profile:
+            self.profile = profile
+            print(f"--- Rolling analysis ({kind}) updated the profile in {time.perf_counter() - started:.2f}s ---")
+        else:
+            # Keep the previous profile; the failed window is retried in the final delta pass
+            with self._lock:
+                self._analyzed = min(self._analyzed, start)
+        return profile
+
+    def finalize(self, timeout: float | None = 60) -> dict | None:
+        """
+        Waits for the window in flight, then runs the delta pass over any turns not
+        yet analyzed. Returns the profile for the whole call, or None if the rolling
+        analysis could not produce one (callers fall back to a full analysis).
+        """
+        try:
+            if self._future is not None:
+                self._future.result(timeout=timeout)
+            with self._lock:
+                future = self._submit_locked("delta") if self._analyzed < len(self.turns) and self.api_key else None
+            if future is not None:
+                future.result(timeout=timeout)
+        except Exception as e:
+            print(f"--- Rolling analysis did not finish: {e} ---")
+            return None
+        finally:
+            self._executor.shutdown(wait=False)
+        with self._lock:
+            # Only trust the profile if every recorded turn made it into it
+            return self.profile if self._analyzed >= len(self.turns) else None
@@ -1,23 +1,14 @@
 import schedule
 import time
-import os
 from datetime import datetime
-import glob
+from analyzer_agent import analyze_missing_profiles
 
 def analyze_new_transcripts():
     """Find and analyze any new transcripts in the conversations directory."""
     print(f"\n[{datetime.now()}] Starting scheduled analysis...")
-    
-    # Get all .txt files in conversations directory
-    transcript_files = glob.glob("conversations/*.txt")
-    
-    if not transcript_files:
-        print("No new transcripts found.")
-        return
-        
-    for transcript_file in transcript_files:
-        print(f"Analyzing {transcript_file}...")
-        os.system(f"python analyzer_agent.py {transcript_file}")
+    # In-process, and only transcripts without a profile: spawning one interpreter per
+    # file paid the full import cost every time and re-analyzed everything
+    analyze_missing_profiles("conversations")
 
 # Schedule the job to run daily at 6 AM
 schedule.every().day.at("06:00").do(analyze_new_transcripts)
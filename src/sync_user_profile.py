@@ -1,9 +1,8 @@
-import os
 import time
 import schedule
 from datetime import datetime
-import glob
 from knowledge_uploader import process_profiles
+from archive_store import run_compaction
 
 def sync_profiles():
     """Sync all profiles to ElevenLabs."""
@@ -12,19 +11,14 @@ def sync_profiles():
     print(f"[{datetime.now()}] Profile sync completed.")
 
 def check_new_conversations():
-    """Check for new conversations and sync if found."""
-    # Get the latest conversation file
-    conversation_files = glob.glob("conversations/*.txt")
-    if not conversation_files:
-        return
-        
-    latest_conversation = max(conversation_files, key=os.path.getctime)
-    latest_time = os.path.getctime(latest_conversation)
-    
-    # If conversation is less than 5 minutes old, sync profiles
-    if time.time() - latest_time < 300:  # 300 seconds = 5 minutes
-        print(f"\n[{datetime.now()}] New conversation detected, syncing profiles...")
-        sync_profiles()
+    """Upload profiles saved since the last check (tails the profile manifest)."""
+    print(f"\n[{datetime.now()}] Checking for new profiles...")
+    process_profiles(only_new=True)
+
+def compact_storage():
+    """Archive old transcripts/profiles and purge expired ones (see archive_store.py)."""
+    print(f"\n[{datetime.now()}] Compacting conversation and profile storage...")
+    run_compaction()
 
 def main():
     # Schedule sync every 2 days at 6 AM
@@ -32,6 +26,9 @@ def main():
     
     # Check for new conversations every 5 minutes
     schedule.every(5).minutes.do(check_new_conversations)
+
+    # Roll old data into archives daily, off-peak
+    schedule.every().day.at("03:00").do(compact_storage)
     
     print("Profile sync scheduler started.")
     print("Will run every 2 days at 6 AM and after new conversations.")
@@ -0,0 +1,157 @@
+import os
+import json
+import math
+import time
+import argparse
+import threading
+import contextvars
+from contextlib import contextmanager
+
+# Per-conversation tracing. The trace id is the conversation_id; it is carried in a
+# context variable so process_conversation -> analyze_and_save_profile ->
+# upload_profile_file (and agent.py's post-call path) record spans without having
+# to pass it through every function signature.
+TRACE_FILE = os.getenv("TRACE_FILE", os.path.join("traces", "spans.jsonl"))
+
+_current_trace = contextvars.ContextVar("cyra_trace_id", default=None)
+_write_lock = threading.Lock()
+
+def current_trace_id() -> str | None:
+    return _current_trace.get()
+
+def _write_span(record: dict):
+    directory = os.path.dirname(TRACE_FILE)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    line = json.dumps(record) + "\n"
+    with _write_lock:
+        with open(TRACE_FILE, 'a', encoding='utf-8') as f:
+            f.write(line)
+
+@contextmanager
+def trace_conversation(conversation_id: str, call_ended_at: float | None = None):
+    """Makes conversation_id the active trace for the enclosed block."""
+    token = _current_trace.set(conversation_id)
+    try:
+        if call_ended_at is not None:
+            mark("call_ended", ts=call_ended_at)
+        yield conversation_id
+    finally:
+        _current_trace.reset(token)
+
+@contextmanager
+def span(name: str, **attrs):
+    """Records a timed span under the active trace. No-op when no trace is active."""
+    trace_id = _current_trace.get()
+    if trace_id is None:
+        yield
+        return
+    start = time.time()
+    error = None
+    try:
+        yield
+    except Exception as e:
+        error = repr(e)
+        raise
+    finally:
+        end = time.time()
+        record = {"trace_id": trace_id, "span": name, "start": start, "end": end,
+                  "duration": end - start, **attrs}
+        if error:
+            record["error"] = error
+        _write_span(record)
+
+def mark(name: str, ts: float | None = None, **attrs):
+    """Records a zero-length event (e.g. call_ended, kb_updated) under the active trace."""
+    trace_id = _current_trace.get()
+    if trace_id is None:
+        return
+    ts = time.time() if ts is None else ts
+    _write_span({"trace_id": trace_id, "span": name, "start": ts, "end": ts, "duration": 0.0, **attrs})
+
+# --- Summary CLI ---
+
+def load_spans(filepath: str = TRACE_FILE) -> dict:
+    """Groups recorded spans by trace id."""
+    traces = {}
+    with open(filepath, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            traces.setdefault(record["trace_id"], []).append(record)
+    return traces
+
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+def critical_path(spans: list) -> list:
+    """
+    Returns (stage, seconds) pairs covering call_ended -> kb_updated: the top-level stage
+    spans in start order, with gaps between them reported as "waiting" (e.g. polling delay).
+    """
+    events = {s["span"]: s for s in spans if s["duration"] == 0.0}
+    stages = sorted((s for s in spans if s["duration"] > 0.0), key=lambda s: s["start"])
+    cursor = events["call_ended"]["end"] if "call_ended" in events else (stages[0]["start"] if stages else 0.0)
+    path = []
+    for stage in stages:
+        if stage["end"] <= cursor:
+            continue # Nested inside an earlier stage
+        if stage["start"] > cursor:
+            path.append(("waiting", stage["start"] - cursor))
+        path.append((stage["span"], stage["end"] - max(stage["start"], cursor)))
+        cursor = stage["end"]
+    return path
+
+def summarize(filepath: str = TRACE_FILE):
+    """Prints per-stage latency and p50/p95 "call ended -> KB updated" latency."""
+    if not os.path.exists(filepath):
+        print(f"No trace file found at {filepath}")
+        return
+    traces = load_spans(filepath)
+
+    stage_durations = {}
+    path_totals = {}
+    end_to_end = []
+    by_risk = {} # risk class (from the watcher's "queued" event) -> end-to-end latencies
+    for spans in traces.values():
+        for s in spans:
+            if s["duration"] > 0.0:
+                stage_durations.setdefault(s["span"], []).append(s["duration"])
+        events = {s["span"]: s["start"] for s in spans if s["duration"] == 0.0}
+        if "call_ended" in events and "kb_updated" in events:
+            end_to_end.append(events["kb_updated"] - events["call_ended"])
+            risk = next((s.get("risk") for s in spans if s["span"] == "queued" and s.get("risk")), None)
+            if risk:
+                by_risk.setdefault(risk, []).append(end_to_end[-1])
+            for stage, seconds in critical_path(spans):
+                path_totals[stage] = path_totals.get(stage, 0.0) + seconds
+
+    print(f"--- Trace summary: {len(traces)} conversations ({filepath}) ---")
+    print(f"{'stage':<20}{'count':>8}{'p50 (s)':>12}{'p95 (s)':>12}")
+    for stage, durations in sorted(stage_durations.items()):
+        print(f"{stage:<20}{len(durations):>8}{percentile(durations, 50):>12.3f}{percentile(durations, 95):>12.3f}")
+
+    if not end_to_end:
+        print("\nNo complete call_ended -> kb_updated traces yet.")
+        return
+    print(f"\nCall ended -> KB updated ({len(end_to_end)} traces): "
+          f"p50 {percentile(end_to_end, 50):.2f}s, p95 {percentile(end_to_end, 95):.2f}s")
+    for risk, latencies in sorted(by_risk.items()):
+        print(f"  {risk:<18}{len(latencies):>6} traces  p50 {percentile(latencies, 50):.2f}s, "
+              f"p95 {percentile(latencies, 95):.2f}s")
+    total = sum(path_totals.values()) or 1.0
+    print("Critical path share:")
+    for stage, seconds in sorted(path_totals.items(), key=lambda item: -item[1]):
+        print(f"  {stage:<18}{seconds / len(end_to_end):>10.3f}s avg  {100 * seconds / total:>5.1f}%")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize per-conversation pipeline traces.")
+    parser.add_argument("--file", default=TRACE_FILE, help="Span JSONL file (default: traces/spans.jsonl).")
+    args = parser.parse_args()
+    summarize(args.file)
@@ -0,0 +1,262 @@
+import os
+import gzip
+import json
+import glob
+import time
+import argparse
+
+try:
+    from src.emotion_analysis import get_emotions
+except ImportError:
+    from emotion_analysis import get_emotions
+
+# Structured transcript layout (per conversation):
+#   conversation_<id>_<timestamp>.jsonl.gz  - one JSON object per turn, written as a
+#                                             series of independent gzip members ("segments")
+#   conversation_<id>_<timestamp>.idx.json  - side index with the byte offset/length of each
+#                                             segment and the turn range it holds
+# Concatenated gzip members are still a valid gzip file, so the whole transcript can be
+# read with gzip.open(), while readers that only need a few turns can seek straight to
+# the segment holding them and decompress just that member.
+# Transcripts that archive_store has rolled into a monthly archive are addressed as
+# "<archive path>#<transcript name>"; read_turns/load_index resolve those transparently.
+TRANSCRIPT_EXT = ".jsonl.gz"
+INDEX_EXT = ".idx.json"
+ARCHIVE_REF_SEP = "#"
+SEGMENT_TURNS = 32 # Turns per compressed segment
+FORMAT_VERSION = 1
+
+def _entry_get(entry, name: str, default=None):
+    """Reads a field from an SDK transcript entry (dict or attribute object)."""
+    if isinstance(entry, dict):
+        return entry.get(name, default)
+    return getattr(entry, name, default)
+
+def _archive_store():
+    # Imported lazily: archive_store builds on this module
+    try:
+        from src import archive_store
+    except ImportError:
+        import archive_store
+    return archive_store
+
+def is_archive_ref(filepath: str) -> bool:
+    return ARCHIVE_REF_SEP in os.path.basename(filepath)
+
+def transcript_basename(filepath: str) -> str:
+    """Returns the transcript filename without its .txt / .jsonl.gz extension."""
+    filename = os.path.basename(filepath)
+    if is_archive_ref(filepath):
+        return filename.rsplit(ARCHIVE_REF_SEP, 1)[1]
+    for ext in (TRANSCRIPT_EXT, ".txt"):
+        if filename.endswith(ext):
+            return filename[:-len(ext)]
+    return filename.rsplit('.', 1)[0]
+
+def index_path_for(filepath: str) -> str:
+    """Returns the side index path belonging to a structured transcript file."""
+    return os.path.join(os.path.dirname(filepath), transcript_basename(filepath) + INDEX_EXT)
+
+def is_structured(filepath: str) -> bool:
+    return filepath.endswith(TRANSCRIPT_EXT) or is_archive_ref(filepath)
+
+def transcript_dir(filepath: str) -> str:
+    """The conversations directory a transcript (or archive reference) belongs to."""
+    directory = os.path.dirname(filepath)
+    if is_archive_ref(filepath):
+        directory = os.path.dirname(directory)
+    return directory
+
+def list_transcript_files(conv_dir: str = "conversations") -> list:
+    """Lists all transcript files (structured and legacy .txt) in a directory."""
+    return glob.glob(os.path.join(conv_dir, "*" + TRANSCRIPT_EXT)) + glob.glob(os.path.join(conv_dir, "*.txt"))
+
+def build_turns(transcript_entries, with_sentiment: bool = True) -> list:
+    """
+    Normalizes SDK transcript entries into turn dicts:
+    {"turn", "role", "message", "time_in_call_secs", "sentiment"}.
+    Sentiment is only computed for user turns.
+    """
+    turns = []
+    for i, entry in enumerate(transcript_entries):
+        role = "user" if _entry_get(entry, 'role') == 'user' else "agent"
+        message = _entry_get(entry, 'message') or "[message missing]"
+        turns.append({
+            "turn": i,
+            "role": role,
+            "message": message,
+            "time_in_call_secs": _entry_get(entry, 'time_in_call_secs'),
+            "sentiment": None,
+        })
+    if with_sentiment:
+        _add_sentiment(turns)
+    return turns
+
+def _add_sentiment(turns: list):
+    # All user turns are scored in one call so the lexicon scorer can batch them
+    user_turns = [turn for turn in turns if turn["role"] == "user"]
+    for turn, label in zip(user_turns, get_emotions([turn["message"] for turn in user_turns])):
+        turn["sentiment"] = label
+
+def write_turns(turns: list, filepath: str, conversation_id: str = None) -> str:
+    """Writes turns as compressed segments plus the byte offset index. Returns the data path."""
+    segments = []
+    offset = 0
+    with open(filepath, 'wb') as f:
+        for first in range(0, len(turns), SEGMENT_TURNS):
+            chunk = turns[first:first + SEGMENT_TURNS]
+            payload = ''.join(json.dumps(t, ensure_ascii=False) + '\n' for t in chunk).encode('utf-8')
+            member = gzip.compress(payload, mtime=0)
+            f.write(member)
+            segments.append({
+                "offset": offset,
+                "length": len(member),
+                "first_turn": first,
+                "turn_count": len(chunk),
+            })
+            offset += len(member)
+
+    index = {
+        "version": FORMAT_VERSION,
+        "conversation_id": conversation_id,
+        "turn_count": len(turns),
+        "segment_turns": SEGMENT_TURNS,
+        "segments": segments,
+    }
+    with open(index_path_for(filepath), 'w', encoding='utf-8') as f:
+        json.dump(index, f)
+    return filepath
+
+def save_transcript(conversation_id: str, transcript_entries, conv_dir: str = "conversations") -> str | None:
+    """Saves an SDK transcript in the structured format. Returns the path if successful."""
+    turns = build_turns(transcript_entries)
+    if not turns:
+        return None
+    os.makedirs(conv_dir, exist_ok=True)
+    timestamp = time.strftime("%Y%m%d_%H%M%S")
+    filepath = os.path.join(conv_dir, f"conversation_{conversation_id}_{timestamp}{TRANSCRIPT_EXT}")
+    return write_turns(turns, filepath, conversation_id)
+
+def load_index(filepath: str) -> dict | None:
+    if is_archive_ref(filepath):
+        return _archive_store().archived_transcript_index(filepath)
+    try:
+        with open(index_path_for(filepath), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+def _decode_segment(raw: bytes) -> list:
+    return [json.loads(line) for line in gzip.decompress(raw).decode('utf-8').splitlines() if line]
+
+def read_turns(filepath: str, start: int = 0, stop: int | None = None) -> list:
+    """
+    Reads turns [start, stop) from a transcript. Structured files only decompress the
+    segments covering the requested range; legacy .txt files are parsed in full.
+    """
+    if is_archive_ref(filepath):
+        return _archive_store().read_archived_turns(filepath, start, stop)
+    if not is_structured(filepath):
+        with open(filepath, 'r', encoding='utf-8') as f:
+            return parse_text_transcript(f.read())[start:stop]
+
+    index = load_index(filepath)
+    if index is None:
+        # No index: fall back to decompressing the whole file
+        with gzip.open(filepath, 'rt', encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()][start:stop]
+
+    if stop is None or stop > index["turn_count"]:
+        stop = index["turn_count"]
+    turns = []
+    with open(filepath, 'rb') as f:
+        for segment in index["segments"]:
+            seg_first = segment["first_turn"]
+            seg_stop = seg_first + segment["turn_count"]
+            if seg_stop <= start or seg_first >= stop:
+                continue
+            f.seek(segment["offset"])
+            for turn in _decode_segment(f.read(segment["length"])):
+                if start <= turn["turn"] < stop:
+                    turns.append(turn)
+    return turns
+
+def format_turns(turns: list) -> str:
+    """Renders turns as the classic "User: ..." / "Agent: ..." text."""
+    return '\n'.join(f"{'User' if t['role'] == 'user' else 'Agent'}: {t['message']}" for t in turns)
+
+def read_transcript_text(filepath: str) -> str:
+    """Returns the transcript as plain text regardless of storage format."""
+    if is_structured(filepath):
+        return format_turns(read_turns(filepath))
+    with open(filepath, 'r', encoding='utf-8') as f:
+        return f.read()
+
+def parse_text_transcript(content: str) -> list:
+    """Parses a legacy "User: ..." text transcript into turn dicts (multi-line messages kept)."""
+    turns = []
+    for line in content.splitlines():
+        if line.startswith("User: ") or line.startswith("Agent: "):
+            role, message = line.split(": ", 1)
+            turns.append({
+                "turn": len(turns),
+                "role": role.lower(),
+                "message": message,
+                "time_in_call_secs": None,
+                "sentiment": None,
+            })
+        elif turns:
+            turns[-1]["message"] += "\n" + line
+    return turns
+
+def migrate_txt_file(txt_path: str, keep_original: bool = False) -> str | None:
+    """Converts a legacy .txt transcript to the structured format. Returns the new path."""
+    try:
+        with open(txt_path, 'r', encoding='utf-8') as f:
+            turns = parse_text_transcript(f.read())
+        _add_sentiment(turns)
+
+        base_name = transcript_basename(txt_path)
+        # conversation_<id>_<YYYYMMDD>_<HHMMSS>
+        parts = base_name.split('_')
+        conversation_id = '_'.join(parts[1:-2]) if len(parts) >= 4 else None
+        new_path = os.path.join(os.path.dirname(txt_path), base_name + TRANSCRIPT_EXT)
+        write_turns(turns, new_path, conversation_id)
+        if not keep_original:
+            os.remove(txt_path)
+        return new_path
+    except Exception as e:
+        print(f"Error migrating transcript {txt_path}: {e}")
+        return None
+
+def migrate_directory(conv_dir: str = "conversations", keep_original: bool = False):
+    """Migrates every legacy .txt transcript in a directory."""
+    txt_files = glob.glob(os.path.join(conv_dir, "*.txt"))
+    if not txt_files:
+        print(f"No .txt transcripts found in {conv_dir}.")
+        return
+    migrated = 0
+    for txt_path in txt_files:
+        if migrate_txt_file(txt_path, keep_original=keep_original):
+            migrated += 1
+    print(f"--- Migrated {migrated}/{len(txt_files)} transcripts in {conv_dir} ---")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Structured transcript storage utilities.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = subparsers.add_parser("migrate", help="Convert legacy .txt transcripts.")
+    migrate_parser.add_argument("--dir", default="conversations", help="Transcript directory.")
+    migrate_parser.add_argument("--keep-txt", action="store_true", help="Keep the original .txt files.")
+
+    show_parser = subparsers.add_parser("show", help="Print turns from a transcript file.")
+    show_parser.add_argument("filepath")
+    show_parser.add_argument("--start", type=int, default=0)
+    show_parser.add_argument("--stop", type=int, default=None)
+
+    args = parser.parse_args()
+    if args.command == "migrate":
+        migrate_directory(args.dir, keep_original=args.keep_txt)
+    else:
+        for turn in read_turns(args.filepath, args.start, args.stop):
+            print(json.dumps(turn, ensure_ascii=False))
@@ -2,13 +2,28 @@
 
 import os
 import time
-import json
+import queue
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
 from elevenlabs.client import ElevenLabs
 
 # Import processing functions from src
 from src.analyzer_agent import analyze_and_save_profile
 from src.knowledge_uploader import upload_profile_file
+from src.transcript_store import save_transcript
+from src.metrics import (
+    WATCHER_LIST_SECONDS, WATCHER_FETCH_SECONDS, WATCHER_QUEUE_DEPTH,
+    TRANSCRIPT_SAVE_SECONDS, CONVERSATIONS_PROCESSED, PIPELINE_START_DELAY_SECONDS,
+    TIME_TO_KB_SECONDS, AT_RISK_SLA_BREACHES, start_metrics_server,
+)
+from src.tracing import trace_conversation, span, mark
+from src.emotion_analysis import prescan_risk, find_escalation_keyword, RISK_ESCALATION, RISK_NEGATIVE, RISK_ROUTINE
+from src.escalation import emit_alert
+from src.profiling import capture, install_signal_handler
+from src.lease_registry import (claim, keep_alive, complete, release, is_done, is_claimable, done_ids,
+                                import_processed_ids)
 
 print("--- Watcher/Processor Started ---")
 
@@ -24,11 +39,24 @@ if not agent_id or not api_key:
     exit()
 
 print("--- Configuring ElevenLabs Client --- ")
-client = ElevenLabs(api_key=api_key)
+# ELEVENLABS_BASE_URL lets benchmarks point the watcher at a local stand-in
+base_url = os.getenv("ELEVENLABS_BASE_URL")
+client = ElevenLabs(api_key=api_key, base_url=base_url) if base_url else ElevenLabs(api_key=api_key)
+
+FETCH_DELAY_SECONDS = 1 # Delay before fetching a transcript (skipped when a webhook delivered it)
+PREFETCH_WORKERS = int(os.getenv("PREFETCH_WORKERS", "8")) # Concurrent pre-scan fetches per poll
+AT_RISK_SLA_SECONDS = int(os.getenv("AT_RISK_SLA_SECONDS", "120")) # Call ended -> KB updated target
+WEBHOOK_SECRET = os.getenv("ELEVENLABS_WEBHOOK_SECRET") # Enables the webhook receiver (and its Flask import)
 
 # --- State Management --- 
 PROCESSED_IDS_FILE = "processed_conversation_ids.txt"
 processed_ids = set()
+queued_ids = set() # Enqueued but not yet processed (webhook + poll dedupe)
+state_lock = threading.Lock()
+# At-risk conversations jump the backlog: (priority, seq, conversation_id, conv_data or None, enqueued_at, risk)
+pending_queue = queue.PriorityQueue()
+RISK_PRIORITY = {RISK_ESCALATION: 0, RISK_NEGATIVE: 1, RISK_ROUTINE: 2}
+_enqueue_seq = itertools.count() # FIFO within a priority class
 
 def load_processed_ids():
     """Loads previously processed IDs from a file."""
@@ -42,60 +70,175 @@ def load_processed_ids():
             print(f"Warning: Could not load processed IDs file: {e}")
     else:
         print("--- No processed IDs file found, starting fresh. ---")
+    # The lease registry is shared with agent.py and other workers
+    import_processed_ids(PROCESSED_IDS_FILE)
+    processed_ids.update(done_ids())
 
 def save_processed_id(conversation_id):
-    """Appends a newly processed ID to the file."""
+    """Marks an ID as done in the lease registry and appends it to the file."""
+    complete(conversation_id)
     try:
-        with open(PROCESSED_IDS_FILE, 'a') as f:
-            f.write(conversation_id + '\n')
-        processed_ids.add(conversation_id)
+        with state_lock:
+            with open(PROCESSED_IDS_FILE, 'a') as f:
+                f.write(conversation_id + '\n')
+            processed_ids.add(conversation_id)
     except Exception as e:
         print(f"Warning: Could not save processed ID {conversation_id}: {e}")
 
+def _field(obj, name: str):
+    """Reads a field from an SDK response object or a webhook payload dict."""
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+def call_end_time(conv_data) -> float | None:
+    """Derives the unix time a call ended from the conversation metadata, if present."""
+    metadata = _field(conv_data, 'metadata')
+    start = _field(metadata, 'start_time_unix_secs') if metadata is not None else None
+    if start is None:
+        return None
+    return start + (_field(metadata, 'call_duration_secs') or 0)
+
+def classify_risk(conv_data) -> str:
+    """Pre-scans the user turns of a fetched conversation (see emotion_analysis.prescan_risk)."""
+    if conv_data is None:
+        return RISK_ROUTINE
+    entries = _field(conv_data, 'transcript') or []
+    user_text = "\n".join(_field(e, 'message') or "" for e in entries if _field(e, 'role') == 'user')
+    return prescan_risk(user_text)
+
+def raise_escalation_alert(conversation_id: str, conv_data):
+    """Writes an escalation alert for a finished conversation as soon as it is seen, before it is processed."""
+    for entry in _field(conv_data, 'transcript') or []:
+        message = _field(entry, 'message') or ""
+        keyword = find_escalation_keyword(message) if _field(entry, 'role') == 'user' else None
+        if keyword:
+            alert = emit_alert(message, keyword, "watcher", conversation_id)
+            if alert.get("duplicate"):
+                print(f"   Escalating conversation {conversation_id} was already alerted (alert {alert['id']})")
+            else:
+                print(f"   ESCALATION alert for {conversation_id} (keyword: {keyword})")
+            return
+
+# --- Work Queue --- 
+def is_known(conversation_id: str) -> bool:
+    with state_lock:
+        return conversation_id in processed_ids or conversation_id in queued_ids
+
+def enqueue_conversation(conversation_id: str, conv_data=None) -> bool:
+    """
+    Queues a conversation for processing unless it is already processed or queued.
+    conv_data (a webhook payload or prefetched conversation) saves the transcript fetch
+    and lets at-risk conversations be prioritised. Returns True if queued.
+    """
+    with state_lock:
+        if conversation_id in processed_ids or conversation_id in queued_ids:
+            return False
+        queued_ids.add(conversation_id)
+    risk = classify_risk(conv_data)
+    if risk == RISK_ESCALATION:
+        raise_escalation_alert(conversation_id, conv_data)
+    pending_queue.put((RISK_PRIORITY[risk], next(_enqueue_seq), conversation_id, conv_data, time.time(), risk))
+    WATCHER_QUEUE_DEPTH.inc()
+    if risk != RISK_ROUTINE:
+        print(f"   Queued {conversation_id} with priority ({risk})")
+    return True
+
+def _run_next(timeout: float | None = None) -> bool:
+    """Processes the highest-priority queued conversation. Returns False if the queue stayed empty."""
+    try:
+        _, _, conversation_id, conv_data, enqueued_at, risk = pending_queue.get(timeout=timeout)
+    except queue.Empty:
+        return False
+    try:
+        with capture("watcher_process"):
+            process_conversation(conversation_id, conv_data=conv_data, enqueued_at=enqueued_at, risk=risk)
+    finally:
+        with state_lock:
+            queued_ids.discard(conversation_id)
+        WATCHER_QUEUE_DEPTH.dec()
+        pending_queue.task_done()
+    return True
+
+def drain_queue():
+    """Processes everything currently queued on the calling thread."""
+    while _run_next(timeout=0):
+        pass
+
+def worker_loop():
+    """Long-running consumer: starts each conversation as soon as it is queued."""
+    while True:
+        _run_next()
+
 # --- Core Processing Function --- 
-def process_conversation(conversation_id: str):
-    """Fetches, saves, analyzes, and uploads a single conversation."""
+def fetch_conversation(conversation_id: str):
+    """Fetches a conversation from the API (traced and timed)."""
+    with trace_conversation(conversation_id):
+        time.sleep(FETCH_DELAY_SECONDS) # Small delay before fetching
+        with WATCHER_FETCH_SECONDS.time(), span("fetch"):
+            return client.conversational_ai.get_conversation(conversation_id)
+
+def process_conversation(conversation_id: str, conv_data=None, enqueued_at: float | None = None,
+                         risk: str = RISK_ROUTINE):
+    """Fetches (unless conv_data is given), saves, analyzes, and uploads a single conversation."""
+    # Another watcher/worker or agent.py may already own this conversation
+    if not claim(conversation_id):
+        print(f"--- Skipping {conversation_id}: claimed or completed by another process ---")
+        if is_done(conversation_id):
+            with state_lock:
+                processed_ids.add(conversation_id)
+        return
+    try:
+        # All spans recorded below (including inside the analyzer/uploader) share this trace;
+        # the lease is renewed until processing finishes, however long Groq or the upload take
+        with keep_alive(conversation_id), trace_conversation(conversation_id):
+            if enqueued_at is not None:
+                mark("queued", ts=enqueued_at, risk=risk)
+            finished, ended_at = _process_conversation(conversation_id, conv_data)
+        if finished:
+            # Separate latency series per risk class; at-risk calls have their own SLA
+            started = ended_at if ended_at is not None else enqueued_at
+            if started is not None:
+                elapsed = time.time() - started
+                TIME_TO_KB_SECONDS.observe(elapsed, risk=risk)
+                if risk != RISK_ROUTINE and elapsed > AT_RISK_SLA_SECONDS:
+                    AT_RISK_SLA_BREACHES.inc()
+                    print(f"   Warning: at-risk conversation {conversation_id} took {elapsed:.0f}s (SLA {AT_RISK_SLA_SECONDS}s)")
+    finally:
+        release(conversation_id) # No-op once completed; frees the lease for a retry otherwise
+
+def _process_conversation(conversation_id: str, conv_data=None) -> tuple:
+    """Returns (finished, call end time or None)."""
     print(f"\n>>> Processing NEW Conversation ID: {conversation_id} <<<")
     transcript_filepath = None
     profile_filepath = None
+    ended_at = None
     
     try:
         # 1. Get and Save Transcript
-        print(f"   [Step 1/3] Fetching transcript for {conversation_id}...")
-        time.sleep(1) # Small delay before fetching
-        conv_data = client.conversational_ai.get_conversation(conversation_id)
+        if conv_data is None:
+            print(f"   [Step 1/3] Fetching transcript for {conversation_id}...")
+            conv_data = fetch_conversation(conversation_id)
+        else:
+            print(f"   [Step 1/3] Using already fetched/delivered transcript for {conversation_id}...")
+        ended_at = call_end_time(conv_data)
+        if ended_at is not None:
+            mark("call_ended", ts=ended_at)
+            PIPELINE_START_DELAY_SECONDS.observe(max(0.0, time.time() - ended_at))
         
         # FIX: Access attribute directly, check existence
-        transcript_entries = None
-        if hasattr(conv_data, 'transcript'):
-             transcript_entries = conv_data.transcript
-        else:
+        transcript_entries = _field(conv_data, 'transcript')
+        if transcript_entries is None:
              print(f"Warning: Conversation data object for {conversation_id} missing 'transcript' attribute.")
 
         if transcript_entries:
-            history = []
-            # FIX: Check entry type and access attributes
-            for entry in transcript_entries:
-                role = "Agent" # Default role
-                message = "[message missing]"
-                if hasattr(entry, 'role') and entry.role == 'user':
-                    role = "User"
-                if hasattr(entry, 'message'):
-                    message = entry.message
-                history.append(f"{role}: {message}")
-
-            conv_dir = "conversations"
-            os.makedirs(conv_dir, exist_ok=True)
-            timestamp = time.strftime("%Y%m%d_%H%M%S") # Timestamp of processing
-            transcript_filename = f"conversation_{conversation_id}_{timestamp}.txt"
-            transcript_filepath = os.path.join(conv_dir, transcript_filename)
-            
-            with open(transcript_filepath, 'w', encoding='utf-8') as f:
-                f.write('\n'.join(history))
+            with TRANSCRIPT_SAVE_SECONDS.time(), span("transcript_save"):
+                transcript_filepath = save_transcript(conversation_id, transcript_entries)
             print(f"      Transcript saved to: {transcript_filepath}")
         else:
              print("      Warning: Transcript not found or empty in API response.")
-             return # Cannot proceed without transcript
+             CONVERSATIONS_PROCESSED.inc(outcome="no_transcript")
+             return False, ended_at # Cannot proceed without transcript
 
         # 2. Analyze Transcript and Save Profile
         print(f"   [Step 2/3] Analyzing transcript with LLM...")
@@ -107,7 +250,7 @@ def process_conversation(conversation_id: str):
                 # For now, we'll continue to upload if profile exists, else mark processed.
         else:
             print("      Error: Transcript path not available for analysis.")
-            return # Should not happen if step 1 succeeded
+            return False, ended_at # Should not happen if step 1 succeeded
 
         # 3. Upload Profile to Knowledge Base
         print(f"   [Step 3/3] Uploading profile to Knowledge Base...")
@@ -119,54 +262,103 @@ def process_conversation(conversation_id: str):
         
         # Mark as processed if we got this far, even if upload failed (to avoid retries)
         save_processed_id(conversation_id)
+        CONVERSATIONS_PROCESSED.inc(outcome="success" if profile_filepath else "profile_failed")
         print(f"<<< Finished processing {conversation_id} >>>")
+        return True, ended_at
         
     except Exception as e:
         import traceback
+        CONVERSATIONS_PROCESSED.inc(outcome="error")
         print(f"\n*** ERROR processing conversation {conversation_id}: {str(e)} ***")
         print("Traceback:")
         traceback.print_exc()
         # Optionally, don't save ID here to retry later
+        return False, ended_at
 
 # --- Main Watcher Loop --- 
-CHECK_INTERVAL_SECONDS = 60 # Check every 60 seconds
+CHECK_INTERVAL_SECONDS = 60 # Poll interval when no webhook secret is configured
+RECONCILE_INTERVAL_SECONDS = 600 # Safety-net poll when webhooks deliver conversations
+
+def check_for_new_conversations() -> int:
+    """Lists recent conversations and queues any that are new. Returns the number queued."""
+    # Fetch recent conversations (e.g., last 10)
+    # Note: Check API docs for sorting/filtering options if available
+    # We fetch a few in case multiple finished between checks
+    with WATCHER_LIST_SECONDS.time():
+        recent_conversations = client.conversational_ai.get_conversations()
+    
+    new_ids = []
+    if recent_conversations and hasattr(recent_conversations, 'conversations'):
+        for conv_summary in recent_conversations.conversations:
+            # FIX: Access attribute directly, not like a dictionary
+            # Add a check for the attribute's existence for safety
+            conv_id = None
+            if hasattr(conv_summary, 'conversation_id'):
+                 conv_id = conv_summary.conversation_id 
+            else:
+                 print("Warning: Conversation summary object missing 'conversation_id' attribute.")
+                 continue # Skip this summary
+
+            if not conv_id or is_known(conv_id):
+                continue
+            # Calls still in progress are left to agent.py (which claims them live) or the next poll
+            if getattr(conv_summary, 'status', None) in ("in-progress", "processing"):
+                continue
+            # Don't spend a fetch on conversations agent.py or another worker owns or finished
+            if not is_claimable(conv_id):
+                if is_done(conv_id):
+                    with state_lock:
+                        processed_ids.add(conv_id)
+                continue
+            new_ids.append(conv_id)
+
+    found_new = 0
+    if not new_ids:
+        return found_new
+    # Fetch the new ones concurrently so the pre-scan can prioritise them; each is queued as
+    # soon as its own fetch completes, so an at-risk call doesn't wait behind the whole backlog
+    with ThreadPoolExecutor(max_workers=min(PREFETCH_WORKERS, len(new_ids))) as executor:
+        futures = {executor.submit(fetch_conversation, conv_id): conv_id for conv_id in new_ids}
+        for future in as_completed(futures):
+            conv_id = futures[future]
+            try:
+                conv_data = future.result()
+            except Exception as fetch_err:
+                print(f"Warning: Prefetch failed for {conv_id}, queueing without pre-scan: {fetch_err}")
+                conv_data = None
+            if enqueue_conversation(conv_id, conv_data):
+                found_new += 1
+    return found_new
 
 if __name__ == "__main__":
     load_processed_ids()
-    print(f"--- Starting watcher loop (checking every {CHECK_INTERVAL_SECONDS} seconds) ---")
+    start_metrics_server()
+    install_signal_handler() # kill -USR1 <pid>: profile the next few polls and conversations
+
+    if WEBHOOK_SECRET:
+        # Post-call webhooks start the pipeline immediately; polling is only a safety net
+        from src.webhook_receiver import start_webhook_server # Pulls in Flask, so only when enabled
+        start_webhook_server(enqueue_conversation)
+        poll_interval = RECONCILE_INTERVAL_SECONDS
+    else:
+        print("--- ELEVENLABS_WEBHOOK_SECRET not set: webhook receiver disabled, polling only ---")
+        poll_interval = CHECK_INTERVAL_SECONDS
+    threading.Thread(target=worker_loop, daemon=True).start()
+    print(f"--- Starting watcher loop (checking every {poll_interval} seconds) ---")
     
     while True:
         print(f"\n[{time.strftime('%Y-%m-%d %H:%M:%S')}] Checking for new conversations...")
         try:
-            # Fetch recent conversations (e.g., last 10)
-            # Note: Check API docs for sorting/filtering options if available
-            # We fetch a few in case multiple finished between checks
-            recent_conversations = client.conversational_ai.get_conversations()
-            
-            found_new = 0
-            if recent_conversations and hasattr(recent_conversations, 'conversations'):
-                for conv_summary in recent_conversations.conversations:
-                    # FIX: Access attribute directly, not like a dictionary
-                    # Add a check for the attribute's existence for safety
-                    conv_id = None
-                    if hasattr(conv_summary, 'conversation_id'):
-                         conv_id = conv_summary.conversation_id 
-                    else:
-                         print("Warning: Conversation summary object missing 'conversation_id' attribute.")
-                         continue # Skip this summary
-
-                    if conv_id and conv_id not in processed_ids:
-                        # Found a new one to process
-                        found_new += 1
-                        process_conversation(conv_id)
-                        time.sleep(2) # Small pause between processing multiple
-            
+            with capture("watcher_poll"):
+                found_new = check_for_new_conversations()
             if found_new == 0:
                 print("   No new conversations found.")
+            else:
+                print(f"   Queued {found_new} new conversation(s).")
                 
         except Exception as loop_err:
             print(f"\n*** ERROR in watcher loop: {loop_err} ***")
             # Consider adding more robust error handling (e.g., backoff)
             
         # Wait for the next check
-        time.sleep(CHECK_INTERVAL_SECONDS) 
\ No newline at end of file
+        time.sleep(poll_interval)
@@ -0,0 +1,82 @@
+import os
+import hmac
+import json
+import time
+import hashlib
+import threading
+from flask import Flask, jsonify, request
+
+try:
+    from src.metrics import WEBHOOK_EVENTS
+except ImportError:
+    from metrics import WEBHOOK_EVENTS
+
+# Receives ElevenLabs post-call webhooks and hands the conversation straight to
+# the processing queue, so the pipeline starts within a second of the call ending
+# instead of waiting for the next poll.
+WEBHOOK_SECRET = os.getenv("ELEVENLABS_WEBHOOK_SECRET")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "5002"))
+# Loopback by default, behind a reverse proxy or tunnel; set 0.0.0.0 to expose it directly
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "127.0.0.1")
+SIGNATURE_TOLERANCE_SECONDS = 30 * 60 # Reject replays of old deliveries
+
+app = Flask(__name__)
+_enqueue = None # Set by start_webhook_server: (conversation_id, conv_data) -> bool
+
+def verify_signature(body: bytes, signature_header: str | None, secret: str, now: float | None = None) -> bool:
+    """
+    Checks an 'ElevenLabs-Signature: t=<unix>,v0=<hex>' header, where v0 is the
+    HMAC-SHA256 of '<t>.<raw body>' keyed with the webhook secret.
+    """
+    if not signature_header or not secret:
+        return False
+    parts = dict(item.split("=", 1) for item in signature_header.split(",") if "=" in item)
+    timestamp, signature = parts.get("t"), parts.get("v0")
+    if not timestamp or not signature or not timestamp.isdigit():
+        return False
+    now = time.time() if now is None else now
+    if abs(now - int(timestamp)) > SIGNATURE_TOLERANCE_SECONDS:
+        return False
+    expected = hmac.new(secret.encode("utf-8"), f"{timestamp}.".encode("utf-8") + body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+@app.route('/webhooks/elevenlabs/post-call', methods=['POST'])
+def post_call_webhook():
+    """Verifies and enqueues a post-call transcription notification."""
+    body = request.get_data()
+    if not verify_signature(body, request.headers.get("ElevenLabs-Signature"), WEBHOOK_SECRET):
+        WEBHOOK_EVENTS.inc(result="bad_signature")
+        return jsonify({'error': 'Invalid signature'}), 401
+
+    try:
+        payload = json.loads(body)
+    except json.JSONDecodeError:
+        WEBHOOK_EVENTS.inc(result="bad_payload")
+        return jsonify({'error': 'Invalid JSON'}), 400
+
+    if not isinstance(payload, dict) or not isinstance(payload.get('data') or {}, dict):
+        WEBHOOK_EVENTS.inc(result="bad_payload")
+        return jsonify({'error': 'Expected a JSON object'}), 400
+
+    data = payload.get('data') or {}
+    conversation_id = data.get('conversation_id')
+    if payload.get('type') != 'post_call_transcription' or not conversation_id:
+        WEBHOOK_EVENTS.inc(result="ignored")
+        return jsonify({'status': 'ignored'}), 200
+
+    # Idempotent: redeliveries of an already queued/processed conversation are acknowledged only
+    queued = _enqueue(conversation_id, data if data.get('transcript') else None)
+    WEBHOOK_EVENTS.inc(result="queued" if queued else "duplicate")
+    return jsonify({'status': 'queued' if queued else 'duplicate', 'conversation_id': conversation_id}), 200
+
+def start_webhook_server(enqueue, port: int = WEBHOOK_PORT, host: str = WEBHOOK_HOST) -> threading.Thread:
+    """Serves the webhook endpoint from a daemon thread, forwarding to `enqueue`."""
+    global _enqueue
+    _enqueue = enqueue
+    thread = threading.Thread(
+        target=lambda: app.run(host=host, port=port, threaded=True, use_reloader=False),
+        daemon=True,
+    )
+    thread.start()
+    print(f"--- Post-call webhook receiver listening on http://{host}:{port}/webhooks/elevenlabs/post-call ---")
+    return thread
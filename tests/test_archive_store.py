@@ -0,0 +1,116 @@
+import os
+import time
+
+from src import archive_store
+from src.archive_store import TRANSCRIPT_ARCHIVE_EXT, PROFILE_ARCHIVE_EXT
+from src.transcript_store import write_turns, read_turns, load_index, is_structured, SEGMENT_TURNS
+from src.profile_store import write_profile, ManifestReader, load_profile, iter_profiles
+
+DAY = 24 * 3600
+
+def stamp(days_ago: float) -> str:
+    return time.strftime("%Y%m%d_%H%M%S", time.localtime(time.time() - days_ago * DAY))
+
+def make_turns(n: int) -> list:
+    return [{"turn": i, "role": "user" if i % 2 else "agent", "message": f"message {i}"} for i in range(n)]
+
+def save_structured(conv_dir, conversation_id: str, days_ago: float, turns: list) -> str:
+    os.makedirs(conv_dir, exist_ok=True)
+    path = os.path.join(conv_dir, f"conversation_{conversation_id}_{stamp(days_ago)}.jsonl.gz")
+    return write_turns(turns, path, conversation_id)
+
+def save_text(conv_dir, conversation_id: str, days_ago: float, text: str) -> str:
+    os.makedirs(conv_dir, exist_ok=True)
+    path = os.path.join(conv_dir, f"conversation_{conversation_id}_{stamp(days_ago)}.txt")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    return path
+
+def test_transcripts_round_trip_through_the_archive(tmp_path):
+    conv_dir = str(tmp_path / "conversations")
+    turns = make_turns(2 * SEGMENT_TURNS + 5) # Three segments
+    old = save_structured(conv_dir, "old", 40, turns)
+    legacy = save_text(conv_dir, "legacy", 45, "User: Hello there\nAgent: Hi, how are you?\n")
+    recent = save_structured(conv_dir, "recent", 1, make_turns(3))
+
+    assert archive_store.archive_transcripts(conv_dir, older_than_days=30) == 2
+    assert not os.path.exists(old) and not os.path.exists(old.replace(".jsonl.gz", ".idx.json"))
+    assert not os.path.exists(legacy)
+    assert os.path.exists(recent)
+    archives = archive_store.list_archives(conv_dir, TRANSCRIPT_ARCHIVE_EXT)
+    assert archives and all(os.path.exists(archive_store.archive_index_path(a)) for a in archives)
+
+    [ref] = archive_store.find_archived_transcripts("old", conv_dir)
+    assert is_structured(ref)
+    assert read_turns(ref) == turns
+    assert read_turns(ref, SEGMENT_TURNS - 2, SEGMENT_TURNS + 3) == turns[SEGMENT_TURNS - 2:SEGMENT_TURNS + 3]
+    assert load_index(ref)["turn_count"] == len(turns)
+
+    [legacy_ref] = archive_store.find_archived_transcripts("legacy", conv_dir)
+    assert [t["message"] for t in read_turns(legacy_ref)] == ["Hello there", "Hi, how are you?"]
+    assert archive_store.find_archived_transcripts("recent", conv_dir) == []
+
+    # Running again archives nothing new and leaves the archived data readable
+    assert archive_store.archive_transcripts(conv_dir, older_than_days=30) == 0
+    assert read_turns(ref) == turns
+
+def test_dry_run_archives_nothing(tmp_path):
+    conv_dir = str(tmp_path / "conversations")
+    old = save_structured(conv_dir, "old", 40, make_turns(3))
+    assert archive_store.archive_transcripts(conv_dir, older_than_days=30, dry_run=True) == 1
+    assert os.path.exists(old)
+    assert archive_store.list_archives(conv_dir, TRANSCRIPT_ARCHIVE_EXT) == []
+
+def test_profiles_round_trip_through_the_archive(tmp_path):
+    profile_dir = str(tmp_path / "user_profiles")
+    now = time.time()
+    old = [write_profile({"user_name": "Mary", "mood": "sad", "n": i}, f"c{i}", profile_dir, now - (40 + i) * DAY)
+           for i in range(3)]
+    recent = write_profile({"user_name": "Mary", "mood": "happy"}, "c9", profile_dir, now - DAY)
+
+    assert archive_store.archive_profiles(profile_dir, older_than_days=30) == 3
+    assert not any(os.path.exists(path) for path in old)
+    assert os.path.exists(recent)
+
+    entries = ManifestReader(profile_dir).read_new()
+    loaded = [load_profile(entry, profile_dir) for entry in entries]
+    assert [profile.get("n") for profile in loaded] == [0, 1, 2, None]
+    assert [profile["mood"] for _, profile in iter_profiles(profile_dir)] == ["sad", "sad", "sad", "happy"]
+    assert archive_store.archive_profiles(profile_dir, older_than_days=30) == 0
+
+def test_purge_only_deletes_archives_past_retention(tmp_path):
+    conv_dir = str(tmp_path / "conversations")
+    save_structured(conv_dir, "expired", 100, make_turns(3))
+    save_structured(conv_dir, "kept", 40, make_turns(3))
+    archive_store.archive_transcripts(conv_dir, older_than_days=30)
+    assert len(archive_store.list_archives(conv_dir, TRANSCRIPT_ARCHIVE_EXT)) == 2
+
+    assert archive_store.purge_expired(conv_dir, TRANSCRIPT_ARCHIVE_EXT, retention_days=0) == 0
+    assert archive_store.purge_expired(conv_dir, TRANSCRIPT_ARCHIVE_EXT, retention_days=60, dry_run=True) == 1
+    assert len(archive_store.list_archives(conv_dir, TRANSCRIPT_ARCHIVE_EXT)) == 2
+
+    assert archive_store.purge_expired(conv_dir, TRANSCRIPT_ARCHIVE_EXT, retention_days=60) == 1
+    assert archive_store.find_archived_transcripts("expired", conv_dir) == []
+    [ref] = archive_store.find_archived_transcripts("kept", conv_dir)
+    assert len(read_turns(ref)) == 3
+
+def test_purge_keeps_an_archive_with_any_recent_entry(tmp_path):
+    profile_dir = str(tmp_path / "user_profiles")
+    now = time.time()
+    write_profile({"user_name": "Mary", "mood": "sad"}, "c1", profile_dir, now - 100 * DAY)
+    archive_store.archive_profiles(profile_dir, older_than_days=30)
+    [archive] = archive_store.list_archives(profile_dir, PROFILE_ARCHIVE_EXT)
+    index = archive_store.load_archive_index(archive)
+    index["newest_ts"] = now - 10 * DAY # A later profile of the same month is still within retention
+    archive_store.atomic_write_json(index, archive_store.archive_index_path(archive), indent=None)
+
+    assert archive_store.purge_expired(profile_dir, PROFILE_ARCHIVE_EXT, retention_days=60) == 0
+    assert os.path.exists(archive)
+
+def test_purge_deletes_unarchived_files_past_retention(tmp_path):
+    conv_dir = str(tmp_path / "conversations")
+    expired = save_structured(conv_dir, "expired", 100, make_turns(3))
+    kept = save_structured(conv_dir, "kept", 10, make_turns(3))
+    assert archive_store.purge_expired(conv_dir, TRANSCRIPT_ARCHIVE_EXT, retention_days=60) == 1
+    assert not os.path.exists(expired) and not os.path.exists(expired.replace(".jsonl.gz", ".idx.json"))
+    assert os.path.exists(kept)
@@ -0,0 +1,61 @@
+import pytest
+
+from src import escalation, mood_tracker
+from src.escalation import emit_alert, link_alerts, read_alerts
+
+@pytest.fixture
+def alerts_file(tmp_path, monkeypatch):
+    path = str(tmp_path / "alerts" / "escalations.jsonl")
+    monkeypatch.setattr(escalation, "ALERTS_FILE", path)
+    return path
+
+@pytest.fixture
+def sent(monkeypatch):
+    payloads = []
+    monkeypatch.setattr(escalation, "_send_webhook", lambda alert, url: payloads.append(alert))
+    return payloads
+
+def test_webhook_payload_has_no_excerpt(alerts_file, sent):
+    alert = emit_alert("I want to end my life", "end my life", "live", "conv1", webhook_url="http://hook")
+    assert alert["excerpt"] == "I want to end my life"
+    assert [payload["id"] for payload in sent] == [alert["id"]]
+    assert "excerpt" not in sent[0]
+    assert read_alerts()[0]["excerpt"] == "I want to end my life" # Kept in the local file
+
+def test_conversation_is_alerted_once(alerts_file, sent):
+    first = emit_alert("text", "kw", "live", "conv1", webhook_url="http://hook")
+    again = emit_alert("text", "kw", "watcher", "conv1", webhook_url="http://hook")
+    assert again["id"] == first["id"] and again["duplicate"]
+    assert len(sent) == 1 and len(read_alerts()) == 1
+
+def test_linked_alerts_dedupe_later_hits(alerts_file, sent):
+    unlinked = [emit_alert("text", "kw", "live", None, webhook_url="http://hook")["id"] for _ in range(2)]
+    assert link_alerts(unlinked, "conv1")
+    assert not link_alerts(unlinked, "conv1") # Already alerted
+    watcher = emit_alert("text", "kw", "watcher", "conv1", webhook_url="http://hook")
+    assert watcher["id"] == unlinked[0] and watcher["duplicate"]
+    assert len(sent) == 2
+
+    alerts = read_alerts()
+    assert [alert["id"] for alert in alerts] == unlinked # Link lines are not listed
+    assert [alert["conversation_id"] for alert in alerts] == ["conv1", None]
+
+def test_link_alerts_without_ids_does_nothing(alerts_file):
+    assert not link_alerts([], "conv1")
+    assert not link_alerts(["abc"], None)
+    assert read_alerts() == []
+
+@pytest.mark.parametrize("admin_token,header,with_excerpt", [
+    (None, None, False),
+    ("secret", None, False),
+    ("secret", "wrong", False),
+    ("secret", "secret", True),
+])
+def test_alerts_endpoint_only_shows_excerpts_to_admins(alerts_file, sent, monkeypatch, admin_token, header,
+                                                       with_excerpt):
+    monkeypatch.setattr(mood_tracker, "ADMIN_TOKEN", admin_token)
+    emit_alert("I want to end my life", "end my life", "live", "conv1")
+    headers = {"X-Admin-Token": header} if header else {}
+    [alert] = mood_tracker.app.test_client().get("/alerts", headers=headers).get_json()["alerts"]
+    assert alert["conversation_id"] == "conv1"
+    assert ("excerpt" in alert) == with_excerpt
@@ -0,0 +1,64 @@
+import time
+
+import pytest
+
+from src import lease_registry
+
+@pytest.fixture
+def db(tmp_path):
+    return str(tmp_path / "leases.db")
+
+def test_claim_fails_against_another_owners_live_lease(db):
+    assert lease_registry.claim("c1", "a", ttl=60, db_path=db)
+    assert not lease_registry.claim("c1", "b", ttl=60, db_path=db)
+
+def test_owner_can_reclaim_its_own_lease(db):
+    assert lease_registry.claim("c1", "a", ttl=60, db_path=db)
+    assert lease_registry.claim("c1", "a", ttl=60, db_path=db)
+
+def test_claim_succeeds_after_the_lease_expires(db):
+    assert lease_registry.claim("c1", "a", ttl=0.05, db_path=db)
+    time.sleep(0.1)
+    assert lease_registry.is_claimable("c1", "b", db_path=db)
+    assert lease_registry.claim("c1", "b", ttl=60, db_path=db)
+    assert not lease_registry.renew("c1", "a", db_path=db) # The old owner lost it
+
+def test_done_is_final(db):
+    assert lease_registry.claim("c1", "a", ttl=60, db_path=db)
+    lease_registry.complete("c1", "a", db_path=db)
+    assert lease_registry.is_done("c1", db_path=db)
+    assert not lease_registry.claim("c1", "a", ttl=60, db_path=db)
+    assert not lease_registry.claim("c1", "b", ttl=60, db_path=db)
+    assert not lease_registry.renew("c1", "a", db_path=db)
+    lease_registry.release("c1", "a", db_path=db)
+    assert lease_registry.is_done("c1", db_path=db)
+    assert lease_registry.done_ids(db_path=db) == {"c1"}
+
+def test_release_only_deletes_the_callers_lease(db):
+    assert lease_registry.claim("c1", "a", ttl=60, db_path=db)
+    lease_registry.release("c1", "b", db_path=db)
+    assert not lease_registry.claim("c1", "b", ttl=60, db_path=db)
+    lease_registry.release("c1", "a", db_path=db)
+    assert lease_registry.claim("c1", "b", ttl=60, db_path=db)
+
+def test_renew_extends_only_the_owners_lease(db):
+    assert lease_registry.claim("c1", "a", ttl=0.2, db_path=db)
+    assert not lease_registry.renew("c1", "b", ttl=60, db_path=db)
+    assert lease_registry.renew("c1", "a", ttl=60, db_path=db)
+    time.sleep(0.3)
+    assert not lease_registry.claim("c1", "b", ttl=60, db_path=db)
+
+def test_keep_alive_renews_the_lease_while_working(db):
+    assert lease_registry.claim("c1", "a", ttl=0.3, db_path=db)
+    with lease_registry.keep_alive("c1", "a", ttl=0.3, db_path=db):
+        time.sleep(0.9) # Three TTLs: the lease would have expired without renewals
+        assert not lease_registry.claim("c1", "b", ttl=60, db_path=db)
+        lease_registry.complete("c1", "a", db_path=db)
+    assert lease_registry.is_done("c1", db_path=db)
+
+def test_import_processed_ids_marks_them_done(db, tmp_path):
+    ids_file = tmp_path / "processed.txt"
+    ids_file.write_text("c1\nc2\n\n")
+    assert lease_registry.import_processed_ids(str(ids_file), db_path=db) == 2
+    assert lease_registry.done_ids(db_path=db) == {"c1", "c2"}
+    assert not lease_registry.claim("c2", "a", db_path=db)
@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+
+from src.mood_series import lttb, minmax, downsample
+from src import mood_tracker
+
+METHODS = [lttb, minmax]
+
+def series(n: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    return np.arange(n, dtype=np.float64) * 60, rng.normal(size=n)
+
+@pytest.mark.parametrize("method", METHODS)
+@pytest.mark.parametrize("n,max_points", [(1000, 50), (1000, 3), (101, 10), (7, 5), (5000, 333)])
+def test_keeps_endpoints_within_budget_in_order(method, n, max_points):
+    x, y = series(n)
+    keep = method(x, y, max_points)
+    assert 0 < len(keep) <= max_points
+    assert keep[0] == 0 and keep[-1] == n - 1
+    assert np.all(np.diff(keep) > 0)
+
+@pytest.mark.parametrize("method", METHODS)
+@pytest.mark.parametrize("n", [1, 2, 10])
+def test_short_series_returned_unchanged(method, n):
+    x, y = series(n)
+    assert method(x, y, 10).tolist() == list(range(n))
+
+def test_minmax_with_too_few_points_falls_back_to_lttb():
+    x, y = series(200)
+    assert minmax(x, y, 3).tolist() == lttb(x, y, 3).tolist()
+
+def test_minmax_keeps_extremes():
+    x, y = series(1000, seed=1)
+    y[437], y[612] = 50.0, -50.0
+    keep = minmax(x, y, 20)
+    assert 437 in keep and 612 in keep
+
+def test_lttb_keeps_a_spike():
+    x = np.arange(500, dtype=np.float64)
+    y = np.zeros(500)
+    y[250] = 10.0
+    assert 250 in lttb(x, y, 20)
+
+def test_downsample_returns_original_values():
+    x, y = series(300)
+    xs, ys = downsample(x.tolist(), y.tolist(), 30, "minmax")
+    assert len(xs) == len(ys) <= 30
+    assert set(zip(xs, ys)) <= set(zip(x.tolist(), y.tolist()))
+    assert downsample([], [], 30) == ([], [])
+
+@pytest.mark.parametrize("max_points,method", [(2, "lttb"), (100, "average")])
+def test_downsample_rejects_bad_arguments(max_points, method):
+    with pytest.raises(ValueError):
+        downsample([1.0, 2.0], [0.0, 1.0], max_points, method)
+
+def profile(day: int, mood: str = "sad") -> dict:
+    return {"user_name": "Mary", "mood": mood, "emotion_trend": "stable", "profile_tags": [],
+            "sort_key": f"202401{day:02d}_120000"}
+
+@pytest.fixture
+def series_client(monkeypatch):
+    profiles = [profile(day) for day in range(1, 11)]
+    builds = []
+    build_mood_series = mood_tracker.build_mood_series
+
+    def counting_build(*args, **kwargs):
+        builds.append(args[1:])
+        return build_mood_series(*args, **kwargs)
+
+    monkeypatch.setattr(mood_tracker, "load_profiles", lambda: list(profiles))
+    monkeypatch.setattr(mood_tracker, "build_mood_series", counting_build)
+    monkeypatch.setattr(mood_tracker, "_series_cache", {})
+    monkeypatch.setattr(mood_tracker, "_series_cache_profiles", 0)
+    return mood_tracker.app.test_client(), profiles, builds
+
+def test_mood_series_is_cached_until_the_profile_count_changes(series_client):
+    client, profiles, builds = series_client
+    first = client.get("/mood-series?points=5").get_json()
+    assert first["total_points"] == 10 and len(first["points"]) == 5
+    assert client.get("/mood-series?points=5").get_json() == first
+    assert len(builds) == 1
+
+    client.get("/mood-series?points=5&method=minmax")
+    assert len(builds) == 2 # Different query, different cache entry
+
+    profiles.append(profile(11, mood="happy"))
+    refreshed = client.get("/mood-series?points=5").get_json()
+    assert len(builds) == 3
+    assert refreshed["total_points"] == 11
+    assert refreshed["points"][-1] != first["points"][-1]
+
+def test_mood_series_rejects_bad_queries(series_client):
+    client, _, builds = series_client
+    assert client.get("/mood-series?method=average").status_code == 400
+    assert client.get("/mood-series?start=yesterday").status_code == 400
+    assert client.get("/mood-series?points=2").status_code == 400
+    assert client.get("/mood-series?points=2").status_code == 400 # Errors are not cached
+    assert len(builds) == 3
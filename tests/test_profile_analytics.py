@@ -0,0 +1,42 @@
+import pytest
+
+from src.profile_analytics import calculate_mood_score, record_profile, summary, MOOD_CATEGORIES
+
+DAY = 24 * 3600
+NOW = 1_700_000_000.0
+
+def profile(mood: str = "neutral", tags: list = (), user: str = "Mary") -> dict:
+    return {"user_name": user, "mood": mood, "topics": [], "profile_tags": list(tags)}
+
+@pytest.mark.parametrize("tag,expected", [("#withdrawn", -2), ("#hopeful", 2), ("#open", 2), ("#angry", -1),
+                                          ("#anxious", -1), ("Withdrawn", -2), ("#HOPEFUL", 2)])
+def test_mood_tags_change_the_score(tag, expected):
+    assert calculate_mood_score(profile("neutral", [tag])) == expected
+
+def test_score_combines_mood_and_tags():
+    assert calculate_mood_score(profile("sad")) == -1
+    assert calculate_mood_score(profile("sad", ["#withdrawn", "#angry", "#seeks_reassurance"])) == -4
+    assert calculate_mood_score(profile("happy", ["#hopeful", "#open"])) == 6
+
+def test_mood_category_keys_are_normalized_tags():
+    assert all(key == key.lower() and " " not in key for key in MOOD_CATEGORIES)
+
+def test_tags_set_the_mood_direction(tmp_path):
+    db_path = str(tmp_path / "analytics.db")
+    # Same reported mood every time: only the tags move the score
+    record_profile(profile("neutral", ["#hopeful"]), "p1", NOW - 3 * DAY, db_path)
+    record_profile(profile("neutral", ["#withdrawn", "#isolating"]), "p2", NOW - 2 * DAY, db_path)
+    record_profile(profile("neutral", ["#open", "#reconnecting"]), "p3", NOW - DAY, db_path)
+
+    directions = {row["tag"]: row for row in summary(days=None, db_path=db_path, now=NOW)["tags_by_worsening_mood"]}
+    assert directions["#isolating"]["worsening"] == 1 and directions["#isolating"]["worsening_share"] == 1.0
+    assert directions["#reconnecting"]["improving"] == 1 and directions["#reconnecting"]["worsening"] == 0
+    assert "#hopeful" not in directions # First profile of the user: nothing to compare with
+
+def test_profiles_are_recorded_once(tmp_path):
+    db_path = str(tmp_path / "analytics.db")
+    assert record_profile(profile("sad", ["#lonely"]), "p1", NOW, db_path)
+    assert not record_profile(profile("sad", ["#lonely"]), "p1", NOW, db_path)
+    result = summary(days=None, db_path=db_path, now=NOW)
+    assert result["profiles"] == 1
+    assert result["tags"] == [{"term": "#lonely", "count": 1, "previous_count": 0, "moods": {"sad": 1}}]
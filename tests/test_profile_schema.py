@@ -0,0 +1,84 @@
+import json
+
+import pytest
+
+from src.profile_schema import (parse_profile, normalize_tag, PROFILE_DEFAULTS, MAX_TOPICS, PARSE_OK, PARSE_COERCED,
+                                PARSE_REPAIRED, PARSE_FAILED)
+
+VALID = {
+    "user_name": "Mary",
+    "mood": "anxious",
+    "emotion_trend": "worsening",
+    "topics": ["work stress", "sleep"],
+    "profile_tags": ["#anxious", "#seeks_reassurance"],
+    "persona_summary": "Mary is worried about her job.",
+}
+
+def test_valid_profile_is_ok():
+    profile, result = parse_profile(json.dumps(VALID))
+    assert result == PARSE_OK
+    assert profile == VALID
+
+def test_fenced_profile_is_ok():
+    profile, result = parse_profile("```json\n" + json.dumps(VALID) + "\n```")
+    assert result == PARSE_OK
+    assert profile == VALID
+
+def test_fields_are_coerced_to_the_schema():
+    profile, result = parse_profile(json.dumps({"user_name": "Mary", "mood": "Sad", "topics": "work; sleep",
+                                                "profile_tags": ["Seeks Reassurance"], "extra": 1}))
+    assert result == PARSE_COERCED
+    assert profile["mood"] == "sad"
+    assert profile["topics"] == ["work", "sleep"]
+    assert profile["profile_tags"] == ["#seeks_reassurance"]
+    assert profile["emotion_trend"] == PROFILE_DEFAULTS["emotion_trend"]
+    assert "extra" not in profile
+
+def test_topics_are_capped():
+    profile, _ = parse_profile(json.dumps({**VALID, "topics": [f"topic {i}" for i in range(10)]}))
+    assert len(profile["topics"]) == MAX_TOPICS
+
+def test_prose_around_the_object_is_repaired():
+    text = "Sure! Here is the profile:\n" + json.dumps(VALID) + "\nLet me know if you need anything else."
+    profile, result = parse_profile(text)
+    assert result == PARSE_REPAIRED
+    assert profile == VALID
+
+def test_single_quotes_are_repaired():
+    text = "{'user_name': 'Mary', 'mood': 'sad', 'topics': ['work', \"mum's health\"]}"
+    profile, result = parse_profile(text)
+    assert result == PARSE_REPAIRED
+    assert profile["user_name"] == "Mary"
+    assert profile["topics"] == ["work", "mum's health"]
+
+def test_python_literals_and_trailing_commas_are_repaired():
+    text = "{'user_name': None, 'mood': 'happy', 'topics': ['music',], 'is_new': True,}"
+    profile, result = parse_profile(text)
+    assert result == PARSE_REPAIRED
+    assert profile["user_name"] == PROFILE_DEFAULTS["user_name"]
+    assert profile["mood"] == "happy"
+    assert profile["topics"] == ["music"]
+
+def test_truncated_response_keeps_complete_fields():
+    text = json.dumps(VALID)
+    cut = text[:text.index('"persona_summary"') + len('"persona_summary": "Mary is wor')]
+    profile, result = parse_profile(cut)
+    assert result == PARSE_REPAIRED
+    assert profile["user_name"] == "Mary"
+    assert profile["topics"] == VALID["topics"]
+    assert profile["persona_summary"].startswith("Mary is wor")
+
+def test_truncated_list_item_is_dropped():
+    profile, result = parse_profile('{"user_name": "Mary", "mood": "sad", "topics": ["work", "daugh')
+    assert result == PARSE_REPAIRED
+    assert profile["topics"] == ["work"]
+
+@pytest.mark.parametrize("text", [None, "", "no json here", "{}", '{"a": {"b": [1, {"c": "x"',
+                                  '{"answer": "I cannot help with that"}', "[1, 2, 3]"])
+def test_unusable_responses_fail(text):
+    assert parse_profile(text) == (None, PARSE_FAILED)
+
+def test_normalize_tag():
+    assert normalize_tag("Seeks Reassurance") == "#seeks_reassurance"
+    assert normalize_tag("#Anxious") == "#anxious"
+    assert normalize_tag("###") is None
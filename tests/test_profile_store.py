@@ -0,0 +1,109 @@
+import os
+import json
+
+import pytest
+
+from src import profile_store
+from src import knowledge_uploader
+
+def test_atomic_write_json_leaves_no_temp_files(tmp_path):
+    path = tmp_path / "nested" / "data.json"
+    profile_store.atomic_write_json({"a": 1}, str(path))
+    profile_store.atomic_write_json({"a": 2}, str(path))
+    assert json.loads(path.read_text()) == {"a": 2}
+    assert os.listdir(path.parent) == ["data.json"]
+
+def test_write_profile_shards_and_records_in_manifest(tmp_path):
+    profile_dir = str(tmp_path / "user_profiles")
+    path = profile_store.write_profile({"user_name": "Mary O'Neil", "mood": "sad"}, "conv_1", profile_dir)
+    assert os.sep + "mary-o-neil" + os.sep in path
+    entries = profile_store.ManifestReader(profile_dir).read_new()
+    assert [entry["source"] for entry in entries] == ["conv_1"]
+    assert profile_store.load_profile(entries[0], profile_dir) == {"user_name": "Mary O'Neil", "mood": "sad"}
+
+def test_manifest_reader_tails_new_entries(tmp_path):
+    profile_dir = str(tmp_path)
+    reader = profile_store.ManifestReader(profile_dir)
+    assert reader.read_new() == []
+    profile_store.append_manifest({"path": "a.json"}, profile_dir)
+    profile_store.append_manifest({"path": "b.json"}, profile_dir)
+    assert [entry["path"] for entry in reader.read_new()] == ["a.json", "b.json"]
+    assert reader.read_new() == []
+    profile_store.append_manifest({"path": "c.json"}, profile_dir)
+    assert [entry["path"] for entry in reader.read_new()] == ["c.json"]
+    # A restarted reader resumes from a saved offset
+    checkpoint = str(tmp_path / "offset")
+    profile_store.save_offset(checkpoint, reader.offset)
+    profile_store.append_manifest({"path": "d.json"}, profile_dir)
+    resumed = profile_store.ManifestReader(profile_dir, profile_store.load_offset(checkpoint))
+    assert [entry["path"] for entry in resumed.read_new()] == ["d.json"]
+
+def test_manifest_reader_leaves_partial_lines_for_later(tmp_path):
+    profile_dir = str(tmp_path)
+    profile_store.append_manifest({"path": "a.json"}, profile_dir)
+    with open(profile_store.manifest_path(profile_dir), "a", encoding="utf-8") as f:
+        f.write('{"path": "b.js')
+    reader = profile_store.ManifestReader(profile_dir)
+    assert [entry["path"] for entry in reader.read_new()] == ["a.json"]
+    with open(profile_store.manifest_path(profile_dir), "a", encoding="utf-8") as f:
+        f.write('on"}\n')
+    assert [entry["path"] for entry in reader.read_new()] == ["b.json"]
+
+@pytest.fixture
+def uploads(tmp_path, monkeypatch):
+    """Runs the uploader in a temp project dir; uploads of sources in `failing` fail."""
+    monkeypatch.chdir(tmp_path)
+    uploaded, failing = [], set()
+
+    def upload_profile(profile_data, filename):
+        if any(f"_{source}_" in filename for source in failing):
+            return False
+        uploaded.append(filename.split("_")[2])
+        return True
+
+    monkeypatch.setattr(knowledge_uploader, "upload_profile", upload_profile)
+    return uploaded, failing
+
+def save(*sources):
+    for source in sources:
+        profile_store.write_profile({"user_name": "Mary", "mood": "sad"}, source)
+
+def retries() -> list:
+    with open(knowledge_uploader.UPLOAD_RETRY_FILE, encoding="utf-8") as f:
+        return [(item["entry"]["source"], item["attempts"]) for item in json.load(f)]
+
+def test_checkpoint_moves_past_successes(uploads):
+    uploaded, _ = uploads
+    save("c1", "c2")
+    knowledge_uploader.process_profiles(only_new=True)
+    save("c3")
+    knowledge_uploader.process_profiles(only_new=True)
+    knowledge_uploader.process_profiles(only_new=True)
+    assert uploaded == ["c1", "c2", "c3"]
+
+def test_failed_upload_is_retried_on_the_next_pass(uploads):
+    uploaded, failing = uploads
+    failing.add("c2")
+    save("c1", "c2", "c3")
+    knowledge_uploader.process_profiles(only_new=True)
+    assert uploaded == ["c1", "c3"]
+    assert retries() == [("c2", 1)]
+
+    failing.clear()
+    save("c4")
+    knowledge_uploader.process_profiles(only_new=True)
+    assert uploaded == ["c1", "c3", "c2", "c4"]
+    assert retries() == []
+
+def test_gives_up_after_max_attempts(uploads):
+    uploaded, failing = uploads
+    failing.add("c1")
+    save("c1")
+    for attempt in range(1, knowledge_uploader.UPLOAD_MAX_ATTEMPTS):
+        knowledge_uploader.process_profiles(only_new=True)
+        assert retries() == [("c1", attempt)]
+    knowledge_uploader.process_profiles(only_new=True)
+    assert retries() == []
+    failing.clear()
+    knowledge_uploader.process_profiles(only_new=True)
+    assert uploaded == []
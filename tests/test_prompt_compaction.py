@@ -0,0 +1,14 @@
+from src.prompt_compaction import compact_transcript
+
+def test_short_user_answer_is_kept():
+    text, _ = compact_transcript("Agent: Are you safe right now?\nUser: No.")
+    assert text.splitlines() == ["Agent: Are you safe right now?", "User: No."]
+
+def test_repeated_short_user_answers_are_kept():
+    text, _ = compact_transcript("Agent: Did you sleep last night?\nUser: No.\n"
+                                 "Agent: Have you eaten today?\nUser: No.")
+    assert text.count("User: No.") == 2
+
+def test_agent_filler_is_dropped():
+    text, _ = compact_transcript("Agent: Okay.\nUser: I had a rough week at work.\nAgent: Mm-hmm.")
+    assert text.splitlines() == ["User: I had a rough week at work."]
@@ -0,0 +1,84 @@
+import hmac
+import json
+import time
+import hashlib
+
+import pytest
+
+from src import webhook_receiver
+
+SECRET = "test-secret"
+URL = "/webhooks/elevenlabs/post-call"
+
+def sign(body: bytes, timestamp: int | None = None, secret: str = SECRET) -> str:
+    timestamp = int(time.time()) if timestamp is None else timestamp
+    digest = hmac.new(secret.encode("utf-8"), f"{timestamp}.".encode("utf-8") + body, hashlib.sha256).hexdigest()
+    return f"t={timestamp},v0={digest}"
+
+def post_call_body(conversation_id: str = "conv_1") -> bytes:
+    return json.dumps({"type": "post_call_transcription",
+                       "data": {"conversation_id": conversation_id, "transcript": [{"role": "user", "message": "hi"}]}
+                       }).encode("utf-8")
+
+@pytest.fixture
+def client(monkeypatch):
+    queued = []
+    monkeypatch.setattr(webhook_receiver, "WEBHOOK_SECRET", SECRET)
+    monkeypatch.setattr(webhook_receiver, "_enqueue", lambda cid, data: queued.append((cid, data)) or True)
+    client = webhook_receiver.app.test_client()
+    client.queued = queued
+    return client
+
+def post(client, body: bytes, signature: str | None):
+    headers = {"Content-Type": "application/json"}
+    if signature is not None:
+        headers["ElevenLabs-Signature"] = signature
+    return client.post(URL, data=body, headers=headers)
+
+def test_valid_signature_is_queued(client):
+    body = post_call_body()
+    response = post(client, body, sign(body))
+    assert response.status_code == 200
+    assert response.get_json()["status"] == "queued"
+    assert client.queued[0][0] == "conv_1"
+
+def test_tampered_body_is_rejected(client):
+    body = post_call_body()
+    response = post(client, post_call_body("conv_other"), sign(body))
+    assert response.status_code == 401
+    assert client.queued == []
+
+def test_wrong_secret_is_rejected(client):
+    body = post_call_body()
+    assert post(client, body, sign(body, secret="other")).status_code == 401
+
+def test_stale_timestamp_is_rejected(client):
+    body = post_call_body()
+    stale = int(time.time()) - webhook_receiver.SIGNATURE_TOLERANCE_SECONDS - 60
+    assert post(client, body, sign(body, stale)).status_code == 401
+
+@pytest.mark.parametrize("header", [None, "", "garbage", "t=abc,v0=deadbeef", "v0=deadbeef", "t=123"])
+def test_malformed_signature_header_is_rejected(client, header):
+    assert post(client, post_call_body(), header).status_code == 401
+
+@pytest.mark.parametrize("payload", [[1, 2, 3], "text", 42, {"type": "post_call_transcription", "data": [1]}])
+def test_non_object_payload_is_rejected(client, payload):
+    body = json.dumps(payload).encode("utf-8")
+    assert post(client, body, sign(body)).status_code == 400
+    assert client.queued == []
+
+def test_invalid_json_is_rejected(client):
+    body = b"{not json"
+    assert post(client, body, sign(body)).status_code == 400
+
+def test_other_event_types_are_ignored(client):
+    body = json.dumps({"type": "post_call_audio", "data": {"conversation_id": "conv_1"}}).encode("utf-8")
+    response = post(client, body, sign(body))
+    assert response.status_code == 200
+    assert response.get_json()["status"] == "ignored"
+    assert client.queued == []
+
+def test_missing_conversation_id_is_ignored(client):
+    body = json.dumps({"type": "post_call_transcription", "data": {}}).encode("utf-8")
+    assert post(client, body, sign(body)).get_json()["status"] == "ignored"
+    assert client.queued == []